@@ -0,0 +1,239 @@
+"""Manager of the dashboard cache directory
+
+Every file the dashboard caches is recorded in a SQLite manifest with its
+kind, schema version, content version (e.g. the dataset version), size and
+last access time. Files are written atomically, stale schema versions are
+treated as missing, and the least recently used files are evicted when the
+cache grows beyond its size budget. SQLite serializes concurrent updates,
+so all web and precompute workers can share one cache directory.
+
+Usage::
+
+    python -m server.src.dashboard.cache_manager inspect
+    python -m server.src.dashboard.cache_manager prune
+    python -m server.src.dashboard.cache_manager warm 61 554
+"""
+import argparse
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from .sqlite_local import LocalConnection, transaction
+
+# Bump the version of a kind when the format of its files changes
+SCHEMA_VERSIONS = {
+    "frame": 2,
+    "profile": 1,
+    "metadata": 2,
+    "features": 1,
+    "sample": 2,
+    "matrix": 2,
+    "importance": 2,
+    "predictions": 1,
+    "curves": 1,
+    "run": 4,
+    "task": 2,
+}
+# Seconds between updates of the last access time of an entry
+TOUCH_INTERVAL = 60
+# Temporary files older than this many seconds belong to crashed writers
+STALE_TMP_AGE = 60 * 60
+
+MANIFEST = "manifest.sqlite"
+
+
+class CacheManager:
+    def __init__(self, root, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._connect = LocalConnection(self.root / MANIFEST, _create_manifest)
+
+    def path(self, name: str) -> Path:
+        return self.root / name
+
+    @contextmanager
+    def writing(self, name: str, kind: str, content_version=None, file_format=None):
+        """Write a cache file atomically and record it in the manifest
+
+        Yields a temporary path to write to, which replaces the cache file
+        once the block completes, so readers never see partial files.
+        ``file_format`` records the format the file is written in::
+
+            with cache.writing("df61.frame", "frame", 1, "parquet-zstd") as tmp:
+                df.to_parquet(tmp, compression="zstd")
+        """
+        path = self.path(name)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            yield tmp
+            now = time.time()
+            # The file and its manifest row change together
+            with transaction(self._connect()) as conn:
+                os.replace(tmp, path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (name, kind, schema_version,"
+                    " content_version, format, size, created, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        name,
+                        kind,
+                        SCHEMA_VERSIONS[kind],
+                        None if content_version is None else str(content_version),
+                        file_format,
+                        path.stat().st_size,
+                        now,
+                        now,
+                    ),
+                )
+        finally:
+            tmp.unlink(missing_ok=True)
+        self.evict()
+
+    def lookup(self, name: str, kind: str, content_version=None, max_age=None):
+        """Path of a valid cache file, None if it is missing or outdated
+
+        Outdated files are left in place, a writer may be replacing them
+        right now. The next write overwrites them, or ``prune`` removes them.
+
+        :param name: file name relative to the cache root
+        :param kind: kind of the file, see ``SCHEMA_VERSIONS``
+        :param content_version: if given, the version the file must have
+        :param max_age: if given, seconds after its creation the file is outdated
+        """
+        row = self._execute(
+            "SELECT schema_version, content_version, created, last_access FROM entries"
+            " WHERE name = ?",
+            (name,),
+        ).fetchone()
+        if row is None:
+            return None
+        schema_version, stored_version, created, last_access = row
+        path = self.path(name)
+        outdated = (
+            schema_version != SCHEMA_VERSIONS[kind]
+            or (content_version is not None and stored_version != str(content_version))
+            or (max_age is not None and time.time() - created > max_age)
+        )
+        if outdated:
+            return None
+        if not path.exists():
+            # Only the row, a file written in the meantime has its own row
+            self._execute(
+                "DELETE FROM entries WHERE name = ? AND last_access = ?", (name, last_access)
+            )
+            return None
+        if time.time() - last_access > TOUCH_INTERVAL:
+            self._execute(
+                "UPDATE entries SET last_access = ? WHERE name = ?", (time.time(), name)
+            )
+        return path
+
+    def remove(self, name: str):
+        self.path(name).unlink(missing_ok=True)
+        self._execute("DELETE FROM entries WHERE name = ?", (name,))
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its budget"""
+        with transaction(self._connect()) as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute(
+                    "SELECT name, size FROM entries ORDER BY last_access"
+                ).fetchall()
+                for name, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self.path(name).unlink(missing_ok=True)
+                    conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+                    total -= size
+
+    def prune(self):
+        """Drop outdated and dangling entries, unknown files, and enforce the budget
+
+        :return: number of removed entries and files
+        """
+        removed = 0
+        # Writers commit their files under the same lock, so no file is
+        # added between reading the manifest and scanning the directory
+        with transaction(self._connect()) as conn:
+            for name, kind, schema_version in conn.execute(
+                "SELECT name, kind, schema_version FROM entries"
+            ).fetchall():
+                if SCHEMA_VERSIONS.get(kind) != schema_version or not self.path(name).exists():
+                    self.path(name).unlink(missing_ok=True)
+                    conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+                    removed += 1
+
+            known = {name for name, in conn.execute("SELECT name FROM entries").fetchall()}
+            for path in self.root.iterdir():
+                if not path.is_file() or path.name.startswith(MANIFEST):
+                    continue
+                if path.name.endswith(".tmp"):
+                    if time.time() - path.stat().st_mtime > STALE_TMP_AGE:
+                        path.unlink(missing_ok=True)
+                        removed += 1
+                elif path.name not in known:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+
+        before = len(known)
+        self.evict()
+        return removed + before - self._execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def entries(self) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT * FROM entries ORDER BY last_access DESC", self._connect()
+        )
+
+    def _execute(self, sql, parameters=()):
+        return self._connect().execute(sql, parameters)
+
+
+def _create_manifest(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " name TEXT PRIMARY KEY, kind TEXT, schema_version INTEGER,"
+        " content_version TEXT, format TEXT, size INTEGER, created REAL,"
+        " last_access REAL)"
+    )
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(entries)")]
+    if "format" not in columns:
+        # Manifests written before formats were recorded
+        conn.execute("ALTER TABLE entries ADD COLUMN format TEXT")
+
+
+def main(argv=None):
+    from .caching import dashboard_cache
+
+    parser = argparse.ArgumentParser(description="Manage the dashboard cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("inspect", help="list cache entries and the total size")
+    commands.add_parser("prune", help="remove outdated entries and enforce the budget")
+    warm = commands.add_parser(
+        "warm", help="precompute the pages of datasets, see warmer.py for bulk warming"
+    )
+    warm.add_argument("data_ids", type=int, nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "inspect":
+        entries = dashboard_cache.entries()
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(entries)
+        print(
+            f"{len(entries)} entries, {entries['size'].sum() / 1024 ** 2:.1f} MB"
+            f" of {dashboard_cache.max_bytes / 1024 ** 2:.0f} MB"
+        )
+    elif args.command == "prune":
+        print(f"Removed {dashboard_cache.prune()} entries")
+    elif args.command == "warm":
+        from .warmer import main as warm
+
+        warm(["--pages", "--order", "id", "--ids", *map(str, args.data_ids)])
+
+
+if __name__ == "__main__":
+    main()
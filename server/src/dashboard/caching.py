@@ -1,5 +1,11 @@
 from pathlib import Path
 
+import pandas as pd
+
+from .cache_manager import CacheManager
+from .dash_config import DASHBOARD_CACHE_BYTES, FRAME_FORMAT
+from .formats import FormatPolicy, read_columns, read_frame
+
 CACHE_DIR_ROOT = Path.home() / ".cache" / "openml"
 CACHE_DIR_ROOT.mkdir(parents=True, exist_ok=True)
 
@@ -8,3 +14,125 @@ CACHE_DIR_FLASK.mkdir(exist_ok=True)
 
 CACHE_DIR_DASHBOARD = CACHE_DIR_ROOT / "dashboard"
 CACHE_DIR_DASHBOARD.mkdir(exist_ok=True)
+
+# Lock files of computations shared between processes
+CACHE_DIR_LOCKS = CACHE_DIR_ROOT / "locks"
+CACHE_DIR_LOCKS.mkdir(exist_ok=True)
+
+dashboard_cache = CacheManager(CACHE_DIR_DASHBOARD, DASHBOARD_CACHE_BYTES)
+# Written by ``python -m server.src.dashboard.formats --output ...``
+frame_format = FormatPolicy(CACHE_DIR_ROOT / "format_policy.json", FRAME_FORMAT)
+
+
+def frame_path(data_id: int) -> Path:
+    """Location of the cached (possibly subsampled) frame of a dataset"""
+    return dashboard_cache.path(f"df{data_id}.frame")
+
+
+def profile_path(data_id: int) -> Path:
+    """Location of the precomputed profile of the cached frame"""
+    return dashboard_cache.path(f"profile{data_id}.pkl")
+
+
+def metadata_path(data_id: int) -> Path:
+    """Location of the feature table computed alongside the cached frame"""
+    return dashboard_cache.path(f"meta{data_id}.pkl")
+
+
+def model_matrix_path(data_id: int) -> Path:
+    """Location of the cleaned and encoded matrix of the cached frame"""
+    return dashboard_cache.path(f"matrix{data_id}.feather")
+
+
+def importance_path(data_id: int, mode: str) -> Path:
+    """Location of the feature importance of a dataset computed in a mode"""
+    return dashboard_cache.path(f"fi{data_id}_{mode}.pkl")
+
+
+def sample_path(data_id: int) -> Path:
+    """Location of the row numbers of the sample of a large dataset"""
+    return dashboard_cache.path(f"sample{data_id}.npy")
+
+
+def feature_metadata_path(data_id: int) -> Path:
+    """Location of the feature metadata of the dataset description"""
+    return dashboard_cache.path(f"features{data_id}.feather")
+
+
+def run_path(run_id: int) -> Path:
+    """Location of the stored run and its fold evaluations"""
+    return dashboard_cache.path(f"run{run_id}.pkl")
+
+
+def predictions_path(file_id: int) -> Path:
+    """Location of the parsed predictions file of a run"""
+    return dashboard_cache.path(f"predictions{file_id}.feather")
+
+
+def curves_path(run_id: int) -> Path:
+    """Location of the ROC and precision-recall curves of a run"""
+    return dashboard_cache.path(f"curves{run_id}.pkl")
+
+
+def task_segment_path(task_id: int, metric: str, page: int) -> Path:
+    """Location of a page of the evaluations of a task for a metric"""
+    return dashboard_cache.path(f"task{task_id}_{metric}_{page}.feather")
+
+
+def write_pickle(obj, path: Path, kind: str, content_version=None):
+    """Atomically pickle an object to a file of the dashboard cache"""
+    with dashboard_cache.writing(path.name, kind, content_version) as tmp:
+        pd.to_pickle(obj, tmp)
+
+
+def read_cached(path: Path, kind: str, content_version=None, read=read_frame, max_age=None):
+    """Read a file of the dashboard cache, None if it is missing or outdated
+
+    :param kind: kind of the file, see ``cache_manager.SCHEMA_VERSIONS``
+    :param content_version: if given, the version the file must have
+    :param read: function reading the file at a path
+    :param max_age: if given, seconds after its creation the file is outdated
+    """
+    if dashboard_cache.lookup(path.name, kind, content_version, max_age) is None:
+        return None
+    try:
+        return read(path)
+    except FileNotFoundError:
+        # Evicted by another worker in the meantime
+        return None
+
+
+def read_pickle(path: Path, kind: str, content_version=None):
+    """Unpickle a file of the dashboard cache, None if it is missing or outdated"""
+    return read_cached(path, kind, content_version, pd.read_pickle)
+
+
+def save_frame(df: pd.DataFrame, data_id: int, version=None):
+    """Store a dataset frame column-wise, so callbacks can load single columns
+
+    The file format is chosen by the shape of the frame and recorded in the
+    cache manifest.
+    """
+    fmt = frame_format.choose(*df.shape)
+    with dashboard_cache.writing(frame_path(data_id).name, "frame", version, fmt.name) as tmp:
+        fmt.write(df, tmp)
+
+
+def cached_frame_path(data_id: int):
+    """Location of the cached frame, None if it is not cached or outdated"""
+    return dashboard_cache.lookup(frame_path(data_id).name, "frame")
+
+
+def frame_columns(data_id: int):
+    """Column names of the cached frame, read from the file metadata only"""
+    return read_columns(frame_path(data_id))
+
+
+def load_frame(data_id: int, columns=None):
+    """Load the cached frame of a dataset
+
+    :param data_id: ID of the OpenML dataset
+    :param columns: names of the columns to read, all columns if None
+    :return: DataFrame, or None if the dataset is not cached yet
+    """
+    return read_cached(frame_path(data_id), "frame", read=lambda path: read_frame(path, columns))
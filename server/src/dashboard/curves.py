@@ -0,0 +1,106 @@
+"""ROC and precision-recall curves of the predictions of a run
+
+All one-vs-rest curves of a class come from a single sort of its scores.
+Curves have a point per distinct score, so they are downsampled to at most
+``CURVE_POINTS`` points with Largest-Triangle-Three-Buckets, which keeps
+the corners that define their shape. The curves, their thresholds and the
+areas under them are stored per run, so the ROC/PR tab only loads them.
+"""
+import numpy as np
+import pandas as pd
+
+from .caching import curves_path, read_pickle, write_pickle
+from .dash_config import CURVE_POINTS
+
+
+def compute_curves(predictions: pd.DataFrame):
+    """Curves of every class of the predictions of a classification run
+
+    :param predictions: predictions with the "correct" label and a
+        "confidence.<class>" column per class
+    :return: dict with the "classes" (in order of appearance) and per
+        class with a confidence column a dict with the "roc" and "pr"
+        curves (dicts of arrays) and the "roc_auc" and "average_precision"
+    """
+    correct = predictions["correct"].astype(str).to_numpy()
+    classes = [str(c) for c in pd.unique(correct)]
+    curves = {}
+    for label in classes:
+        column = f"confidence.{label}"
+        if column not in predictions.columns:
+            continue
+        scores = predictions[column].to_numpy(dtype=float)
+        present = ~np.isnan(scores)
+        curve = binary_curves(correct[present] == label, scores[present])
+        if curve is not None:
+            curves[label] = curve
+    return {"classes": classes, "curves": curves}
+
+
+def binary_curves(positive, scores, n_points: int = CURVE_POINTS):
+    """ROC and precision-recall curve of scores for a binary label
+
+    :param positive: boolean label per prediction
+    :param scores: score of the positive class per prediction
+    :return: dict of downsampled curves and their areas, None if the
+        label has only one value
+    """
+    order = np.argsort(-scores, kind="stable")
+    scores, positive = scores[order], positive[order]
+    # Last position of every distinct score
+    distinct = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tps = np.cumsum(positive)[distinct]
+    fps = distinct + 1 - tps
+    thresholds = scores[distinct]
+    if not len(tps) or tps[-1] == 0 or fps[-1] == 0:
+        return None
+
+    fpr = np.r_[0.0, fps / fps[-1]]
+    tpr = np.r_[0.0, tps / tps[-1]]
+    precision = tps / (tps + fps)
+    recall = tps / tps[-1]
+    roc_thresholds = np.r_[np.inf, thresholds]
+
+    roc = downsample(fpr, tpr, n_points)
+    pr = downsample(recall, precision, n_points)
+    return {
+        "roc": {"fpr": fpr[roc], "tpr": tpr[roc], "thresholds": roc_thresholds[roc]},
+        "pr": {"recall": recall[pr], "precision": precision[pr], "thresholds": thresholds[pr]},
+        "roc_auc": float(np.trapz(tpr, fpr)),
+        "average_precision": float(np.sum(np.diff(np.r_[0.0, recall]) * precision)),
+    }
+
+
+def downsample(x, y, n_points: int):
+    """Indices of at most ``n_points`` points that keep the shape of a curve
+
+    Largest-Triangle-Three-Buckets: the first and last point are kept, and
+    of every bucket in between the point spanning the largest triangle
+    with the previously kept point and the mean of the next bucket.
+    """
+    n = len(x)
+    if n <= n_points or n_points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_points - 1).astype(int)
+    indices = [0]
+    for start, end, next_end in zip(edges[:-1], edges[1:], np.r_[edges[2:], n]):
+        a = indices[-1]
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        indices.append(start + int(np.argmax(area)))
+    indices.append(n - 1)
+    return np.array(indices)
+
+
+def load_curves(run_id: int, file_id):
+    """Stored curves of a run, None if they are not computed for this file"""
+    curves = read_pickle(curves_path(run_id), "curves")
+    if curves is None or curves.get("file_id") != file_id:
+        return None
+    return curves
+
+
+def save_curves(curves, run_id: int, file_id):
+    write_pickle(dict(curves, file_id=file_id), curves_path(run_id), "curves")
@@ -2,3 +2,52 @@
 BASE_URL = "http://127.0.0.1:5000/dashboard/"
 DASH_CACHING = True
 COMMON_CACHE = True
+# Memory budget of the in-process cache of dataset frames (per worker)
+FRAME_CACHE_BYTES = 512 * 1024 * 1024
+# Approximate size of the row batches in which large datasets are read
+STREAM_BATCH_BYTES = 64 * 1024 * 1024
+# Datasets with at least this many rows are streamed and subsampled
+STREAMING_THRESHOLD = 50000
+# Row budget of the stratified sample of larger datasets
+SAMPLE_ROWS = 50000
+# Background precomputation of dataset pages: "process" or "thread" pool
+PRECOMPUTE_EXECUTOR = "process"
+PRECOMPUTE_WORKERS = 2
+# Seconds after which a silent or failed precompute job is resubmitted
+JOB_TIMEOUT = 30 * 60
+# Milliseconds between polls of the job status by the data page
+JOB_POLL_INTERVAL = 2000
+# Milliseconds between polls once the job has finished, which resubmit it
+# when its results were evicted from the cache
+JOB_IDLE_POLL_INTERVAL = 30000
+# Rows sampled for the fast, approximate feature importance
+APPROXIMATE_IMPORTANCE_ROWS = 5000
+# Format of cached frames (see formats.FORMATS), or "auto" to choose by shape
+FRAME_FORMAT = "auto"
+# Scatter plots use WebGL above this many points, and are binned into
+# SCATTER_DENSITY_BINS x SCATTER_DENSITY_BINS cells per class above the second
+SCATTERGL_POINTS = 5000
+SCATTER_DENSITY_POINTS = 100000
+SCATTER_DENSITY_BINS = 100
+# Rows of the stratified sample the feature interaction scatter matrices are drawn from
+INTERACTION_ROWS = 2000
+# Points per ROC and precision-recall curve of a run
+CURVE_POINTS = 500
+# Budget of the (compressed) callback results shared by all workers
+FLASK_CACHE_BYTES = 2 * 1024 ** 3
+# Seconds a worker waits for another worker computing the same callback result
+FLASK_CACHE_LOCK_TIMEOUT = 120
+# Disk budget of the dashboard cache, least recently used files are evicted
+DASHBOARD_CACHE_BYTES = 20 * 1024 ** 3
+# Bulk cache warmer: "thread" or "process" pool, workers and datasets started per second
+WARMER_EXECUTOR = "thread"
+WARMER_WORKERS = 4
+WARMER_RATE = 2.0
+# Seconds a stored run is served before it is checked, runs the server
+# has added evaluations to since are then fetched again
+RUN_CACHE_SECONDS = 60 * 60
+# Seconds a stored page of the evaluations of a task is served, as new runs
+# of the task change the pages
+TASK_CACHE_SECONDS = 60 * 60
+# Rows per page of the feature table, pages are queried from the server
+FEATURE_PAGE_SIZE = 50
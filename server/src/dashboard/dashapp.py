@@ -1,13 +1,13 @@
-import shutil
-
 import dash
 import openml
 from dash import dcc, html
-from flask_caching import Cache
+from flask import jsonify
 
-from .caching import CACHE_DIR_ROOT, CACHE_DIR_FLASK, CACHE_DIR_DASHBOARD
+from .caching import CACHE_DIR_ROOT, CACHE_DIR_FLASK, dashboard_cache
 from .callbacks import register_callbacks
-from .dash_config import COMMON_CACHE
+from .dash_config import COMMON_CACHE, FLASK_CACHE_BYTES, FLASK_CACHE_LOCK_TIMEOUT
+from .jobs import read_status
+from .sqlite_cache import LockingCache
 
 # TODO: Move to assets (Copied from Joaquin's react font)
 font = [
@@ -36,12 +36,14 @@ def create_dash_app(flask_app):
         openml.config.cache_directory = CACHE_DIR_ROOT
 
     app = dash.Dash(__name__, server=flask_app, url_base_pathname="/dashboard/")
-    cache = Cache(
+    cache = LockingCache(
         app.server,
         config={
-            # try 'filesystem' if you don't want to setup redis
-            "CACHE_TYPE": "filesystem",
+            # One SQLite database shared by all workers of this host
+            "CACHE_TYPE": "server.src.dashboard.sqlite_cache.SQLiteCache",
             "CACHE_DIR": CACHE_DIR_FLASK,
+            "CACHE_MAX_BYTES": FLASK_CACHE_BYTES,
+            "CACHE_LOCK_TIMEOUT": FLASK_CACHE_LOCK_TIMEOUT,
         },
     )
     app.config.suppress_callback_exceptions = True
@@ -60,6 +62,12 @@ def create_dash_app(flask_app):
     app.layout = html.Div([url, global_loading_icon, page_content])
 
     register_callbacks(app, cache)
-    shutil.rmtree(CACHE_DIR_DASHBOARD)
-    CACHE_DIR_DASHBOARD.mkdir()
+
+    @app.server.route("/dashboard/jobs/data/<int:data_id>")
+    def dataset_job_status(data_id):
+        """Status of the background computation of a data page"""
+        return jsonify(read_status(data_id) or {"state": "unknown"})
+
+    # Keep the cache across restarts, only drop outdated files
+    dashboard_cache.prune()
     return app
@@ -1,41 +1,111 @@
 import re
 
+import dash
 import numpy as np
-import pandas as pd
-import plotly.express as px
 import plotly.graph_objs as go
 from dash import dcc, html
 from dash.dependencies import Input, Output, State
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from dash.exceptions import PreventUpdate
 
-from .caching import CACHE_DIR_DASHBOARD
-from .dash_config import DASH_CACHING
-from .helpers import clean_dataset, get_data_metadata, logger, bin_numeric
+from .data_profile import load_profile
+from .dash_config import DASH_CACHING, JOB_IDLE_POLL_INTERVAL, JOB_POLL_INTERVAL
+from .feature_importance import load_feature_importance
+from .feature_table import load_features, query_features
+from .frame_cache import frame_cache
+from .helpers import load_data_metadata, logger
+from .interactions import parcats_figure, scatter_matrix_figure
+from .jobs import ensure_dataset_job
+from .model_matrix import CLASS_COLUMN, load_model_matrix
+from .scatter import scatter_traces
 
 
 TIMEOUT = 60 * 60 if DASH_CACHING else 1
 
 
 def register_data_callbacks(app, cache):
+    @app.callback(
+        [Output("job-status", "data"), Output("job-poll", "interval")],
+        [Input("job-poll", "n_intervals"), Input("url", "pathname")],
+        [State("job-status", "data")],
+    )
+    def poll_dataset_job(n_intervals, url, previous):
+        """Submit the precompute job of the dataset and track its progress
+
+        Finished jobs are polled less often. A poll resubmits the job when
+        its results were evicted, and the page is then updated again.
+        """
+        data_id = int(re.search(r"data/(\d+)", url).group(1))
+        status = ensure_dataset_job(data_id)
+        finished = status["state"] in ("done", "failed")
+        interval = JOB_IDLE_POLL_INTERVAL if finished else JOB_POLL_INTERVAL
+        current = {
+            "state": status["state"],
+            "completed": status["completed"],
+            "started": status.get("started"),
+            "version": status.get("version"),
+            "importance": status.get("importance"),
+        }
+        # Only trigger the dependent callbacks when a stage has completed
+        if current == previous:
+            return dash.no_update, interval
+        return current, interval
+
+    @app.callback(
+        Output("metadata-ready", "data"),
+        [Input("job-status", "data")],
+        [State("metadata-ready", "data")],
+    )
+    def metadata_ready(job_status, ready):
+        """Set when the metadata stage of a job run has ended
+
+        Set to the start time of the run, or to "failed". The later stages
+        of the run do not change it, so the callbacks that only need the
+        metadata fire once per run, and again after a resubmitted run.
+        """
+        if job_status is None:
+            raise PreventUpdate
+        if "metadata" in job_status["completed"]:
+            current = job_status["started"]
+        elif job_status["state"] == "failed":
+            current = "failed"
+        else:
+            raise PreventUpdate
+        if current == ready:
+            raise PreventUpdate
+        return current
+
     @app.callback(
         [
             Output("scatterdiv", "children"),
             Output("dataloaded", "value"),
-            Output("datatable", "data"),
             Output("datatable", "columns"),
         ],
         [
             Input("url", "pathname"),
             Input("tableloaded", "children"),
+            Input("metadata-ready", "data"),
         ],
         [State("datatable", "columns")],
     )
     @cache.memoize(timeout=TIMEOUT)
-    def entropy_scatter(url, tableloaded, existing_columns):
-        existing_columns.append({"id": "Entropy", "name": "Entropy"})
-        logger.debug("Downloading data and calculate entropy")
+    def entropy_scatter(url, tableloaded, metadata_ready, existing_columns):
+        if metadata_ready is None:
+            raise PreventUpdate
+        if metadata_ready == "failed":
+            message = html.P("Could not load the dataset")
+            return message, None, dash.no_update
+
+        columns = dash.no_update
+        if not any(column["id"] == "Entropy" for column in existing_columns):
+            columns = existing_columns + [{"id": "Entropy", "name": "Entropy"}]
+        logger.debug("Loading precomputed entropy")
         data_id = int(re.search(r"data/(\d+)", url).group(1))
-        df, meta_features, numerical_data, nominal_data = get_data_metadata(data_id)
+        metadata = load_data_metadata(data_id)
+        if metadata is None:
+            # Evicted, the resubmitted job updates the page again
+            ensure_dataset_job(data_id)
+            raise PreventUpdate
+        meta_features, numerical_data, nominal_data = metadata
         scatter_div = (
             [
                 html.Div(
@@ -91,8 +161,23 @@ def register_data_callbacks(app, cache):
             )
         )
 
-        logger.debug("Downloaded data and calculated entropy")
-        return scatter_div, "loaded", meta_features.to_dict("records"), existing_columns
+        logger.debug("Loaded precomputed entropy")
+        return scatter_div, "loaded", columns
+
+    @app.callback(
+        [Output("datatable", "data"), Output("datatable", "page_count")],
+        [
+            Input("url", "pathname"),
+            Input("datatable", "page_current"),
+            Input("datatable", "page_size"),
+            Input("datatable", "sort_by"),
+            Input("datatable", "filter_query"),
+            Input("dataloaded", "value"),
+        ],
+    )
+    def update_feature_table(url, page_current, page_size, sort_by, filter_query, dataloaded):
+        # The table has entropy once the dataset is loaded
+        return feature_table_page(url, page_current, page_size, sort_by, filter_query)
 
     # @app.callback(
     #     Output('distribution', 'children'),
@@ -147,8 +232,7 @@ def register_data_callbacks(app, cache):
     @app.callback(
         Output("table-graph", "children"),
         [
-            Input("datatable", "data"),
-            Input("datatable", "selected_rows"),
+            Input("datatable", "selected_row_ids"),
             Input("url", "pathname"),
             Input("radio1", "value"),
             Input("stack", "value"),
@@ -156,36 +240,36 @@ def register_data_callbacks(app, cache):
         ],
     )
     @cache.memoize(timeout=TIMEOUT)
-    def plot_table(rows, selected_row_indices, url, radio, stack, dataloaded):
+    def plot_table(selected_row_ids, url, radio, stack, dataloaded):
         # If dataset is not downloaded yet
         if dataloaded is None:
             return []
 
-        logger.debug("loading pickle to create dist plot")
+        logger.debug("loading profile to create dist plot")
 
-        # If pickle file is present
+        # If profile of the dataset is computed
         data_id = int(re.search(r"data/(\d+)", url).group(1))
-        filename_cache = CACHE_DIR_DASHBOARD / f"df{data_id}.pkl"
-        if not filename_cache.exists():
-            return []
-        df = pd.read_pickle(filename_cache)
+        profile = load_profile(data_id)
+        if profile is None:
+            # Evicted, the resubmitted job updates the page again
+            ensure_dataset_job(data_id)
+            raise PreventUpdate
 
         # Get selected rows from table
-        meta_data = pd.DataFrame(rows)
-        if len(selected_row_indices) != 0:
-            meta_data = meta_data.loc[selected_row_indices]
-        else:
+        if not selected_row_ids:
             return "no selected rows"
+        meta_data = load_features(data_id)
+        meta_data = meta_data[meta_data["id"].isin(selected_row_ids)]
 
         # Create distribution plots and align them as a table graph
         children = []
-        for index, row in meta_data.iterrows():
+        for _, row in meta_data.iterrows():
             attribute = row["Attribute"]
+            if attribute not in profile["columns"]:
+                continue
             col1 = html.P(row["Attribute"])
-            show_legend = True if index == 0 else False
-            data = dist_plot(
-                meta_data, attribute, row["DataType"], radio, data_id, show_legend, df
-            )
+            # Only the first plot shows the target classes in its legend
+            data = dist_plot(profile, attribute, radio, show_legend=not children)
             fig = go.Figure(data=data)
             fig["layout"].update(
                 hovermode="closest", height=300, barmode=stack, font=dict(size=9)
@@ -203,96 +287,69 @@ def register_data_callbacks(app, cache):
 
     @app.callback(
         [Output("fi", "children"), Output("hidden", "value")],
-        [Input("url", "pathname"), Input("dataloaded", "value")],
-        [State("datatable", "data")],
+        [
+            Input("url", "pathname"),
+            Input("dataloaded", "value"),
+            Input("job-status", "data"),
+        ],
     )
     @cache.memoize(timeout=TIMEOUT)
-    def feature_importance(url, dataloaded, rows):
+    def feature_importance(url, dataloaded, job_status):
         # If dataset is not loaded
         if dataloaded is None:
             return [], "No file"
-
-        # Get dataset if pickle exists
-        data_id = int(re.search(r"data/(\d+)", url).group(1))
-        filename_cache = CACHE_DIR_DASHBOARD / f"df{data_id}.pkl"
-        if not filename_cache.exists():
-            return [], "No file"
-        df = pd.read_pickle(filename_cache)
-
-        # Get table of metadata
-        meta_data = pd.DataFrame(rows)
-        try:
-            target_attribute = meta_data[meta_data["Target"] == "true"][
-                "Attribute"
-            ].values[0]
-            target_type = meta_data[meta_data["Target"] == "true"]["DataType"].values[0]
-        except IndexError:
-            return "No target found", "No target found"
+        if "importance" not in job_status["completed"]:
+            if job_status["state"] == "failed":
+                return "Feature importance could not be computed", "No file"
+            raise PreventUpdate
 
         # Feature importance bar plot
-        from category_encoders.target_encoder import TargetEncoder
-
-        x = df.drop(target_attribute, axis=1)
-        y = df[target_attribute]
-
-        te = TargetEncoder()
-        if target_type == "nominal" or target_type == "string":
-            y = pd.Categorical(y).codes
-            x = clean_dataset(x)
-            x = te.fit_transform(x, y)
-            rf = RandomForestClassifier(n_estimators=10, n_jobs=-1)
-            rf.fit(x, y)
-        else:
-            x = clean_dataset(x)
-            x = te.fit_transform(x, y)
-            rf = RandomForestRegressor(n_estimators=10, n_jobs=-1)
-            rf.fit(x, y)
-
-        fi = pd.DataFrame(
-            rf.feature_importances_, index=x.columns, columns=["importance"]
-        )
-        fi = fi.sort_values("importance", ascending=False).reset_index()
+        data_id = int(re.search(r"data/(\d+)", url).group(1))
+        fi = load_feature_importance(data_id, job_status.get("version"))
+        if fi is None:
+            meta_data = load_features(data_id)
+            if not (meta_data["Target"] == "true").any():
+                return "No target found", "No target found"
+            if job_status.get("importance") is False:
+                # The job ran, but the target could not be used
+                return "Feature importance could not be computed", "No file"
+            # Evicted or stored for another version of the dataset, the
+            # resubmitted job updates the page again
+            ensure_dataset_job(data_id)
+            raise PreventUpdate
         trace = go.Bar(y=fi["index"], x=fi["importance"], name="fi", orientation="h")
         layout = go.Layout(
             autosize=False, margin={"l": 100, "t": 0}, height=500, hovermode="closest"
         )
         figure = go.Figure(data=[trace], layout=layout)
+        children = [dcc.Graph(figure=figure)]
+        if fi.attrs.get("mode") == "approximate":
+            note = "Approximation (mutual information on a sample), refining..."
+            children.insert(0, html.P(note, style={"color": "gray"}))
 
-        fi.to_pickle(CACHE_DIR_DASHBOARD / f"fi{data_id}.pkl")
-
-        return html.Div(dcc.Graph(figure=figure), className="twelve columns"), "done"
+        return html.Div(children, className="twelve columns"), "done"
 
     @app.callback(
         Output("matrix", "children"),
         [Input("radio", "value"), Input("url", "pathname"), Input("hidden", "value")],
-        [State("datatable", "data")],
+        [State("job-status", "data")],
     )
     @cache.memoize(timeout=TIMEOUT)
-    def feature_interactions(radio, url, feat_importance, rows):
+    def feature_interactions(radio, url, feat_importance, job_status):
         data_id = int(re.search(r"data/(\d+)", url).group(1))
-        if feat_importance == "done":
-            df = pd.read_pickle(CACHE_DIR_DASHBOARD / f"df{data_id}.pkl")
-            fi = pd.read_pickle(CACHE_DIR_DASHBOARD / f"fi{data_id}.pkl")
-        else:
+        if feat_importance != "done":
             return []
+        fi = load_feature_importance(data_id, job_status.get("version"))
+        if fi is None:
+            # Evicted, the resubmitted job updates the page again
+            ensure_dataset_job(data_id)
+            raise PreventUpdate
 
         # Get meta data
-        meta_data = pd.DataFrame(rows)
-        try:
-            target_attribute = meta_data[meta_data["Target"] == "true"][
-                "Attribute"
-            ].values[0]
-            target_type = meta_data[meta_data["Target"] == "true"]["DataType"].values[0]
-        except IndexError:
+        meta_data = load_features(data_id)
+        if not (meta_data["Target"] == "true").any():
             return "No target found", "No target found"
 
-        if target_type == "nominal" or target_type == "string":
-            y = pd.Categorical(df[target_attribute]).codes
-        else:
-            y = df[target_attribute]
-        # Feature interaction plots
-        df = clean_dataset(df)
-
         # Extract top nominal, top numeric features
         numerical_features = list(
             meta_data["Attribute"][meta_data["DataType"] == "numeric"]
@@ -302,101 +359,47 @@ def register_data_callbacks(app, cache):
         )
         top_numericals = fi["index"][fi["index"].isin(numerical_features)][:4]
         top_nominals = fi["index"][fi["index"].isin(nominal_features)][:4]
-        df["target"] = df[target_attribute]
-
-        # Bin numeric target
-        if target_type == "numeric":
-            # cmap_type = 'seq'
-            df["target_var"] = y
-            df = bin_numeric(df, "target_var", "target")
-            df.drop("bin", axis=1, inplace=True)
-            df.drop("target_var", axis=1)
+
+        # Only the plotted features and the target are needed
+        if radio == "top":
+            features = list(fi["index"][0:4])
+        elif radio == "numeric":
+            features = list(top_numericals)
         else:
-            # cmap_type = 'cat'
-            try:
-                df["target"] = df["target"].astype(int)
-            except ValueError:
-                logger.warning("target not converted to int")
-            df.sort_values(by="target", inplace=True)
-            df["target"] = df["target"].astype(str)
-
-        # Radio - Display top features
+            features = list(top_nominals)
+        df = load_model_matrix(data_id, features + [CLASS_COLUMN])
+        if df is None:
+            # Evicted, the resubmitted job updates the page again
+            ensure_dataset_job(data_id)
+            raise PreventUpdate
+        if CLASS_COLUMN not in df.columns:
+            return []
+        features = [feature for feature in features if feature in df.columns]
+
+        # Rows are sorted by their class (bin of a numeric target), and the
+        # codes only mapped to labels for the plots
+        y = df[CLASS_COLUMN].cat.codes.to_numpy()
+        order = np.argsort(y, kind="stable")
+        df = df.iloc[order]
+        y = y[order]
+        df["target"] = df[CLASS_COLUMN].astype(str)
+
+        # Scatter matrices are drawn from a sample, parallel categories
+        # from the counts of the category combinations
         if radio == "top":
-            top_features = df[fi["index"][0:4].values]
-            top_features["target"] = df["target"]
-
             if len(top_numericals):
-                px_mat = px.scatter_matrix(top_features, color="target", height=800)
-                # C = ['rgb(166,206,227)', 'rgb(31,120,180)', 'rgb(178,223,138)',
-                # 'rgb(51,160,44)', 'rgb(251,154,153)', 'rgb(227,26,28)']
-                # N = len(df['target'].unique())
-                # matrix = ff.create_scatterplotmatrix(top_features, diag='box',
-                #                                      index='target',
-                #                                      title="",
-                #                                      #colormap=C,
-                #                                      colormap_type=cmap_type,
-                #
-                #                                       height=800, width=900)
-                px_mat.update_traces(diagonal_visible=False)
-
-                graph = dcc.Graph(figure=px_mat)
+                figure = scatter_matrix_figure(df, features, y)
             else:
-                d = top_features
-                parcats = [
-                    go.Parcats(
-                        dimensions=[
-                            {"label": column, "values": list(d[column].values)}
-                            for column in d.columns
-                        ],
-                        line={"color": y, "colorscale": "Portland"},
-                        hoveron="color",
-                        hoverinfo="count+probability",
-                        arrangement="freeform",
-                    )
-                ]
-                layout = go.Layout(autosize=False, height=800)
-
-                fig = go.Figure(data=parcats, layout=layout)
-                graph = dcc.Graph(figure=fig)
+                figure = parcats_figure(df, features, y)
+            graph = dcc.Graph(figure=figure)
         elif radio == "numeric":  # Top numeric features
             if len(top_numericals):
-                df_num = df[top_numericals]
-                df_num["target"] = df["target"]
-                px_mat = px.scatter_matrix(df_num, color="target", height=800)
-                # matrix = ff.create_scatterplotmatrix(df_num,  diag='box', #'box'
-                #                                      index='target',
-                #                                      title="",
-                #                                      #colormap=C,
-                #                                      colormap_type=cmap_type,
-                #                                      height=1000, width=900)
-                graph = dcc.Graph(figure=px_mat)
-                px_mat.update_traces(diagonal_visible=False)
+                graph = dcc.Graph(figure=scatter_matrix_figure(df, features, y))
             else:
                 graph = html.P("No numericals found")
         elif radio == "nominal":
             if len(top_nominals):
-                df_nom = df[top_nominals]
-                df_nom["target"] = df["target"]
-
-                parcats = [
-                    go.Parcats(
-                        dimensions=[
-                            {"label": column, "values": list(df_nom[column].values)}
-                            for column in df_nom.columns
-                        ],
-                        line={
-                            "color": pd.Categorical(df_nom["target"]).codes,
-                            "colorscale": "Portland",
-                        },
-                        hoveron="color",
-                        hoverinfo="count+probability",
-                        arrangement="freeform",
-                    )
-                ]
-                layout = go.Layout(autosize=False, height=800)
-
-                fig = go.Figure(data=parcats, layout=layout)
-                graph = dcc.Graph(figure=fig)
+                graph = dcc.Graph(figure=parcats_figure(df, features, y))
             else:
                 graph = html.P("No nominals found")
 
@@ -427,21 +430,13 @@ def register_data_callbacks(app, cache):
         data_id = int(re.search(r"data/(\d+)", url).group(1))
         logger.debug("loading data for scatter plot")
 
-        filename_cache = CACHE_DIR_DASHBOARD / f"df{data_id}.pkl"
-        if not filename_cache.exists():
-            return []
-        df = pd.read_pickle(filename_cache)
+        df = frame_cache.get(data_id, [at1, at2, colorCode])
+        if df is None:
+            # Evicted, the resubmitted job updates the page again
+            ensure_dataset_job(data_id)
+            raise PreventUpdate
         fig = {
-            "data": [
-                go.Scatter(
-                    x=df[df[colorCode] == col][at1],
-                    y=df[df[colorCode] == col][at2],
-                    mode="markers",
-                    marker={"size": 15, "line": {"width": 0.5, "color": "white"}},
-                    name=str(col),
-                )
-                for col in set(df[colorCode])
-            ],
+            "data": scatter_traces(df, at1, at2, colorCode),
             "layout": go.Layout(
                 xaxis={"title": at1, "autorange": True},
                 yaxis={"title": at2, "autorange": True},
@@ -464,6 +459,17 @@ def register_data_callbacks(app, cache):
             return []
 
 
+def feature_table_page(url, page_current, page_size, sort_by, filter_query):
+    """Rows of the current page of the feature table and its page count
+
+    :param url: pathname of the dataset page
+    :param sort_by: ``sort_by`` of the DataTable, a list of column_id/direction
+    :param filter_query: ``filter_query`` of the DataTable
+    """
+    data_id = int(re.search(r"data/(\d+)", url).group(1))
+    return query_features(load_features(data_id), filter_query, sort_by, page_current, page_size)
+
+
 def generate_metric_row(col1, col2):
     return html.Div(
         className="row metric-row",
@@ -478,92 +484,70 @@ def generate_metric_row(col1, col2):
     )
 
 
-def dist_plot(meta_data, attribute, type, radio_value, data_id, show_legend, df):
+def dist_plot(profile, attribute, radio_value, show_legend):
+    """Distribution of an attribute, rendered from the dataset profile
 
-    # Extract target name and type
-    try:
-        target = meta_data[meta_data["Target"] == "true"]["Attribute"].values[0]
-        target_type = meta_data[meta_data["Target"] == "true"]["DataType"].values[0]
-    except IndexError:
+    :param profile: profile of the dataset, see ``data_profile.build_profile``
+    :param attribute: name of the attribute to plot
+    :param radio_value: "target" to color code by target, "solo" otherwise
+    :param show_legend: whether to show the target classes in the legend
+    :return: list of traces
+    """
+    column = profile["columns"][attribute]
+    if column["counts"] is None:
+        return []
+    if profile["target"] is None:
         radio_value = "solo"
 
+    if column["type"] == "numeric":
+        edges = column["edges"]
+        x = (edges[:-1] + edges[1:]) / 2
+        width = edges[1:] - edges[:-1]
+    else:
+        x = column["labels"]
+        width = None
+
     # If we need color code by target
     if radio_value == "target":
-        # Bin numeric target
-        df.sort_values(by=target, inplace=True)
-        if target_type == "numeric":
-            df = bin_numeric(df, target, "target")
-        else:
-            df["target"] = df[target]
-            df["target"] = df["target"].astype(str)
-
-    # Attribute types
-    if type == "numeric":
-        if radio_value == "target":
-            target_vals = list(df["target"].unique())
-            N = len(df["target"].unique())
-            color = ["hsl(" + str(h) + ",80%" + ",50%)" for h in np.linspace(0, 330, N)]
-            data = [
-                go.Histogram(
-                    x=df[attribute][df["target"] == target_vals[i]],
-                    name=str(target_vals[i]),
-                    nbinsx=20,
-                    histfunc="count",
-                    showlegend=show_legend,
-                    marker=dict(
+        target_vals = profile["classes"]
+        N = len(target_vals)
+        color = ["hsl(" + str(h) + ",80%" + ",50%)" for h in np.linspace(0, 330, N)]
+        data = [
+            go.Bar(
+                x=x,
+                y=column["class_counts"][i],
+                width=width,
+                name=target_vals[i],
+                showlegend=show_legend,
+                marker=dict(
+                    color=color[i],
+                    line=dict(
                         color=color[i],
-                        line=dict(
-                            color=color[i],
-                            width=1.5,
-                        ),
-                        cmin=0,
-                        showscale=False,
-                        colorbar=dict(
-                            thickness=20, tickvals=color, ticktext=target_vals
-                        ),
+                        width=1.5,
                     ),
-                )
-                for i in range(int(N))
-            ]
-
-        else:
-            data = [
-                {
-                    "type": "violin",
-                    "showlegend": False,
-                    "x": df[attribute],
-                    "box": {"visible": True},
-                    "line": {"color": "black"},
-                    "meanline": {"visible": True},
-                    "fillcolor": "steelblue",
-                    "name": "",
-                    "opacity": 0.6,
-                    # "x0": attribute
-                }
-            ]
-    # If given attribute is nominal
+                ),
+            )
+            for i in range(N)
+        ]
+    elif column["type"] == "numeric":
+        q0, q1, median, q3, q4 = column["quantiles"]
+        data = [
+            go.Box(
+                q1=[q1],
+                median=[median],
+                q3=[q3],
+                lowerfence=[q0],
+                upperfence=[q4],
+                mean=[column["mean"]],
+                y=[""],
+                orientation="h",
+                showlegend=False,
+                line={"color": "black"},
+                fillcolor="steelblue",
+                opacity=0.6,
+                name="",
+            )
+        ]
     else:
-        if radio_value == "target":
-            target_vals = list(df["target"].unique())
-            N = len(df["target"].unique())
-            color = ["hsl(" + str(h) + ",80%" + ",50%)" for h in np.linspace(0, 330, N)]
-            data = [
-                go.Histogram(
-                    x=(df[attribute][df["target"] == target_vals[i]]),
-                    name=str(target_vals[i]),
-                    showlegend=show_legend,
-                    marker=dict(
-                        color=color[i],
-                        cmin=0,
-                        showscale=False,
-                        colorbar=dict(
-                            thickness=20, tickvals=color, ticktext=target_vals
-                        ),
-                    ),
-                )
-                for i in range(int(N))
-            ]
-
-        else:
-            data = [go.Histogram(x=(df[attribute]), name=attribute, showlegend=False)]
+        data = [go.Bar(x=x, y=column["counts"], name=attribute, showlegend=False)]
     return data
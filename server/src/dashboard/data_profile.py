@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+import scipy.stats
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from .binning import bin_values
+from .caching import profile_path, read_pickle, write_pickle
+
+# Number of equal-width bins of the numeric histograms
+N_BINS = 20
+# Number of bins a numeric target is split into for target based plots
+N_TARGET_BINS = 10
+# Most frequent categories kept in the histograms of nominal attributes
+MAX_CATEGORIES = 100
+# Columns with a larger share of missing values are dropped before plotting
+MAX_MISSING_FRACTION = 0.8
+
+
+def build_profile(df: pd.DataFrame, numerical_features, target=None):
+    """Summarize a dataset so that its distribution plots need no raw rows
+
+    :param df: (subsampled) dataset frame
+    :param numerical_features: names of the numeric attributes,
+        all other attributes are profiled as nominal
+    :param target: name of the target attribute, if any
+    :return: dict with per-column counts, quantiles, histograms, histograms
+        per target class and entropy, and the imputation of missing values
+    """
+    classes, class_codes = [], None
+    if target is not None and target in df.columns:
+        classes, class_codes = _target_classes(df[target], target in numerical_features)
+
+    columns = {}
+    for column in df.columns:
+        if column in numerical_features:
+            columns[column] = _numeric_profile(df[column], class_codes, len(classes))
+        else:
+            columns[column] = _nominal_profile(df[column], class_codes, len(classes))
+    return {
+        "n_rows": len(df),
+        "target": target if class_codes is not None else None,
+        "classes": classes,
+        "columns": columns,
+        "imputation": imputation_values(df),
+    }
+
+
+def imputation_values(df: pd.DataFrame):
+    """Fill values of the columns with missing values
+
+    :return: dict with the columns to "drop" because they are mostly missing,
+        and the "fill" value per other column: the median of numeric and the
+        mode of nominal columns
+    """
+    drop, fill = [], {}
+    for column in df.columns:
+        values = df[column]
+        missing = values.isnull().mean() if len(values) else 0
+        if missing >= MAX_MISSING_FRACTION:
+            drop.append(column)
+        elif missing > 0:
+            if is_numeric_dtype(values) and not is_bool_dtype(values):
+                fill[column] = values.median()
+            else:
+                fill[column] = values.mode().iloc[0]
+    return {"drop": drop, "fill": fill}
+
+
+def apply_statistics(profile, statistics):
+    """Replace sample based values by exact statistics of the full dataset
+
+    :param profile: profile computed on a sample of the dataset
+    :param statistics: dict of ``streaming.ColumnStatistics`` per column
+    """
+    for name, stats in statistics.items():
+        column = profile["columns"].get(name)
+        if column is None:
+            continue
+        column.update(
+            count=stats.count, missing=stats.missing, distinct=stats.distinct.estimate()
+        )
+        if stats.quantiles is not None and column["quantiles"] is not None:
+            column["quantiles"] = stats.quantiles.quantiles([0, 0.25, 0.5, 0.75, 1])
+        if stats.value_counts is not None and len(stats.value_counts):
+            column["entropy"] = round(float(scipy.stats.entropy(stats.value_counts)), 2)
+
+
+def save_profile(profile, data_id: int, version=None):
+    write_pickle(profile, profile_path(data_id), "profile", version)
+
+
+def load_profile(data_id: int):
+    """Load the profile of a dataset, None if it is not computed yet"""
+    return read_pickle(profile_path(data_id), "profile")
+
+
+def _target_classes(target: pd.Series, is_numeric: bool):
+    """Integer class code per row (-1 for missing) and the class labels"""
+    if is_numeric:
+        codes, labels = bin_values(target, N_TARGET_BINS)
+        return labels, codes
+    categorical = pd.Categorical(target)
+    return [str(c) for c in categorical.categories], categorical.codes
+
+
+def _numeric_profile(column: pd.Series, class_codes, n_classes: int):
+    values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    profile = {
+        "type": "numeric",
+        "count": int(present.sum()),
+        "missing": int((~present).sum()),
+        "distinct": int(column.nunique()),
+        "entropy": None,
+    }
+    if not present.any():
+        profile.update(quantiles=None, mean=None, edges=None, counts=None, class_counts=None)
+        return profile
+
+    finite = values[present]
+    counts, edges = np.histogram(finite, bins=N_BINS)
+    profile.update(
+        quantiles=np.quantile(finite, [0, 0.25, 0.5, 0.75, 1]),
+        mean=float(finite.mean()),
+        edges=edges,
+        counts=counts,
+        class_counts=None,
+    )
+    if class_codes is not None:
+        # Bin index of every value, consistent with np.histogram which
+        # includes the right edge in the last bin
+        bins = np.searchsorted(edges, finite, side="right") - 1
+        profile["class_counts"] = _class_counts(
+            class_codes[present], np.clip(bins, 0, N_BINS - 1), n_classes, N_BINS
+        )
+    return profile
+
+
+def _nominal_profile(column: pd.Series, class_codes, n_classes: int):
+    value_counts = column.value_counts()
+    profile = {
+        "type": "nominal",
+        "count": int(value_counts.sum()),
+        "missing": int(column.isnull().sum()),
+        "distinct": len(value_counts[value_counts > 0]),
+        "entropy": round(float(scipy.stats.entropy(value_counts)), 2)
+        if len(value_counts)
+        else None,
+    }
+    value_counts = value_counts[:MAX_CATEGORIES]
+    profile.update(
+        labels=[str(value) for value in value_counts.index],
+        counts=value_counts.to_numpy(),
+        class_counts=None,
+    )
+    if class_codes is not None:
+        # Code -1 for missing values and categories beyond the most frequent
+        codes = pd.Categorical(column, categories=value_counts.index).codes
+        profile["class_counts"] = _class_counts(
+            class_codes, codes, n_classes, len(value_counts)
+        )
+    return profile
+
+
+def _class_counts(class_codes, codes, n_classes: int, n_codes: int):
+    """Counts per target class (rows) and code (columns) in one pass
+
+    Rows where either code is -1 are not counted.
+    """
+    keep = (class_codes >= 0) & (codes >= 0)
+    flat = class_codes[keep].astype(np.int64) * n_codes + codes[keep]
+    return np.bincount(flat, minlength=n_classes * n_codes).reshape(n_classes, n_codes)
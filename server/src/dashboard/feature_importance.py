@@ -0,0 +1,106 @@
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.feature_selection import mutual_info_classif, mutual_info_regression
+
+from . import caching
+from .caching import importance_path, read_pickle, write_pickle
+from .dash_config import APPROXIMATE_IMPORTANCE_ROWS
+from .model_matrix import CLASS_COLUMN
+
+# Modes from least to most accurate
+MODES = ("approximate", "forest")
+
+
+def compute_feature_importance(
+    matrix: pd.DataFrame, meta_features: pd.DataFrame, mode: str = "forest"
+):
+    """Feature importance of all attributes for the target
+
+    :param matrix: model-ready matrix of the dataset, see ``model_matrix``
+    :param meta_features: feature table of the dataset
+    :param mode: "forest" for RandomForest importance on all rows, or
+        "approximate" for mutual information on a bounded sample
+    :return: DataFrame with columns "index" (attribute) and "importance",
+        sorted by importance, or None if the dataset has no target
+    """
+    target = meta_features[meta_features["Target"] == "true"]
+    if target.empty or target["Attribute"].values[0] not in matrix.columns:
+        return None
+    target_attribute = target["Attribute"].values[0]
+    target_type = target["DataType"].values[0]
+    is_classification = target_type == "nominal" or target_type == "string"
+
+    x = matrix.drop([target_attribute, CLASS_COLUMN], axis=1)
+    y = matrix[target_attribute]
+    if mode == "approximate":
+        importance = _mutual_information(x, y, is_classification)
+    else:
+        importance = _forest_importance(x, y, is_classification)
+
+    fi = pd.DataFrame(importance, index=x.columns, columns=["importance"])
+    fi = fi.sort_values("importance", ascending=False).reset_index()
+    fi.attrs["mode"] = mode
+    return fi
+
+
+def _forest_importance(x, y, is_classification):
+    from category_encoders.target_encoder import TargetEncoder
+
+    nominal = [column for column in x.columns if not is_numeric_dtype(x[column])]
+    if is_classification:
+        y = y.cat.codes
+        x = TargetEncoder(cols=nominal).fit_transform(x, y)
+        rf = RandomForestClassifier(n_estimators=10, n_jobs=-1)
+    else:
+        x = TargetEncoder(cols=nominal).fit_transform(x, y)
+        rf = RandomForestRegressor(n_estimators=10, n_jobs=-1)
+    rf.fit(x, y)
+    return rf.feature_importances_
+
+
+def _mutual_information(x, y, is_classification):
+    """Mutual information with the target, normalized to sum to one"""
+    if len(x) > APPROXIMATE_IMPORTANCE_ROWS:
+        x = x.sample(n=APPROXIMATE_IMPORTANCE_ROWS, random_state=0)
+        y = y.loc[x.index]
+
+    discrete = [not is_numeric_dtype(x[column]) for column in x.columns]
+    x = pd.DataFrame(
+        {
+            column: x[column].cat.codes if is_discrete else x[column]
+            for column, is_discrete in zip(x.columns, discrete)
+        }
+    )
+    if is_classification:
+        mi = mutual_info_classif(
+            x, y.cat.codes, discrete_features=discrete, random_state=0
+        )
+    else:
+        mi = mutual_info_regression(x, y, discrete_features=discrete, random_state=0)
+    total = mi.sum()
+    return mi / total if total > 0 else mi
+
+
+def save_feature_importance(fi: pd.DataFrame, data_id: int, version: int):
+    write_pickle(fi, importance_path(data_id, fi.attrs["mode"]), "importance", version)
+
+
+def has_feature_importance(data_id: int, version: int, mode: str = "forest"):
+    name = importance_path(data_id, mode).name
+    return caching.dashboard_cache.lookup(name, "importance", version) is not None
+
+
+def load_feature_importance(data_id: int, version: int):
+    """Load the most accurate stored feature importance of a dataset version
+
+    :param data_id: ID of the OpenML dataset
+    :param version: version of the dataset
+    :return: DataFrame with the mode in ``fi.attrs["mode"]``,
+        or None if it is not computed yet
+    """
+    for mode in reversed(MODES):
+        fi = read_pickle(importance_path(data_id, mode), "importance", version)
+        if fi is not None:
+            return fi
+    return None
@@ -0,0 +1,72 @@
+"""Feature metadata of the dataset descriptions, stored per dataset version
+
+Building the feature table from the ``OpenMLDataFeature`` objects of a
+dataset with tens of thousands of features is slow, and every dataset page
+needs it twice (the layout and the precomputation). The table is built
+once per dataset version and stored compactly in Feather: data types and
+the target flag are integer coded, and the number of categories is
+counted when building. Loading it only decodes these columns.
+"""
+import numpy as np
+import pandas as pd
+
+from . import caching
+from .caching import feature_metadata_path, read_cached
+from .formats import FORMATS
+
+# Data types of OpenML features, stored by their position
+DATA_TYPES = ("numeric", "nominal", "string", "date")
+STORAGE_FORMAT = FORMATS["feather-lz4"]
+
+
+def build_feature_metadata(data) -> pd.DataFrame:
+    """Compact feature table of an ``OpenMLDataset``
+
+    :return: DataFrame with the columns name, data_type (code in
+        ``DATA_TYPES``), missing, categories (-1 for non-nominal features)
+        and target, the target first
+    """
+    features = data.features.values()
+    table = pd.DataFrame(
+        {
+            "name": [f.name for f in features],
+            "data_type": pd.Categorical(
+                [f.data_type for f in features], categories=DATA_TYPES
+            ).codes.astype(np.int8),
+            "missing": np.array([f.number_missing_values for f in features], dtype=np.int64),
+            "categories": np.array(
+                [-1 if f.nominal_values is None else len(f.nominal_values) for f in features],
+                dtype=np.int32,
+            ),
+        }
+    )
+    table["target"] = table["name"] == data.default_target_attribute
+    return table.sort_values("target", ascending=False, kind="stable", ignore_index=True)
+
+
+def save_feature_metadata(table: pd.DataFrame, data_id: int, version):
+    name = feature_metadata_path(data_id).name
+    with caching.dashboard_cache.writing(name, "features", version, STORAGE_FORMAT.name) as tmp:
+        STORAGE_FORMAT.write(table, tmp)
+
+
+def load_feature_metadata(data_id: int, version):
+    """Stored feature table of a dataset version, None if it is not stored"""
+    return read_cached(feature_metadata_path(data_id), "features", version)
+
+
+def display_features(table: pd.DataFrame) -> pd.DataFrame:
+    """Feature table of the dataset page, with the feature id of every row"""
+    categories = table["categories"]
+    return pd.DataFrame(
+        {
+            "Attribute": table["name"],
+            # Unknown data types (-1) are shown empty
+            "DataType": np.asarray(DATA_TYPES + ("",), dtype=object)[table["data_type"]],
+            "Missing values": table["missing"],
+            "# categories": categories.astype(str).where(categories >= 0, " "),
+            "Target": np.where(table["target"], "true", "false"),
+            # Row id of the feature table, kept when features are filtered out
+            "id": np.arange(len(table)),
+        }
+    )
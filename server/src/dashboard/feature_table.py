@@ -0,0 +1,132 @@
+"""Server-side paging, sorting and filtering of the feature table
+
+Datasets can have tens of thousands of features, so the feature table of a
+dataset page is not embedded in the layout. The browser requests the
+visible page, and this module sorts and filters the stored feature table
+of the dataset with the query of the ``DataTable``. Every feature has a
+stable integer "id" (its position in the full table), which is also the
+row id of the ``DataTable``, so selected rows are found again whatever
+the sorting and filtering.
+"""
+import math
+import re
+
+import pandas as pd
+
+from .dash_config import FEATURE_PAGE_SIZE
+from .helpers import get_metadata, load_data_metadata
+
+# Operators of the DataTable filter syntax and their aliases
+OPERATORS = {
+    ">=": ">=",
+    "<=": "<=",
+    "!=": "!=",
+    ">": ">",
+    "<": "<",
+    "=": "=",
+    "ge": ">=",
+    "le": "<=",
+    "ne": "!=",
+    "gt": ">",
+    "lt": "<",
+    "eq": "=",
+    "contains": "contains",
+    "datestartswith": "datestartswith",
+}
+FILTER_PART = re.compile(
+    r"^\{(?P<column>[^}]*)\}\s*(?P<operator>"
+    + "|".join(re.escape(symbol) for symbol in OPERATORS)
+    + r")\s*(?P<value>.*)$"
+)
+
+
+def load_features(data_id: int) -> pd.DataFrame:
+    """Feature table of a dataset, with entropy once the dataset is processed"""
+    metadata = load_data_metadata(data_id)
+    if metadata is not None:
+        features = metadata[0]
+    else:
+        features, _, _ = get_metadata(data_id)
+        features = features.assign(Target=features["Target"].replace({"false": " "}))
+    return features
+
+
+def query_features(
+    features: pd.DataFrame,
+    filter_query: str = "",
+    sort_by=None,
+    page_current: int = 0,
+    page_size: int = FEATURE_PAGE_SIZE,
+):
+    """One page of the filtered and sorted feature table
+
+    :param filter_query: ``filter_query`` of the DataTable, parts joined by "&&"
+    :param sort_by: ``sort_by`` of the DataTable, list of dicts with
+        "column_id" and "direction"
+    :return: records of the page and the number of pages
+    """
+    for column, operator, value in _filter_parts(filter_query or ""):
+        if column in features.columns:
+            features = features[_match(features[column], operator, value)]
+
+    for sort in reversed(sort_by or []):
+        if sort["column_id"] in features.columns:
+            features = features.sort_values(
+                sort["column_id"],
+                ascending=sort["direction"] == "asc",
+                kind="stable",
+                key=_sort_key,
+            )
+
+    page_count = max(1, math.ceil(len(features) / page_size))
+    start = (page_current or 0) * page_size
+    return features.iloc[start:start + page_size].to_dict("records"), page_count
+
+
+def _filter_parts(filter_query: str):
+    """(column, operator, value) of every part of a DataTable filter query"""
+    for part in filter_query.split(" && "):
+        match = FILTER_PART.match(part.strip())
+        if match is None:
+            continue
+        operator = OPERATORS[match["operator"]]
+        value = match["value"].strip()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'`":
+            value = value[1:-1].replace("\\" + value[0], value[0])
+        yield match["column"], operator, value
+
+
+def _match(column: pd.Series, operator: str, value: str):
+    if operator == "contains":
+        return column.astype(str).str.contains(value, case=False, regex=False)
+    if operator == "datestartswith":
+        return column.astype(str).str.startswith(value)
+
+    number = pd.to_numeric(pd.Series([value]), errors="coerce")[0]
+    if pd.isnull(number):
+        # Compare as text
+        column, number = column.astype(str), value
+    else:
+        column = pd.to_numeric(column, errors="coerce")
+    if operator == "=":
+        return column == number
+    if operator == "!=":
+        return column != number
+    if operator == ">":
+        return column > number
+    if operator == ">=":
+        return column >= number
+    if operator == "<":
+        return column < number
+    return column <= number
+
+
+def _sort_key(column: pd.Series):
+    # Columns mix numbers with " " for features without a value, those
+    # sort last. Columns with any other text, e.g. attribute names of which
+    # only some look like numbers, sort as text.
+    numeric = pd.to_numeric(column, errors="coerce")
+    empty = column.isnull() | (column.astype(str).str.strip() == "")
+    if numeric.notnull().any() and numeric[~empty].notnull().all():
+        return numeric
+    return column.astype(str)
@@ -0,0 +1,289 @@
+"""File formats of cached dataset frames and the policy that picks one
+
+Frames are stored as Parquet (with column statistics) or Feather/Arrow,
+uncompressed or compressed. Both are columnar, so callbacks reading a few
+columns only touch those. Which format is best depends on the shape of the
+frame, so the policy maps shape buckets to formats. The defaults come from
+the benchmark harness in this module, which measures write and load times
+(full and column subsets, like the callbacks read them) and file sizes::
+
+    python -m server.src.dashboard.formats --output ~/.cache/openml/format_policy.json
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Upper bounds of the row and column buckets, the last bucket is unbounded
+ROW_BUCKETS = (10_000, 100_000, 1_000_000)
+COLUMN_BUCKETS = (100, 1000)
+# Rows per Parquet row group, each with its own column statistics
+ROW_GROUP_ROWS = 128 * 1024
+
+# Share of reads that load a few columns rather than the whole frame
+SUBSET_WEIGHT = 0.8
+# Seconds of load time one gigabyte of disk space is worth
+SECONDS_PER_GB = 1.0
+# Largest frame the benchmark harness writes by default
+MAX_BENCHMARK_CELLS = 20_000_000
+
+PARQUET_MAGIC = b"PAR1"
+ARROW_MAGIC = b"ARROW1"
+
+
+class Format:
+    def __init__(self, name: str, container: str, compression: str):
+        self.name = name
+        self.container = container
+        self.compression = compression
+
+    def write(self, df: pd.DataFrame, path):
+        df = densify(df)
+        if self.container == "parquet":
+            df.to_parquet(
+                path,
+                index=False,
+                compression=self.compression,
+                write_statistics=True,
+                row_group_size=ROW_GROUP_ROWS,
+            )
+        else:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # One record batch, so every column is contiguous in the file
+            feather.write_feather(
+                table, path, compression=self.compression, chunksize=max(1, len(table))
+            )
+
+    @property
+    def openml_cache_format(self):
+        """Closest ``cache_format`` of ``openml.datasets.get_dataset``"""
+        return "feather" if self.container == "feather" else "pickle"
+
+    def __repr__(self):
+        return f"Format({self.name})"
+
+
+FORMATS = {
+    f.name: f
+    for f in (
+        Format("parquet-snappy", "parquet", "snappy"),
+        Format("parquet-zstd", "parquet", "zstd"),
+        Format("feather", "feather", "uncompressed"),
+        Format("feather-lz4", "feather", "lz4"),
+        Format("feather-zstd", "feather", "zstd"),
+    )
+}
+
+
+def densify(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame with its sparse columns made dense, Arrow has no sparse type
+
+    openml returns sparse datasets with ``SparseDtype`` columns.
+    """
+    sparse = [i for i, dtype in enumerate(df.dtypes) if isinstance(dtype, pd.SparseDtype)]
+    if not sparse:
+        return df
+    df = df.copy(deep=False)
+    for i in sparse:
+        df.isetitem(i, df.iloc[:, i].sparse.to_dense())
+    return df
+
+
+def container(path) -> str:
+    """Container of a frame file ("parquet" or "feather"), from its magic bytes"""
+    with open(path, "rb") as fh:
+        head = fh.read(len(ARROW_MAGIC))
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if head == ARROW_MAGIC:
+        return "feather"
+    raise ValueError(f"{path} is neither a Parquet nor a Feather file")
+
+
+def read_frame(path, columns=None) -> pd.DataFrame:
+    """Read (a subset of the columns of) a frame written in any format"""
+    if columns is not None:
+        # Duplicate names are rejected, e.g. the same attribute on both axes
+        columns = list(dict.fromkeys(columns))
+    if container(path) == "parquet":
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def map_frame(path, columns=None) -> pd.DataFrame:
+    """Read (a subset of the columns of) an uncompressed Feather frame without copying
+
+    Numeric columns and the codes of categorical columns are views of the
+    memory-mapped file, so they are read-only. Categories, strings and
+    columns of files with several record batches are still copied.
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(columns))
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def read_columns(path):
+    """Column names of a frame file, read from its metadata only"""
+    if container(path) == "parquet":
+        return pq.read_schema(path).names
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def shape_bucket(n_rows: int, n_columns: int) -> str:
+    row = int(np.searchsorted(ROW_BUCKETS, n_rows, side="right"))
+    column = int(np.searchsorted(COLUMN_BUCKETS, n_columns, side="right"))
+    return f"r{row}c{column}"
+
+
+class FormatPolicy:
+    """Format per shape bucket, from a benchmark result file if present
+
+    :param path: JSON file mapping buckets to format names
+    :param default: name of the format of all frames, or "auto" to choose
+        by shape
+    """
+
+    # Result of the benchmark harness with its default MAX_BENCHMARK_CELLS,
+    # buckets of larger frames follow the trend towards compressed Parquet
+    DEFAULTS = {
+        "r0c0": "feather-lz4",
+        "r0c1": "feather",
+        "r0c2": "feather",
+        "r1c0": "feather-lz4",
+        "r1c1": "feather-lz4",
+        "r1c2": "feather-lz4",
+        "r2c0": "parquet-snappy",
+        "r2c1": "parquet-zstd",
+        "r2c2": "parquet-zstd",
+        "r3c0": "parquet-zstd",
+        "r3c1": "parquet-zstd",
+        "r3c2": "parquet-zstd",
+    }
+
+    def __init__(self, path, default: str = "auto"):
+        self.path = Path(path)
+        self.default = default
+        self._policy = None
+
+    def choose(self, n_rows: int, n_columns: int) -> Format:
+        if self.default != "auto":
+            return FORMATS[self.default]
+        if self._policy is None:
+            self._policy = dict(self.DEFAULTS)
+            if self.path.exists():
+                with open(self.path) as fh:
+                    self._policy.update(json.load(fh))
+        return FORMATS[self._policy[shape_bucket(n_rows, n_columns)]]
+
+
+def benchmark_frame(df: pd.DataFrame, directory, repeat: int = 3, subset_columns: int = 3):
+    """Measure every format on a frame
+
+    :param directory: where the files are written
+    :param subset_columns: columns read by the column subset loads
+    :return: DataFrame with write, full load and subset load seconds,
+        size in bytes and the resulting cost per format
+    """
+    rng = np.random.default_rng(0)
+    results = []
+    for name, fmt in FORMATS.items():
+        path = Path(directory) / f"benchmark.{name}"
+        start = time.perf_counter()
+        fmt.write(df, path)
+        write = time.perf_counter() - start
+        full, subset = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            read_frame(path)
+            full.append(time.perf_counter() - start)
+            columns = rng.choice(df.columns, min(subset_columns, df.shape[1]), replace=False)
+            start = time.perf_counter()
+            read_frame(path, list(columns))
+            subset.append(time.perf_counter() - start)
+        results.append(
+            {
+                "format": name,
+                "write": write,
+                "full": min(full),
+                "subset": min(subset),
+                "bytes": path.stat().st_size,
+            }
+        )
+        path.unlink()
+    results = pd.DataFrame(results).set_index("format")
+    results["cost"] = (
+        SUBSET_WEIGHT * results["subset"]
+        + (1 - SUBSET_WEIGHT) * results["full"]
+        + SECONDS_PER_GB * results["bytes"] / 1024 ** 3
+    )
+    return results.sort_values("cost")
+
+
+def synthetic_frame(n_rows: int, n_columns: int, seed: int = 0):
+    """Frame with the mix of numeric and nominal columns of a typical dataset"""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for i in range(n_columns):
+        if i % 4 == 3:
+            columns[f"nominal{i}"] = pd.Categorical(
+                rng.choice([f"value{v}" for v in range(rng.integers(2, 50))], n_rows)
+            )
+        elif i % 4 == 2:
+            columns[f"int{i}"] = rng.integers(0, 100, n_rows)
+        else:
+            columns[f"float{i}"] = rng.normal(size=n_rows).round(3)
+    return pd.DataFrame(columns)
+
+
+def representative_shapes(max_cells: int):
+    """One shape per bucket, the middle of the bucket capped at ``max_cells``
+
+    Buckets whose smallest frame exceeds ``max_cells`` are skipped.
+    """
+    row_edges = (1_000,) + ROW_BUCKETS + (ROW_BUCKETS[-1] * 10,)
+    column_edges = (10,) + COLUMN_BUCKETS + (COLUMN_BUCKETS[-1] * 5,)
+    for i in range(len(ROW_BUCKETS) + 1):
+        for j in range(len(COLUMN_BUCKETS) + 1):
+            if row_edges[i] * column_edges[j] > max_cells:
+                continue
+            n_columns = int(np.sqrt(column_edges[j] * column_edges[j + 1]))
+            n_rows = int(np.sqrt(row_edges[i] * row_edges[i + 1]))
+            n_rows = max(row_edges[i], min(n_rows, max_cells // n_columns))
+            yield f"r{i}c{j}", n_rows, n_columns
+
+
+def main(argv=None):
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Benchmark the frame formats")
+    parser.add_argument("--output", type=Path, help="write the policy to this JSON file")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-cells", type=int, default=MAX_BENCHMARK_CELLS,
+                        help="cap on the rows times columns of the benchmark frames")
+    args = parser.parse_args(argv)
+
+    policy = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for bucket, n_rows, n_columns in representative_shapes(args.max_cells):
+            results = benchmark_frame(
+                synthetic_frame(n_rows, n_columns), directory, repeat=args.repeat
+            )
+            policy[bucket] = results.index[0]
+            print(f"{bucket}: {n_rows} x {n_columns}")
+            print(results.round(4), end="\n\n")
+    print(json.dumps(policy, indent=2))
+    if args.output is not None:
+        with open(args.output, "w") as fh:
+            json.dump(policy, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .caching import cached_frame_path, frame_columns, load_frame
+from .dash_config import FRAME_CACHE_BYTES
+
+
+class _Entry:
+    def __init__(self, mtime):
+        self.mtime = mtime
+        self.columns = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+class FrameCache:
+    """In-process LRU cache of dataset frames shared by the data callbacks
+
+    Frames are cached column by column, so a callback that needs two columns
+    only reads those two from disk, and a later callback needing the same
+    columns is served from memory. Least recently used datasets are evicted
+    once the cached columns exceed ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def get(self, data_id: int, columns=None):
+        """Get (a subset of the columns of) the cached frame of a dataset
+
+        :param data_id: ID of the OpenML dataset
+        :param columns: names of the columns to return, all columns if None
+        :return: DataFrame which may be modified by the caller,
+            or None if the dataset is not cached on disk
+        """
+        path = cached_frame_path(data_id)
+        try:
+            if path is None:
+                raise FileNotFoundError(data_id)
+            mtime = path.stat().st_mtime_ns
+            if columns is None:
+                columns = frame_columns(data_id)
+        except FileNotFoundError:
+            # Not cached, outdated or evicted by another worker
+            self.invalidate(data_id)
+            return None
+        columns = list(dict.fromkeys(columns))
+
+        with self._lock:
+            entry = self._entries.get(data_id)
+            if entry is None or entry.mtime != mtime:
+                # Frame was (re)written, possibly by another worker
+                entry = _Entry(mtime)
+                self._entries[data_id] = entry
+            self._entries.move_to_end(data_id)
+            missing = [column for column in columns if column not in entry.columns]
+            if missing:
+                entry.misses += 1
+            else:
+                entry.hits += 1
+                return pd.DataFrame({column: entry.columns[column] for column in columns})
+
+        loaded = load_frame(data_id, missing)
+        if loaded is None:
+            return None
+
+        with self._lock:
+            for column in missing:
+                if column not in entry.columns:
+                    entry.columns[column] = loaded[column]
+                    entry.nbytes += int(loaded[column].memory_usage(deep=True))
+            result = pd.DataFrame({column: entry.columns[column] for column in columns})
+            self._evict()
+        return result
+
+    def invalidate(self, data_id: int):
+        with self._lock:
+            self._entries.pop(data_id, None)
+
+    def stats(self):
+        """Hit/miss counters and size of every cached dataset, most recent last"""
+        with self._lock:
+            return {
+                data_id: {
+                    "hits": entry.hits,
+                    "misses": entry.misses,
+                    "nbytes": entry.nbytes,
+                }
+                for data_id, entry in self._entries.items()
+            }
+
+    def _evict(self):
+        # Keep the most recently used dataset, even if it exceeds the budget
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            self._entries.popitem(last=False)
+
+
+frame_cache = FrameCache(FRAME_CACHE_BYTES)
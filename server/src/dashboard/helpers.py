@@ -2,165 +2,212 @@ import logging
 import time
 from contextlib import contextmanager
 
-import numpy as np
 import pandas as pd
-import scipy.stats
 from openml import datasets, runs
-from sklearn.model_selection import train_test_split
 
-from server.src.dashboard.caching import CACHE_DIR_DASHBOARD
+from server.src.dashboard.caching import (
+    frame_format,
+    metadata_path,
+    read_pickle,
+    save_frame,
+    write_pickle,
+)
+from server.src.dashboard.data_profile import (
+    apply_statistics,
+    build_profile,
+    imputation_values,
+    save_profile,
+)
+from server.src.dashboard.feature_metadata import (
+    build_feature_metadata,
+    display_features,
+    load_feature_metadata,
+    save_feature_metadata,
+)
+from server.src.dashboard.run_cache import (
+    build_run_entry,
+    evaluations_table,
+    is_fresh,
+    is_stale,
+    load_run,
+    save_run,
+)
+from server.src.dashboard.sampling import (
+    is_sampled,
+    load_sample_rows,
+    sample_seed,
+    sample_size,
+    save_sample_rows,
+)
+from server.src.dashboard.singleflight import single_flight
+from server.src.dashboard.streaming import stream_dataset
 
 logger = logging.getLogger("dashboard")
 logger.setLevel(logging.DEBUG)
 
 
 def get_run_df(run_id: int):
-    run = runs.get_run(int(run_id), ignore_cache=True)
-    df = pd.DataFrame(run.fold_evaluations.items(), columns=["evaluations", "results"])
-    # Evaluations table
-    result_list = []
-    result_string = []
-    for result in df["results"]:
-        k_folds = list(result[0].values())
-        mean = str(np.round(np.mean(np.array(k_folds)), 3))
-        std = str(np.round(np.std(np.array(k_folds)), 3))
-        result_list.append(k_folds)
-        result_string.append(mean + " \u00B1 " + std)
-    df.drop(["results"], axis=1, inplace=True)
-    df["results"] = result_list
-    df["values"] = result_string
-    # Add some more rows indicating output prediction file name
-    df2 = pd.DataFrame(run.output_files.items(), columns=["evaluations", "results"])
-    df2["values"] = ""
-    df3 = pd.DataFrame(
-        {"task_type": run.task_type}.items(), columns=["evaluations", "results"]
-    )
-    df2["values"] = ""
-    df = pd.concat([df2, df3], ignore_index=True)
-    df.to_pickle(CACHE_DIR_DASHBOARD / f"run{run_id}.pkl")
-    return run, df
-
+    """Stored run and its evaluations table, fetched if missing or stale
 
-def clean_dataset(df):
+    Concurrent requests for the same run share one download.
 
-    df = df.loc[:, df.isnull().mean() < 0.8]
-    out = df.fillna(df.mode().iloc[0])
+    :return: stored run (see ``run_cache.build_run_entry``) and the table of
+        the run page
+    """
+    entry = load_run(run_id)
+    if entry is None or is_stale(entry):
+        refresh = entry is not None
+        entry = single_flight.do(
+            f"run{run_id}",
+            lambda: _fetch_run(run_id, refresh),
+            load=lambda: _load_fresh_run(run_id),
+        )
+    return entry, evaluations_table(entry)
+
+
+def _load_fresh_run(run_id):
+    # Reuse a run fetched by another request in the meantime
+    entry = load_run(run_id)
+    if entry is None or not is_fresh(entry):
+        return None
+    return entry
+
+
+def _fetch_run(run_id, refresh):
+    # The run description cached by openml is only trusted if it is evaluated
+    run = runs.get_run(int(run_id), ignore_cache=refresh)
+    if not refresh and not run.fold_evaluations and not run.evaluations:
+        run = runs.get_run(int(run_id), ignore_cache=True)
+    entry = build_run_entry(run)
+    save_run(entry)
+    return entry
+
+
+def clean_dataset(df, imputation=None):
+    """Drop mostly missing columns and fill the missing values of the others
+
+    :param imputation: fill values of ``imputation_values``, as stored in the
+        dataset profile, computed from ``df`` if not given
+    :return: frame sharing the data of the columns without missing values
+    """
+    if imputation is None:
+        imputation = imputation_values(df)
+    out = df.copy(deep=False)
+    for column in imputation["drop"]:
+        if column in out.columns:
+            del out[column]
+    for column, value in imputation["fill"].items():
+        if column in out.columns and out[column].hasnans:
+            out[column] = out[column].fillna(value)
     return out
 
 
 def get_metadata(data_id: int):
-    data = datasets.get_dataset(data_id, download_data=False)
-    features = pd.DataFrame(
-        [vars(data.features[i]) for i in range(0, len(data.features))]
-    )
-    is_target = [
-        "true" if name == data.default_target_attribute else "false"
-        for name in features["name"]
-    ]
-    features["Target"] = is_target
+    """Feature table, description and name of a dataset
 
-    # Extract #categories
-    size = [
-        str(len(value)) if value is not None else " "
-        for value in features["nominal_values"]
-    ]
-    features["nominal_values"].replace({None: " "}, inplace=True)
-    features["# categories"] = size
-
-    # choose features to be displayed
-    meta_features = features[
-        ["name", "data_type", "number_missing_values", "# categories", "Target"]
-    ]
-    meta_features.rename(
-        columns={
-            "name": "Attribute",
-            "data_type": "DataType",
-            "number_missing_values": "Missing values",
-        },
-        inplace=True,
+    The feature table is built from the feature descriptions once per
+    dataset version and then loaded from the dashboard cache.
+    """
+    data = datasets.get_dataset(
+        data_id, download_data=False, download_features_meta_data=False
     )
-    meta_features.sort_values(by="Target", ascending=False, inplace=True)
-    if meta_features.shape[0] > 1000:
-        meta_features = meta_features[:1000]
-    return meta_features, data, (vars(data)["name"])
+    table = load_feature_metadata(data_id, data.version)
+    if table is None:
+        table = build_feature_metadata(data)
+        save_feature_metadata(table, data_id, data.version)
+    return display_features(table), data, data.name
 
 
 def get_data_metadata(data_id):
     """Download the dataset and get metadata
 
     :param data_id: ID of the OpenML dataset
-    :return:
+    :return: frame, feature table, numerical and nominal features, and the
+        version of the dataset
     """
-    # Get data in pandas df format
-    import time
-
     start = time.time()
     meta_features, data, _ = get_metadata(data_id)
-
-    x, y, categorical, attribute_names = data.get_data()
-
-    df = pd.DataFrame(x, columns=attribute_names)
-    if x.shape[0] >= 50000:
-        # create a subsample of data for large datasets
-        try:
-            target_feat = meta_features[meta_features["Target"] == "true"][
-                "Attribute"
-            ].values[0]
-        except IndexError:
-            target_feat = None
-            pass
-
-        if x.shape[0] >= 50000 and target_feat:
-            df = clean_dataset(df)
-            if x.shape[0] < 100000:
-                sample_size = 0.5
-            elif 100000 <= x.shape[0] < 500000:
-                sample_size = 0.25
-            elif 500000 <= x.shape[0] < 1e6:
-                sample_size = 0.1
-            else:
-                sample_size = 0.05
-            x = df.drop(target_feat, axis=1)
-            y = df[target_feat]
-            try:
-                X_train, X_test, y_train, y_test = train_test_split(
-                    x, y, stratify=y, test_size=sample_size
-                )
-            except ValueError:
-                X_train, X_test, y_train, y_test = train_test_split(
-                    x, y, stratify=None, test_size=sample_size
-                )
-
-            x = X_test
-            x[target_feat] = y_test
-            df = pd.DataFrame(x, columns=attribute_names)
-    df.to_pickle(CACHE_DIR_DASHBOARD / f"df{data_id}.pkl")
+    try:
+        target_feat = meta_features[meta_features["Target"] == "true"][
+            "Attribute"
+        ].values[0]
+    except IndexError:
+        target_feat = None
+
+    n_rows = int((data.qualities or {}).get("NumberOfInstances", 0))
+    statistics = None
+    if is_sampled(n_rows):
+        # Large datasets are read in batches and only a sample is kept in memory
+        n_columns = int(data.qualities.get("NumberOfFeatures", len(meta_features)))
+        data = datasets.get_dataset(
+            data_id,
+            download_data=True,
+            cache_format=frame_format.choose(n_rows, n_columns).openml_cache_format,
+        )
+        numerical = meta_features["Attribute"][meta_features["DataType"] == "numeric"]
+        nominal = meta_features["Attribute"][meta_features["DataType"] == "nominal"]
+        rows = load_sample_rows(data_id, data.version)
+        df, statistics = stream_dataset(
+            data,
+            set(numerical),
+            set(nominal),
+            target_feat,
+            sample_size=sample_size(n_rows),
+            n_rows=n_rows,
+            seed=sample_seed(data_id, data.version),
+            rows=rows,
+        )
+        if rows is None:
+            save_sample_rows(df.index, data_id, data.version)
+        df = clean_dataset(df)
+    else:
+        x, y, categorical, attribute_names = data.get_data()
+        df = pd.DataFrame(x, columns=attribute_names)
+    save_frame(df, data_id, data.version)
 
     meta_features = meta_features[
         meta_features["Attribute"].isin(pd.Series(df.columns))
     ]
 
-    # Add entropy
     numerical_features = list(
         meta_features["Attribute"][meta_features["DataType"] == "numeric"]
     )
     nominal_features = list(
         meta_features["Attribute"][meta_features["DataType"] == "nominal"]
     )
-    entropy = []
-
-    for column in meta_features["Attribute"]:
-        if column in nominal_features:
-            count = df[column].value_counts()
-            ent = round(scipy.stats.entropy(count), 2)
-            entropy.append(ent)
-        else:
-            entropy.append(" ")
-    meta_features["Entropy"] = entropy
+    target = meta_features["Attribute"][meta_features["Target"] == "true"].values
+    profile = build_profile(
+        df, numerical_features, target=target[0] if len(target) else None
+    )
+    if statistics is not None:
+        apply_statistics(profile, statistics)
+    save_profile(profile, data_id, data.version)
+
+    # Add entropy
+    meta_features["Entropy"] = [
+        profile["columns"][column]["entropy"] if column in nominal_features else " "
+        for column in meta_features["Attribute"]
+    ]
     meta_features["Target"].replace({"false": " "}, inplace=True)
+    write_pickle(
+        (meta_features, numerical_features, nominal_features),
+        metadata_path(data_id),
+        "metadata",
+        data.version,
+    )
     end = time.time()
     logger.debug("time taken download data and find entropy " + str(end - start))
-    return df, meta_features, numerical_features, nominal_features
+    return df, meta_features, numerical_features, nominal_features, data.version
+
+
+def load_data_metadata(data_id):
+    """Load the feature table stored by ``get_data_metadata``
+
+    :param data_id: ID of the OpenML dataset
+    :return: meta_features, numerical_features, nominal_features,
+        or None if the dataset is not processed yet
+    """
+    return read_pickle(metadata_path(data_id), "metadata")
 
 
 def splitDataFrameList(df, target_column):
@@ -190,14 +237,3 @@ def print_duration(name: str):
     start = time.time()
     yield
     print(f"{name}: {time.time() - start:.3f}s")
-
-
-def bin_numeric(df, column_name, output_name):
-    df[output_name] = pd.cut(df[column_name], 1000).astype(str)
-    cat = df[output_name].str.extract(r"\((.*),", expand=False).astype(float)
-    df["bin"] = pd.Series(cat)
-    df.sort_values(by="bin", inplace=True)
-    df[output_name] = df[output_name].str.replace(",", " -")
-    df[output_name] = df[output_name].str.replace("(", "")
-    df[output_name] = df[output_name].str.replace("]", "")
-    return df
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objs as go
+
+from .dash_config import INTERACTION_ROWS
+
+
+def stratified_rows(codes, n_rows: int, seed: int = 0):
+    """Positions of a stratified sample of at most about ``n_rows`` rows
+
+    Every class keeps its share of the rows, and at least one row. The
+    sample is the same for the same codes, and in the original row order.
+
+    :param codes: integer class code per row
+    """
+    codes = np.asarray(codes)
+    if len(codes) <= n_rows:
+        return np.arange(len(codes))
+    _, codes = np.unique(codes, return_inverse=True)
+    counts = np.bincount(codes)
+    quota = np.maximum(1, np.round(counts * n_rows / len(codes))).astype(int)
+    # Shuffled rows, grouped by class, are ranked within their class
+    order = np.random.default_rng(seed).permutation(len(codes))
+    order = order[np.argsort(codes[order], kind="stable")]
+    rank = np.arange(len(codes)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.sort(order[rank < quota[codes[order]]])
+
+
+def scatter_matrix_figure(df: pd.DataFrame, dimensions, target_codes):
+    """Scatter matrix of numeric attributes on a bounded stratified sample
+
+    Every row becomes a marker in every panel, so the figure is drawn from
+    at most ``INTERACTION_ROWS`` rows rather than the whole frame.
+
+    :param df: frame with the attributes and a "target" label column
+    :param target_codes: integer code of the target of every row
+    """
+    rows = stratified_rows(target_codes, INTERACTION_ROWS)
+    sample = df.iloc[rows]
+    fig = px.scatter_matrix(
+        sample, dimensions=list(dimensions), color="target", height=800
+    )
+    fig.update_traces(diagonal_visible=False)
+    if len(rows) < len(df):
+        fig.update_layout(title=f"Sample of {len(rows)} of {len(df)} rows")
+    return fig
+
+
+def parcats_figure(df: pd.DataFrame, dimensions, target_codes):
+    """Parallel categories of nominal attributes and the target
+
+    The figure gets one path per combination of categories with its count,
+    instead of one path per row.
+
+    :param df: frame with the attributes and a "target" label column
+    :param target_codes: integer code of the target of every row, colors
+        the paths
+    """
+    columns = list(dimensions) + ["target"]
+    combinations = (
+        df[columns]
+        .astype(str)
+        .assign(_code=np.asarray(target_codes))
+        .groupby(columns + ["_code"], sort=False)
+        .size()
+        .reset_index(name="_count")
+    )
+    parcats = go.Parcats(
+        dimensions=[
+            {"label": column, "values": combinations[column]} for column in columns
+        ],
+        counts=combinations["_count"],
+        line={"color": combinations["_code"], "colorscale": "Portland"},
+        hoveron="color",
+        hoverinfo="count+probability",
+        arrangement="freeform",
+    )
+    return go.Figure(data=[parcats], layout=go.Layout(autosize=False, height=800))
@@ -0,0 +1,233 @@
+"""Background precomputation of dataset pages
+
+Downloading a dataset, profiling it and fitting the feature importance
+forest run in a process pool instead of on the web worker thread. The
+state of every job is kept in a small JSON file in the dashboard cache,
+so all web workers see the same state, jobs for a dataset are only
+submitted once, and no external broker is needed.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import openml
+
+from . import caching
+from .caching import (
+    CACHE_DIR_DASHBOARD,
+    feature_metadata_path,
+    frame_path,
+    metadata_path,
+    model_matrix_path,
+    profile_path,
+)
+from .dash_config import JOB_TIMEOUT, PRECOMPUTE_EXECUTOR, PRECOMPUTE_WORKERS
+from .singleflight import single_flight
+
+logger = logging.getLogger("dashboard")
+
+JOBS_DIR = CACHE_DIR_DASHBOARD / "jobs"
+# Cache files of a dataset the data page reads, and their kinds
+RESULTS = (
+    (frame_path, "frame"),
+    (profile_path, "profile"),
+    (metadata_path, "metadata"),
+    (feature_metadata_path, "features"),
+    (model_matrix_path, "matrix"),
+)
+
+_executor = None
+_lock = threading.Lock()
+_futures = {}
+
+
+def status_path(data_id: int):
+    return JOBS_DIR / f"data{data_id}.json"
+
+
+def read_status(data_id: int):
+    """State of the precompute job of a dataset, None if it was never submitted
+
+    :return: dict with "state" (queued, running, done or failed),
+        "completed" (finished stages), "error", "updated" (timestamp), "host"
+        and "pid" of the process that wrote it, and once the job runs its
+        "started" time, the "version" of the dataset once the metadata is
+        computed and whether a feature "importance" was stored
+    """
+    try:
+        with open(status_path(data_id)) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_status(data_id: int, state: str, completed=(), error=None, **details):
+    status = {
+        "state": state,
+        "completed": list(completed),
+        "error": error,
+        "updated": time.time(),
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        **details,
+    }
+    path = status_path(data_id)
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(status, fh)
+    os.replace(tmp, path)
+    return status
+
+
+def ensure_dataset_job(data_id: int):
+    """Submit the precompute job of a dataset unless it is done or in progress
+
+    :param data_id: ID of the OpenML dataset
+    :return: current status of the job
+    """
+    status = read_status(data_id)
+    if status is not None and not _needs_submit(data_id, status):
+        return status
+
+    with _lock, single_flight.lock(f"submit-data{data_id}"):
+        future = _futures.get(data_id)
+        if future is not None and not future.done():
+            return read_status(data_id) or status
+        # Another web worker may have submitted the job in the meantime
+        status = read_status(data_id)
+        if status is not None and not _needs_submit(data_id, status):
+            return status
+        status = write_status(data_id, "queued")
+        _futures[data_id] = _get_executor().submit(precompute_dataset, data_id)
+    return status
+
+
+def results_cached(data_id: int, status=None) -> bool:
+    """Whether every result the data page reads is in the cache
+
+    :param status: status of the job that computed the results, read if None
+    """
+    from .feature_importance import MODES, has_feature_importance
+
+    status = (read_status(data_id) if status is None else status) or {}
+    version = status.get("version")
+    for path, kind in RESULTS:
+        if caching.dashboard_cache.lookup(path(data_id).name, kind, version) is None:
+            return False
+    return not status.get("importance") or any(
+        has_feature_importance(data_id, version, mode) for mode in MODES
+    )
+
+
+def _needs_submit(data_id, status):
+    if status["state"] == "done":
+        # Results may have been evicted from the cache since
+        return not results_cached(data_id, status)
+    if status["state"] != "failed" and not _is_alive(status):
+        # The cache outlives restarts, the job died with a previous server
+        return True
+    # Failed jobs are not retried on every poll, and a queued or running job
+    # that is silent for too long died with its worker
+    return time.time() - status["updated"] > JOB_TIMEOUT
+
+
+def _is_alive(status):
+    if status.get("host") != socket.gethostname() or "pid" not in status:
+        # Processes of other hosts cannot be checked
+        return True
+    try:
+        os.kill(status["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def create_executor(kind: str, workers: int):
+    """Pool of "process" or "thread" workers
+
+    Processes are spawned, so they do not inherit locks or connections of
+    the web worker, and use the openml configuration of this process.
+    """
+    if kind == "process":
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(openml.config.server, str(openml.config.cache_directory)),
+        )
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = create_executor(PRECOMPUTE_EXECUTOR, PRECOMPUTE_WORKERS)
+    return _executor
+
+
+def _init_worker(server, cache_directory):
+    openml.config.server = server
+    openml.config.cache_directory = cache_directory
+
+
+def precompute_dataset(data_id: int):
+    """Compute everything the data page needs, recording progress per stage
+
+    A fast approximate feature importance is stored first, the page shows
+    it while the full forest refines it. Stored importances of the same
+    dataset version are reused. Concurrent calls for the same dataset, e.g.
+    by the warmer and a web worker, run one after the other and the later
+    ones return once the results exist.
+    """
+    with single_flight.lock(f"data{data_id}"):
+        status = read_status(data_id)
+        if status is not None and status["state"] == "done" and not _needs_submit(data_id, status):
+            return
+        _precompute_dataset(data_id)
+
+
+def _precompute_dataset(data_id):
+    from .feature_importance import (
+        MODES,
+        compute_feature_importance,
+        has_feature_importance,
+        save_feature_importance,
+    )
+    from .data_profile import load_profile
+    from .helpers import get_data_metadata
+    from .model_matrix import build_model_matrix, save_model_matrix
+
+    # The start time tells the runs of the job for a dataset apart
+    completed, details = [], {"started": time.time()}
+    try:
+        write_status(data_id, "running", completed, **details)
+        df, meta_features, _, _, version = get_data_metadata(data_id)
+        details["version"] = version
+        completed.append("metadata")
+        write_status(data_id, "running", completed, **details)
+        imputation = (load_profile(data_id) or {}).get("imputation")
+        matrix = build_model_matrix(df, meta_features, imputation)
+        save_model_matrix(matrix, data_id, version)
+
+        for stage, mode in (("importance", "approximate"), ("forest", "forest")):
+            if not has_feature_importance(data_id, version, "forest"):
+                fi = compute_feature_importance(matrix, meta_features, mode=mode)
+                if fi is not None:
+                    save_feature_importance(fi, data_id, version)
+            completed.append(stage)
+            details["importance"] = any(
+                has_feature_importance(data_id, version, m) for m in MODES
+            )
+            write_status(data_id, "running", completed, **details)
+        write_status(data_id, "done", completed, **details)
+    except Exception as e:
+        logger.exception(f"Precomputing dataset {data_id} failed")
+        write_status(data_id, "failed", completed, error=str(e), **details)
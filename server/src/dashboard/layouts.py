@@ -1,11 +1,13 @@
+import math
 from typing import List, Tuple
 
 from dash import dash_table as dt
 from dash import dcc, html
 from openml import datasets, evaluations, runs, setups, study
 
-from .caching import CACHE_DIR_DASHBOARD
+from .dash_config import FEATURE_PAGE_SIZE, JOB_POLL_INTERVAL
 from .helpers import get_metadata, get_run_df, logger
+from .task_store import PAGE_RUNS
 
 # TODO: Move to assets (Copied from Joaquin's react font)
 font = [
@@ -26,22 +28,29 @@ font = [
 def get_layout_from_data(data_id):
     # Get data and metadata
     metadata, data, name = get_metadata(data_id)
-    selected_rows = list(range(0, 5))
-    if metadata.shape[0] < 5:
-        selected_rows = list(range(0, metadata.shape[0]))
+    # Rows are identified by their feature id, the first five are selected
+    selected_row_ids = list(metadata["id"][:5])
 
     # Define layout components
     logger.debug("loading skeleton data layout and table")
     # Feature table
     feature_table = html.Div(
         dt.DataTable(
-            data=metadata.to_dict("records"),
-            columns=[{"name": i, "id": i} for i in metadata.columns],
+            # Pages are queried from the server, see feature_table.py
+            data=[],
+            columns=[{"name": i, "id": i} for i in metadata.columns if i != "id"],
             row_selectable="multi",
-            sort_action="native",
+            sort_action="custom",
+            sort_mode="single",
+            sort_by=[],
             row_deletable=False,
-            selected_rows=selected_rows,
-            filter_action="native",
+            selected_row_ids=selected_row_ids,
+            filter_action="custom",
+            filter_query="",
+            page_action="custom",
+            page_current=0,
+            page_size=FEATURE_PAGE_SIZE,
+            page_count=math.ceil(len(metadata) / FEATURE_PAGE_SIZE),
             id="datatable",
             style_header={"backgroundColor": "white", "fontWeight": "bold"},
             style_cell={
@@ -60,11 +69,10 @@ def get_layout_from_data(data_id):
                 "marginBottom": "20px",
                 "overflowY": "scroll",
             },
-            page_action="none",
             # Select special rows to highlight
             style_data_conditional=[
                 {
-                    "if": {"row_index": 0},
+                    "if": {"filter_query": '{Target} = "true"'},
                     "backgroundColor": "rgb(0, 100, 255)",
                     "color": "white",
                 },
@@ -193,7 +201,7 @@ def get_layout_from_data(data_id):
                     style={"text-align": "left", "text-color": "black"},
                 ),
                 html.P(
-                    "Choose one or more attributes for distribution plot (first 1k attributes listed)",
+                    "Choose one or more attributes for distribution plot",
                     style={"text-align": "left", "color": "gray", "fontSize": 11},
                 ),
                 feature_table,
@@ -204,6 +212,10 @@ def get_layout_from_data(data_id):
                 scatter_plot,
                 html.Div(id="tableloaded", children="table", style={"display": "none"}),
                 html.Div(id="dataloaded", style={"display": "none"}),
+                # Progress of the background computation of this page
+                dcc.Interval(id="job-poll", interval=JOB_POLL_INTERVAL),
+                dcc.Store(id="job-status"),
+                dcc.Store(id="metadata-ready"),
             ],
             className="container",
             style={"overflowY": "hidden"},
@@ -222,8 +234,6 @@ def get_layout_from_task(task_id):
 
     """
 
-    (CACHE_DIR_DASHBOARD / f"task{task_id}.pkl").unlink(missing_ok=True)
-
     # Define components in task layout
     loading_spinner = dcc.Loading(html.Div(id="dummy"), type="dot")
     hidden_div = html.Div(id="intermediate-value", style={"display": "none"})
@@ -245,7 +255,7 @@ def get_layout_from_task(task_id):
     # Fetch more runs button
     fetch_runs_button = html.Div(
         html.Button(
-            "Fetch next 1000 runs",
+            f"Fetch next {PAGE_RUNS} runs",
             id="button",
             style={
                 "fontSize": 14,
@@ -383,15 +393,13 @@ def get_layout_from_flow(flow_id):
 
 
 def get_layout_from_run(run_id):
-    run, df = get_run_df(int(run_id))
+    _, table_data = get_run_df(int(run_id))
     # Define components of run layout
     # Run table
     run_title = html.H3(
         "Run " + str(run_id), style={"text-align": "left", "text-color": "black"}
     )
 
-    table_data = df.drop(["results"], axis=1)
-
     run_table = html.Div(
         dt.DataTable(
             data=table_data.to_dict("records"),
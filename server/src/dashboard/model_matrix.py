@@ -0,0 +1,91 @@
+"""Model-ready matrix of a dataset, shared by the modelling based visuals
+
+The cached frame is cleaned (see ``clean_dataset``) once per dataset and
+stored with compact dtypes: numeric attributes as float32, nominal ones
+as categoricals (integer codes and their categories), and the class of
+every row, the target itself or the bin of a numeric target, in
+``CLASS_COLUMN``. The feature importance, the feature interaction plots
+and any other model based visual share it instead of cleaning, encoding
+and binning the frame on their own. The matrix is stored as uncompressed
+Feather in one record batch, so its numeric columns and category codes
+are read as read-only views of the memory-mapped file, not copied (see
+``map_frame``).
+"""
+import numpy as np
+import pandas as pd
+
+from . import caching
+from .binning import bin_values
+from .caching import model_matrix_path, read_cached
+from .data_profile import N_TARGET_BINS
+from .formats import FORMATS, map_frame, read_columns
+from .helpers import clean_dataset
+
+# Class of every row: the nominal target or the bin of the numeric target
+CLASS_COLUMN = "__class__"
+STORAGE_FORMAT = FORMATS["feather"]
+
+
+def build_model_matrix(df: pd.DataFrame, meta_features: pd.DataFrame, imputation=None):
+    """Cleaned and compactly encoded matrix of a dataset frame
+
+    :param df: cached dataset frame
+    :param meta_features: feature table of the dataset
+    :param imputation: fill values of the missing values from the profile
+    :return: DataFrame with float32 numeric and categorical nominal
+        columns, and ``CLASS_COLUMN`` if the dataset has a target
+    """
+    df = clean_dataset(df, imputation)
+    numeric = set(meta_features["Attribute"][meta_features["DataType"] == "numeric"])
+    matrix = pd.DataFrame(
+        {
+            column: (
+                pd.to_numeric(df[column], errors="coerce").astype(np.float32)
+                if column in numeric
+                else _categorical(df[column])
+            )
+            for column in df.columns
+        }
+    )
+
+    target = meta_features["Attribute"][meta_features["Target"] == "true"].values
+    if len(target) and target[0] in matrix.columns:
+        if target[0] in numeric:
+            codes, labels = bin_values(matrix[target[0]], N_TARGET_BINS)
+            matrix[CLASS_COLUMN] = pd.Categorical.from_codes(codes, labels)
+        else:
+            matrix[CLASS_COLUMN] = matrix[target[0]]
+    return matrix
+
+
+def _categorical(values: pd.Series):
+    """Categorical with numerically ordered categories if they are numbers"""
+    categorical = pd.Categorical(values)
+    numbers = pd.to_numeric(pd.Series(categorical.categories), errors="coerce")
+    if len(numbers) and numbers.notnull().all():
+        order = np.argsort(numbers.to_numpy(), kind="stable")
+        categorical = categorical.reorder_categories(categorical.categories[order])
+    return categorical
+
+
+def save_model_matrix(matrix: pd.DataFrame, data_id: int, version=None):
+    name = model_matrix_path(data_id).name
+    with caching.dashboard_cache.writing(name, "matrix", version, STORAGE_FORMAT.name) as tmp:
+        STORAGE_FORMAT.write(matrix, tmp)
+
+
+def load_model_matrix(data_id: int, columns=None):
+    """Load (columns of) the model-ready matrix of a dataset
+
+    :param columns: names of the columns to read, those the matrix does not
+        have are skipped, all columns if None
+    :return: DataFrame, or None if the matrix is not computed yet
+    """
+
+    def read(path):
+        if columns is None:
+            return map_frame(path)
+        stored = set(read_columns(path))
+        return map_frame(path, [column for column in columns if column in stored])
+
+    return read_cached(model_matrix_path(data_id), "matrix", read=read)
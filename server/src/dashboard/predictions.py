@@ -0,0 +1,125 @@
+"""Store of the predictions of runs, keyed by the file id of the ARFF file
+
+A predictions file is downloaded once, with a pooled HTTP session, and
+parsed while it streams in: the ARFF header gives the columns and their
+types, and the data section is read in chunks of ``CHUNK_ROWS`` rows into
+typed columns (floats, and categoricals for nominal attributes) that are
+appended to an Arrow file. Repeat views read the stored file, so
+neither the download nor the parsing is repeated.
+"""
+import csv
+import io
+import os
+import re
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import caching
+from .caching import predictions_path, read_cached
+from .singleflight import single_flight
+
+# Rows parsed and written at a time
+CHUNK_ROWS = 100_000
+# Seconds to wait for the server to start sending a file
+DOWNLOAD_TIMEOUT = 60
+
+ATTRIBUTE = re.compile(
+    r"^@attribute\s+('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\S+)\s+(.*)$", re.IGNORECASE
+)
+
+_local = threading.local()
+
+
+def _session():
+    # Sessions keep connections alive, one per thread and process
+    if getattr(_local, "pid", None) != os.getpid():
+        session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504))
+        session.mount("http://", HTTPAdapter(pool_maxsize=16, max_retries=retry))
+        session.mount("https://", HTTPAdapter(pool_maxsize=16, max_retries=retry))
+        _local.session, _local.pid = session, os.getpid()
+    return _local.session
+
+
+def load_predictions(file_id: int, url: str) -> pd.DataFrame:
+    """Predictions of a run, downloaded and stored on first use
+
+    :param file_id: id of the predictions file on the server
+    :param url: download URL of the predictions ARFF file
+    :return: DataFrame with float columns and categorical nominal columns
+    """
+
+    def load():
+        return read_cached(predictions_path(file_id), "predictions")
+
+    def compute():
+        with _session().get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            # Decompressed, and left open for the text wrapper until the end
+            response.raw.decode_content = True
+            response.raw.auto_close = False
+            stream = io.TextIOWrapper(response.raw, encoding="utf-8")
+            name = predictions_path(file_id).name
+            with caching.dashboard_cache.writing(name, "predictions", file_format="feather") as tmp:
+                write_arff(stream, tmp)
+        return load()
+
+    return single_flight.do(f"predictions{file_id}", compute, load=load)
+
+
+def read_header(stream):
+    """Column names and pandas dtypes from the header of an ARFF file
+
+    Reads the stream up to and including the @data line.
+    """
+    names, dtypes = [], {}
+    # readline keeps the stream at the data section for the parser
+    for line in iter(stream.readline, ""):
+        line = line.strip()
+        if line.lower().startswith("@data"):
+            return names, dtypes
+        match = ATTRIBUTE.match(line)
+        if match is None:
+            continue
+        name, kind = match.group(1), match.group(2).strip()
+        if name[0] in "'\"":
+            name = name[1:-1]
+        if kind.startswith("{"):
+            values = next(csv.reader([kind[1:-1]], quotechar="'", skipinitialspace=True))
+            dtypes[name] = pd.CategoricalDtype([value.strip() for value in values])
+        elif kind.lower() in ("numeric", "real", "integer"):
+            dtypes[name] = "float64"
+        else:
+            dtypes[name] = "object"
+        names.append(name)
+    raise ValueError("ARFF file has no @data section")
+
+
+def write_arff(stream, path):
+    """Parse a (dense) ARFF text stream chunk by chunk into an Arrow file"""
+    names, dtypes = read_header(stream)
+    chunks = pd.read_csv(
+        stream,
+        names=names,
+        dtype=dtypes,
+        na_values=["?"],
+        keep_default_na=False,
+        quotechar="'",
+        skipinitialspace=True,
+        comment="%",
+        chunksize=CHUNK_ROWS,
+    )
+    schema = pa.Schema.from_pandas(
+        pd.DataFrame({name: pd.Series(dtype=dtypes[name]) for name in names}),
+        preserve_index=False,
+    )
+    with pa.ipc.new_file(str(path), schema) as writer:
+        for chunk in chunks:
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            )
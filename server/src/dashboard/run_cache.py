@@ -0,0 +1,179 @@
+"""Local store of the runs shown on run pages
+
+Runs do not change once uploaded, apart from the evaluations the server
+adds after the upload. A run is fetched once and stored with the fields the
+run page uses, and its fold evaluations in long format, numeric columns
+with a row per metric, repeat, fold and learning curve sample, instead of
+the nested dicts of the run description. The run page aggregates and
+slices these columns directly. A stored run is served for
+``RUN_CACHE_SECONDS`` after it was fetched or last checked. It is then
+checked against the number of evaluations the server lists for the run, a
+small listing instead of the run description, and only fetched again if
+the server has added evaluations since.
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import openml
+import pandas as pd
+
+from .caching import read_pickle, run_path, write_pickle
+from .dash_config import RUN_CACHE_SECONDS
+
+# Attributes of an OpenMLRun kept in the store
+RUN_FIELDS = (
+    "run_id",
+    "task_id",
+    "task_type",
+    "flow_id",
+    "flow_name",
+    "dataset_id",
+    "setup_id",
+    "uploader",
+    "uploader_name",
+    "output_files",
+    "evaluations",
+)
+
+
+def build_run_entry(run, fetched=None):
+    """Stored form of an OpenMLRun
+
+    :param fetched: time the run was fetched, now if None
+    :return: dict with the ``RUN_FIELDS``, the "fold_evaluations" in long
+        format (see ``long_evaluations``), the "fetched" time and the
+        "checked" time of the last check against the server
+    """
+    entry = {field: getattr(run, field, None) for field in RUN_FIELDS}
+    entry["output_files"] = dict(entry["output_files"] or {})
+    entry["evaluations"] = dict(entry["evaluations"] or {})
+    entry["fold_evaluations"] = long_evaluations(
+        run.fold_evaluations, getattr(run, "sample_evaluations", None)
+    )
+    entry["fetched"] = time.time() if fetched is None else fetched
+    entry["checked"] = entry["fetched"]
+    return entry
+
+
+def long_evaluations(fold_evaluations, sample_evaluations=None) -> pd.DataFrame:
+    """Fold (and sample) evaluations of a run in long format
+
+    The nested dicts are flattened in one pass into a row per value.
+    Evaluations of whole folds have sample -1, those of the samples of a
+    learning curve their sample number.
+
+    :param fold_evaluations: ``OpenMLRun.fold_evaluations``, dicts of
+        metric, repeat and fold
+    :param sample_evaluations: ``OpenMLRun.sample_evaluations``, dicts of
+        metric, repeat, fold and sample
+    :return: DataFrame with a categorical "metric", integer "repeat",
+        "fold" and "sample", and float "value" column
+    """
+    rows = [
+        (metric, repeat, fold, -1, value)
+        for metric, repeats in (fold_evaluations or {}).items()
+        for repeat, folds in repeats.items()
+        for fold, value in folds.items()
+    ]
+    rows += [
+        (metric, repeat, fold, sample, value)
+        for metric, repeats in (sample_evaluations or {}).items()
+        for repeat, folds in repeats.items()
+        for fold, samples in folds.items()
+        for sample, value in samples.items()
+    ]
+    metrics, repeats, folds, samples, values = zip(*rows) if rows else ([],) * 5
+    return pd.DataFrame(
+        {
+            "metric": pd.Categorical(metrics, categories=list(dict.fromkeys(metrics))),
+            "repeat": np.array(repeats, dtype=np.int32),
+            "fold": np.array(folds, dtype=np.int32),
+            "sample": np.array(samples, dtype=np.int32),
+            "value": np.array(values, dtype=np.float64),
+        }
+    )
+
+
+def metric_values(entry, metric):
+    """Values of a metric on every fold of every repeat of a stored run"""
+    evaluations = entry["fold_evaluations"]
+    code = evaluations["metric"].cat.categories.get_indexer([metric])[0]
+    mask = (evaluations["metric"].cat.codes.to_numpy() == code) & (
+        evaluations["sample"].to_numpy() == -1
+    )
+    return evaluations["value"].to_numpy()[mask]
+
+
+def is_fresh(entry, now=None):
+    """Whether a stored run was fetched or checked within the freshness window"""
+    now = time.time() if now is None else now
+    return now - entry["checked"] < RUN_CACHE_SECONDS
+
+
+def is_stale(entry, now=None):
+    """Whether a stored run has to be fetched again
+
+    Past the freshness window, the run is stale if the server lists another
+    number of evaluations for it than were stored. Otherwise, also when the
+    server cannot be reached, the run is marked as checked and served for
+    another window.
+    """
+    now = time.time() if now is None else now
+    if is_fresh(entry, now):
+        return False
+    listed = count_evaluations(entry["run_id"])
+    if listed is not None and listed != len(entry["evaluations"]):
+        return True
+    entry["checked"] = now
+    save_run(entry)
+    return False
+
+
+def count_evaluations(run_id: int):
+    """Number of evaluations the server lists for a run, None if unavailable"""
+    api = openml.config.server.rstrip("/")
+    if api.endswith("/xml"):
+        api = api[: -len("xml")] + "json"
+    try:
+        with urllib.request.urlopen(f"{api}/evaluation/list/run/{run_id}", timeout=10) as response:
+            listed = json.load(response)["evaluations"]["evaluation"]
+    except urllib.error.HTTPError as e:
+        # The server answers runs without evaluations with "no results"
+        return 0 if e.code == 412 else None
+    except Exception:
+        return None
+    return len(listed) if isinstance(listed, list) else 1
+
+
+def evaluations_table(entry) -> pd.DataFrame:
+    """Table of the run page: the evaluations, output files and task type
+
+    :return: DataFrame with the "evaluations" names and their "values",
+        "mean ± std" over all folds for the metrics
+    """
+    evaluations = entry["fold_evaluations"]
+    values = evaluations["value"][evaluations["sample"] == -1].groupby(
+        evaluations["metric"], observed=True, sort=False
+    )
+    metrics = (
+        values.mean().round(3).astype(str) + " ± " + values.std(ddof=0).round(3).astype(str)
+    )
+    others = list(entry["output_files"]) + ["task_type"]
+    return pd.DataFrame(
+        {
+            "evaluations": list(metrics.index.astype(str)) + others,
+            "values": list(metrics) + [""] * len(others),
+        }
+    )
+
+
+def load_run(run_id: int):
+    """Stored run, None if it was never fetched"""
+    return read_pickle(run_path(run_id), "run")
+
+
+def save_run(entry):
+    write_pickle(entry, run_path(entry["run_id"]), "run")
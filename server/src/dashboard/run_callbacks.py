@@ -1,19 +1,16 @@
-import io
 import re
-import urllib.request
 
-import numpy as np
 import pandas as pd
 import plotly
 import plotly.graph_objs as go
 from dash import dcc, html
 from dash.dependencies import Input, Output
-from scipy.io import arff
-from sklearn.metrics import precision_recall_curve, roc_curve
-from sklearn.preprocessing import label_binarize
 
-from .caching import CACHE_DIR_DASHBOARD
+from .curves import compute_curves, load_curves, save_curves
 from .dash_config import DASH_CACHING
+from .predictions import load_predictions
+from .run_cache import load_run, metric_values
+from .singleflight import single_flight
 from ...setup import SERVER_BASE_URL
 
 TIMEOUT = 5 * 60 if DASH_CACHING else 0
@@ -39,21 +36,25 @@ def register_run_callbacks(app, cache):
         :return: subplots containing violin plot or histogram for selected_row_indices
         """
         run_id = int(re.search(r"run/(\d+)", pathname).group(1))
-        filename_cache = CACHE_DIR_DASHBOARD / f"run{run_id}.pkl"
-        if not filename_cache.exists():
+        run = load_run(run_id)
+        if run is None:
             return []
-        df = pd.read_pickle(filename_cache)
         rows = pd.DataFrame(rows)
 
+        selected_rows = []
         if len(selected_row_indices) != 0 and not rows.empty:
-            selected_rows = rows.loc[selected_row_indices]["evaluations"].values
+            selected_rows = [
+                metric
+                for metric in rows.loc[selected_row_indices]["evaluations"].values
+                if metric in run["fold_evaluations"]["metric"].cat.categories
+            ]
+        if selected_rows:
             i = 0
             fig = plotly.subplots.make_subplots(
                 rows=len(selected_rows), cols=1, subplot_titles=tuple(selected_rows)
             )
             for metric in selected_rows:
-                measure = df.loc[df["evaluations"] == metric]
-                x = measure["results"].values[0]
+                x = metric_values(run, metric)
                 trace1 = {
                     "type": "box",
                     "showlegend": False,
@@ -84,118 +85,84 @@ def register_run_callbacks(app, cache):
     @cache.memoize(timeout=TIMEOUT)
     def pr_chart(pathname, rows):
         run_id = int(re.search(r"run/(\d+)", pathname).group(1))
-        filename_cache = CACHE_DIR_DASHBOARD / f"run{run_id}.pkl"
-        if not filename_cache.exists():
+        run = load_run(run_id)
+        if run is None:
             return [], []
-        df = pd.read_pickle(filename_cache)
 
-        task_type = df[df["evaluations"] == "task_type"]["results"].values[0]
-        if "Classification" not in task_type:
+        if "Classification" not in (run["task_type"] or ""):
             return "Only classification supported", "Only classification supported"
-        pred_id = df[df["evaluations"] == "predictions"]["results"].values[0]
+        pred_id = run["output_files"].get("predictions")
+        if pred_id is None:
+            return "No predictions", "No predictions"
         url = f"{SERVER_BASE_URL}/data/download/{pred_id}/predictions.arff"
-        ftp_stream = urllib.request.urlopen(url)
-        data, meta = arff.loadarff(io.StringIO(ftp_stream.read().decode("utf-8")))
-        df = pd.DataFrame(data)
-        df["prediction"] = df["prediction"].str.decode("utf-8")
-        df["correct"] = df["correct"].str.decode("utf-8")
-        confidence = ["confidence." + str(val) for val in df["correct"].unique()]
-        y_codes = pd.Categorical(df["correct"]).codes
-        y_score = df[confidence[1]].values
-        n_classes = df["correct"].nunique()
-        data = []
-        roc = []
-        if n_classes == 2:
-            _, idx = np.unique(y_codes, return_index=True)
-            y_test = label_binarize(y_codes, classes=y_codes[np.sort(idx)])
-            precision, recall, thresholds = precision_recall_curve(
-                y_test, y_score, pos_label=1
-            )
-            fpr, tpr, roc_thresh = roc_curve(y_test, y_score)
-
-            h = ["Threshold: " + value for value in thresholds.astype(str)]
-            trace1 = go.Scatter(
-                x=recall,
-                y=precision,
-                hovertext=h,
-                mode="lines",
-                line=dict(width=2, color="navy"),
-                name="Precision-Recall curve",
-            )
-
-            layout = go.Layout(
-                xaxis=dict(title="Recall"), yaxis=dict(title="Precision")
-            )
 
-            fig = go.Figure(data=[trace1], layout=layout)
-            h = ["Threshold: " + value for value in roc_thresh.astype(str)]
-            trace2 = go.Scatter(
-                x=fpr,
-                y=tpr,
-                hovertext=h,
-                mode="lines",
-                line=dict(width=2, color="navy"),
-                name="ROC chart",
-            )
+        def compute():
+            curves = compute_curves(load_predictions(pred_id, url))
+            save_curves(curves, run_id, pred_id)
+            return curves
 
-            layout = go.Layout(xaxis=dict(title="FPR"), yaxis=dict(title="TPR"))
+        curves = single_flight.do(
+            f"curves{run_id}", compute, load=lambda: load_curves(run_id, pred_id)
+        )
+        fig, fig2 = curve_figures(curves)
+        graph = dcc.Graph(figure=fig)
+        return html.Div(graph), html.Div(dcc.Graph(figure=fig2))
 
-            fig2 = go.Figure(data=[trace2], layout=layout)
 
-        else:
-            precision = dict()
-            recall = dict()
-            threshold = dict()
-            roc_thresh = dict()
-            fpr = dict()
-            tpr = dict()
-            _, idx = np.unique(y_codes, return_index=True)
-            y_test = label_binarize(y_codes, classes=y_codes[np.sort(idx)])
-            for i in range(n_classes):
-                y_score = df[confidence[i]].values
-                precision[i], recall[i], threshold[i] = precision_recall_curve(
-                    y_test[:, i], y_score, pos_label=1
-                )
-                fpr[i], tpr[i], roc_thresh[i] = roc_curve(y_test[:, i], y_score)
-
-            for i in range(n_classes):
-                h = ["Threshold: " + value for value in threshold[i].astype(str)]
-                trace3 = go.Scatter(
-                    x=recall[i],
-                    y=precision[i],
-                    name=confidence[i],
-                    hovertext=h,
-                    hoverinfo="text",
-                    hoverlabel=dict(namelength=-1),
-                    mode="lines",
-                    line=dict(width=2),
-                )
-                data.append(trace3)
-                h1 = ["Threshold: " + value for value in roc_thresh[i].astype(str)]
-                trace = go.Scatter(
-                    x=fpr[i],
-                    y=tpr[i],
-                    name=confidence[i],
-                    hovertext=h1,
-                    hoverinfo="text",
-                    hoverlabel=dict(namelength=-1),
-                    mode="lines",
-                    line=dict(width=2),
-                )
-                roc.append(trace)
-
-            layout = go.Layout(
-                title="",
-                xaxis=dict(title="Recall"),
-                yaxis=dict(title="Precision"),
-                height=400,
+def curve_figures(curves):
+    """Precision-recall and ROC figures of the stored curves of a run
+
+    Binary tasks show the curve of the second class, others one curve per
+    class. Thresholds are only shown on hover.
+    """
+    classes = curves["classes"]
+    if len(classes) == 2:
+        labels = [classes[1]] if classes[1] in curves["curves"] else []
+        names = {classes[1]: ("Precision-Recall curve", "ROC chart")}
+        line = dict(width=2, color="navy")
+    else:
+        labels = [label for label in classes if label in curves["curves"]]
+        names = {label: (f"confidence.{label}",) * 2 for label in labels}
+        line = dict(width=2)
+
+    pr, roc = [], []
+    for label in labels:
+        curve = curves["curves"][label]
+        pr_name, roc_name = names[label]
+        pr.append(
+            go.Scatter(
+                x=curve["pr"]["recall"],
+                y=curve["pr"]["precision"],
+                customdata=curve["pr"]["thresholds"],
+                hovertemplate="Threshold: %{customdata:.4g}",
+                hoverlabel=dict(namelength=-1),
+                mode="lines",
+                line=line,
+                name=f"{pr_name} (AP {curve['average_precision']:.3f})",
             )
-
-            fig = go.Figure(data=data, layout=layout)
-            layout = go.Layout(
-                title="", xaxis=dict(title="fpr"), yaxis=dict(title="tpr"), height=400
+        )
+        roc.append(
+            go.Scatter(
+                x=curve["roc"]["fpr"],
+                y=curve["roc"]["tpr"],
+                customdata=curve["roc"]["thresholds"],
+                hovertemplate="Threshold: %{customdata:.4g}",
+                hoverlabel=dict(namelength=-1),
+                mode="lines",
+                line=line,
+                name=f"{roc_name} (AUC {curve['roc_auc']:.3f})",
             )
-
-            fig2 = go.Figure(data=roc, layout=layout)
-        graph = dcc.Graph(figure=fig)
-        return html.Div(graph), html.Div(dcc.Graph(figure=fig2))
+        )
+
+    height = 400 if len(classes) > 2 else None
+    fig = go.Figure(
+        data=pr,
+        layout=go.Layout(
+            xaxis=dict(title="Recall"), yaxis=dict(title="Precision"), height=height
+        ),
+    )
+    fig2 = go.Figure(
+        data=roc,
+        layout=go.Layout(xaxis=dict(title="FPR"), yaxis=dict(title="TPR"), height=height),
+    )
+    return fig, fig2
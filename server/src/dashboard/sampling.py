@@ -0,0 +1,38 @@
+"""Deterministic row samples of large datasets
+
+Large datasets are shown on a stratified sample of ``SAMPLE_ROWS`` rows.
+The sample is drawn with a seed derived from the dataset id and version,
+so a recomputation draws the same rows, and the row numbers of the sample
+are stored in the dashboard cache, so every worker keeps using them even
+when the sampler changes.
+"""
+import numpy as np
+
+from . import caching
+from .caching import read_cached, sample_path
+from .dash_config import SAMPLE_ROWS, STREAMING_THRESHOLD
+
+
+def is_sampled(n_rows: int) -> bool:
+    """Whether a dataset is streamed into a sample instead of loaded fully"""
+    return n_rows >= STREAMING_THRESHOLD or n_rows > SAMPLE_ROWS
+
+
+def sample_size(n_rows: int) -> int:
+    return min(n_rows, SAMPLE_ROWS)
+
+
+def sample_seed(data_id: int, version) -> int:
+    """Seed of the sample of a dataset version"""
+    return int(np.random.SeedSequence([data_id, int(version or 0)]).generate_state(1)[0])
+
+
+def save_sample_rows(rows, data_id: int, version):
+    with caching.dashboard_cache.writing(sample_path(data_id).name, "sample", version) as tmp:
+        with open(tmp, "wb") as fh:
+            np.save(fh, np.asarray(rows, dtype=np.int64))
+
+
+def load_sample_rows(data_id: int, version):
+    """Row numbers of the stored sample of a dataset version, None if there is none"""
+    return read_cached(sample_path(data_id), "sample", version, np.load)
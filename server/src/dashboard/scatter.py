@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+from .dash_config import SCATTER_DENSITY_BINS, SCATTER_DENSITY_POINTS, SCATTERGL_POINTS
+
+
+def scatter_traces(df: pd.DataFrame, x: str, y: str, color: str):
+    """Traces of a scatter plot with one trace per value of a nominal attribute
+
+    Rows are grouped by the color value in one pass. Up to
+    ``SCATTERGL_POINTS`` points are drawn as SVG markers, up to
+    ``SCATTER_DENSITY_POINTS`` with WebGL, and beyond that every class is
+    binned into a 2D histogram on the server, so that only the non-empty
+    bins are sent to the browser.
+
+    :param df: frame with (at least) the three attributes
+    :param x: numeric attribute on the x-axis
+    :param y: numeric attribute on the y-axis
+    :param color: nominal attribute to color by, rows where it is missing
+        are not shown
+    :return: list of traces
+    """
+    xs = pd.to_numeric(df[x], errors="coerce").to_numpy(dtype=float)
+    ys = pd.to_numeric(df[y], errors="coerce").to_numpy(dtype=float)
+    codes, labels = pd.factorize(df[color], sort=True)
+    codes = np.where(np.isnan(xs) | np.isnan(ys), -1, codes)
+    groups = _group_rows(codes, len(labels))
+    n_points = sum(len(rows) for rows in groups)
+
+    if n_points > SCATTER_DENSITY_POINTS:
+        return _density_traces(xs, ys, groups, labels)
+
+    if n_points > SCATTERGL_POINTS:
+        trace, marker = go.Scattergl, {"size": 5, "opacity": 0.7}
+    else:
+        trace, marker = go.Scatter, {"size": 15, "line": {"width": 0.5, "color": "white"}}
+    return [
+        trace(x=xs[rows], y=ys[rows], mode="markers", marker=marker, name=str(label))
+        for label, rows in zip(labels, groups)
+    ]
+
+
+def _group_rows(codes, n_groups):
+    """Row indices per code, from a single stable sort (-1 is dropped)"""
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes + 1, minlength=n_groups + 1)
+    return np.split(order, np.cumsum(counts)[:-1])[1:]
+
+
+def _density_traces(xs, ys, groups, labels):
+    valid = np.concatenate(groups)
+    _, x_edges, y_edges = np.histogram2d(xs[valid], ys[valid], bins=SCATTER_DENSITY_BINS)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+
+    histograms = [
+        np.histogram2d(xs[rows], ys[rows], bins=[x_edges, y_edges])[0] for rows in groups
+    ]
+    largest = max((h.max() for h in histograms), default=1) or 1
+    traces = []
+    for label, histogram in zip(labels, histograms):
+        i, j = np.nonzero(histogram)
+        counts = histogram[i, j].astype(int)
+        traces.append(
+            go.Scattergl(
+                x=x_centers[i],
+                y=y_centers[j],
+                mode="markers",
+                marker={
+                    "size": np.round(3 + 12 * np.sqrt(counts / largest), 1),
+                    "opacity": 0.6,
+                },
+                customdata=counts,
+                hovertemplate="%{customdata} rows",
+                name=str(label),
+            )
+        )
+    return traces
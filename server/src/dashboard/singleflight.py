@@ -0,0 +1,81 @@
+"""Single-flight execution of expensive computations
+
+Concurrent requests for the same dataset, run or task artifact wait for
+one in-flight computation instead of starting their own. Within a process,
+followers receive the result of the leader. Across processes (web workers,
+precompute workers, the warmer), the leader holds an exclusive file lock
+on the key, and the others block on it and then load the stored result.
+File locks are released by the operating system when a process dies, so a
+crashed leader never blocks the others.
+"""
+import fcntl
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .caching import CACHE_DIR_LOCKS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, lock_dir):
+        self.lock_dir = Path(lock_dir)
+        self._guard = threading.Lock()
+        self._calls = {}
+
+    @contextmanager
+    def lock(self, key: str):
+        """Exclusive lock of a key, across threads and processes"""
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        # flock locks belong to the open file, so threads of one process
+        # that each open the file exclude each other too
+        with open(self.lock_dir / f"{key}.lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def do(self, key: str, compute, load=None):
+        """Compute the result of a key once for all concurrent callers
+
+        :param key: name of the artifact, e.g. "data61"
+        :param compute: function computing (and storing) the result
+        :param load: function loading the result stored by another process,
+            returning None if there is none
+        :return: result of ``load`` or ``compute``
+        """
+        with self._guard:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self.lock(key):
+                result = load() if load is not None else None
+                if result is None:
+                    result = compute()
+            call.result = result
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._guard:
+                del self._calls[key]
+            call.done.set()
+
+
+single_flight = SingleFlight(CACHE_DIR_LOCKS)
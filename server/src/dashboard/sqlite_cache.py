@@ -0,0 +1,230 @@
+"""Flask-Caching backend shared by all workers of a host through SQLite
+
+Callback results are pickled, compressed when they are large, and stored
+in a single SQLite database in WAL mode, so concurrent workers read and
+write it safely. The total size of the stored values is bounded, expired
+and then least recently used values are evicted first. ``LockingCache``
+adds a recomputation lock to ``memoize``: when several workers miss the
+same key at once, one computes the value and the others wait for it.
+"""
+import functools
+import os
+import pickle
+import socket
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask_caching import Cache
+from flask_caching.backends.base import BaseCache
+from flask_caching.utils import function_namespace
+
+from .sqlite_local import LocalConnection, transaction
+
+# Values larger than this many bytes are compressed
+COMPRESS_MIN_BYTES = 1024
+# Seconds between updates of the last access time of a value
+TOUCH_INTERVAL = 10
+# Seconds between checks whether a locked value was computed
+LOCK_POLL_INTERVAL = 0.1
+
+
+class SQLiteCache(BaseCache):
+    """Size-bounded SQLite cache with LRU eviction
+
+    :param path: location of the database file
+    :param default_timeout: seconds values are kept if ``set`` gets no
+        timeout, 0 keeps them until they are evicted
+    :param max_bytes: budget of the (compressed) values
+    :param compress_level: zlib level of values above ``COMPRESS_MIN_BYTES``
+    :param lock_timeout: seconds a worker waits for another worker that
+        computes the same value, and after which a lock of a crashed
+        worker expires
+    """
+
+    def __init__(
+        self,
+        path,
+        default_timeout=300,
+        max_bytes=1024 ** 3,
+        compress_level=6,
+        lock_timeout=120,
+    ):
+        super().__init__(default_timeout=default_timeout)
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.lock_timeout = lock_timeout
+        self._connect = LocalConnection(self.path, _create_tables)
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            default_timeout=config["CACHE_DEFAULT_TIMEOUT"],
+            max_bytes=config.get("CACHE_MAX_BYTES", 1024 ** 3),
+            compress_level=config.get("CACHE_COMPRESS_LEVEL", 6),
+            lock_timeout=config.get("CACHE_LOCK_TIMEOUT", 120),
+        )
+        return cls(Path(config["CACHE_DIR"]) / "cache.sqlite", *args, **kwargs)
+
+    def get(self, key):
+        row = self._execute(
+            "SELECT value, compressed, last_access FROM entries"
+            " WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        value, compressed, last_access = row
+        if time.time() - last_access > TOUCH_INTERVAL:
+            self._execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+        return pickle.loads(zlib.decompress(value) if compressed else value)
+
+    def has(self, key):
+        return (
+            self._execute(
+                "SELECT 1 FROM entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            is not None
+        )
+
+    def set(self, key, value, timeout=None):
+        return self._store("INSERT OR REPLACE", key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        self._execute(
+            "DELETE FROM entries WHERE key = ? AND expires <= ?", (key, time.time())
+        )
+        return self._store("INSERT OR IGNORE", key, value, timeout)
+
+    def delete(self, key):
+        return self._execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount > 0
+
+    def clear(self):
+        self._execute("DELETE FROM entries")
+        return True
+
+    @contextmanager
+    def recompute_lock(self, key):
+        """Hold the lock of computing a value, or wait until it is computed
+
+        Yields True if this caller holds the lock and computes the value,
+        False if another worker computed it in the meantime or the wait
+        timed out.
+        """
+        owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        deadline = time.time() + self.lock_timeout
+        acquired = False
+        while True:
+            now = time.time()
+            # Expired locks belong to crashed workers
+            self._execute("DELETE FROM locks WHERE key = ? AND expires <= ?", (key, now))
+            acquired = self._execute(
+                "INSERT OR IGNORE INTO locks VALUES (?, ?, ?)",
+                (key, owner, now + self.lock_timeout),
+            ).rowcount > 0
+            if acquired or self.has(key) or now > deadline:
+                break
+            time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, owner))
+
+    def _store(self, verb, key, value, timeout):
+        timeout = self._normalize_timeout(timeout)
+        now = time.time()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        compressed = len(data) > COMPRESS_MIN_BYTES
+        if compressed:
+            data = zlib.compress(data, self.compress_level)
+        if len(data) > self.max_bytes:
+            return False
+        stored = self._execute(
+            f"{verb} INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+            (key, data, compressed, len(data), now + timeout if timeout else None, now),
+        ).rowcount > 0
+        if stored:
+            self._evict()
+        return stored
+
+    def _evict(self):
+        """Drop expired, then least recently used values beyond the budget"""
+        with transaction(self._connect()) as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                conn.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+                total = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()[0]
+                for key, size in conn.execute(
+                    "SELECT key, size FROM entries ORDER BY last_access"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    total -= size
+
+    def _execute(self, sql, parameters=()):
+        return self._connect().execute(sql, parameters)
+
+
+def _create_tables(conn):
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB,"
+        " compressed INTEGER, size INTEGER, expires REAL, last_access REAL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT,"
+        " expires REAL)"
+    )
+
+
+class LockingCache(Cache):
+    """Cache whose memoized functions compute a missing value only once
+
+    With a backend that has a ``recompute_lock`` (like ``SQLiteCache``),
+    concurrent calls that miss the same key wait for the first one instead
+    of all computing the value.
+    """
+
+    def _memoize_version(self, f, args=None, kwargs=None, reset=False, delete=False, **rest):
+        version = functools.partial(
+            super()._memoize_version, f, args, kwargs, reset, delete, **rest
+        )
+        version_key = self._memvname(function_namespace(f, args=args)[0])
+        if reset or delete or not hasattr(self.cache, "recompute_lock"):
+            return version()
+        if self.cache.has(version_key):
+            return version()
+        # Concurrent first calls would each store their own random version
+        # of the function, and so cache the same result under different keys
+        with self.cache.recompute_lock(version_key):
+            return version()
+
+    def memoize(self, *args, **kwargs):
+        memoize = super().memoize(*args, **kwargs)
+
+        def decorator(f):
+            memoized = memoize(f)
+
+            @functools.wraps(memoized)
+            def decorated_function(*args, **kwargs):
+                if not hasattr(self.cache, "recompute_lock"):
+                    return memoized(*args, **kwargs)
+                key = memoized.make_cache_key(f, *args, **kwargs)
+                if self.cache.has(key):
+                    return memoized(*args, **kwargs)
+                with self.cache.recompute_lock(key):
+                    return memoized(*args, **kwargs)
+
+            return decorated_function
+
+        return decorator
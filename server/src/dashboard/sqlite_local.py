@@ -0,0 +1,46 @@
+"""SQLite connections shared by the caches of the dashboard
+
+SQLite connections must not be shared between threads, nor inherited by
+forked worker processes. ``LocalConnection`` opens one connection per
+thread and process, in WAL mode so that readers and a writer do not block
+each other, and ``transaction`` runs a block of statements as one write.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class LocalConnection:
+    """Connection to a database, opened once per thread and process
+
+    :param path: location of the database file
+    :param setup: called with every new connection to create the tables
+    """
+
+    def __init__(self, path, setup):
+        self.path = Path(path)
+        self.setup = setup
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.setup(conn)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """Run the statements of the block as one write, rolled back on errors"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
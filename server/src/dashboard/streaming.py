@@ -0,0 +1,349 @@
+"""Out-of-core statistics and sampling for datasets too large to load at once
+
+The dataset is read in row batches. Exact counts, missing values and
+nominal value counts are accumulated per batch, quantiles and distinct
+counts are tracked with small mergeable sketches, and a stratified sample
+is drawn with per-class bottom-k (reservoir) sampling on random row keys.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .dash_config import STREAM_BATCH_BYTES
+
+logger = logging.getLogger("dashboard")
+
+# Rows of every class that are kept regardless of the sampling threshold,
+# so that rare classes are still represented in the sample
+MIN_PER_CLASS = 20
+# Fraction by which the sampling threshold exceeds the sample fraction
+THRESHOLD_SLACK = 0.2
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch (KLL style hierarchy of compactors)
+
+    Level ``h`` holds items of weight ``2 ** h``. A level that grows beyond
+    ``k`` items is sorted and every other item, starting at a random offset,
+    is promoted to the next level. The extremes are tracked exactly.
+    """
+
+    def __init__(self, k: int = 256, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def count(self):
+        return sum(len(level) * 2**h for h, level in enumerate(self.levels))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for h, level in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self._compress()
+
+    def quantiles(self, q):
+        """Approximate quantiles ``q`` (in [0, 1]), None if no values were seen"""
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return None
+        weights = np.concatenate(
+            [np.full(len(level), 2.0**h) for h, level in enumerate(self.levels)]
+        )
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        q = np.asarray(q, dtype=float)
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        result = items[np.minimum(index, len(items) - 1)]
+        result[q == 0] = self.min
+        result[q == 1] = self.max
+        return result
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                # An odd item out stays at this level
+                even = len(level) - len(level) % 2
+                promoted = level[:even][self._rng.integers(2)::2]
+                self.levels[h] = level[even:]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+
+class DistinctSketch:
+    """Mergeable distinct count estimate (HyperLogLog with 2 ** p registers)"""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(2**p, dtype=np.uint8)
+
+    def update(self, values: pd.Series):
+        values = values.dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Position of the leftmost 1-bit in the remaining 64 - p bits;
+        # frexp is exact as the remainder fits in the float64 mantissa
+        _, exponent = np.frexp(remainder.astype(float))
+        rank = (64 - self.p + 1 - exponent).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "DistinctSketch"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class ColumnStatistics:
+    """Exact counts and sketches of one column, accumulated batch by batch"""
+
+    def __init__(self, kind: str, seed=None):
+        self.kind = kind
+        self.count = 0
+        self.missing = 0
+        self.distinct = DistinctSketch()
+        self.quantiles = QuantileSketch(seed=seed) if kind == "numeric" else None
+        self.value_counts = pd.Series(dtype="int64") if kind == "nominal" else None
+
+    def update(self, column: pd.Series):
+        missing = int(column.isnull().sum())
+        self.missing += missing
+        self.count += len(column) - missing
+        self.distinct.update(column)
+        if self.kind == "numeric":
+            self.quantiles.update(pd.to_numeric(column, errors="coerce").to_numpy(dtype=float))
+        elif self.kind == "nominal":
+            counts = column.astype(object).value_counts()
+            self.value_counts = self.value_counts.add(counts, fill_value=0).astype("int64")
+
+
+class StratifiedReservoir:
+    """Stratified sample of a stream of rows with a fixed total size
+
+    Every row gets a uniform random key and the sample consists of the rows
+    with the smallest keys of each class, proportional to the class sizes.
+    Only rows whose key falls below a threshold slightly above the sample
+    fraction are buffered, plus the smallest keys of every class: up to
+    ``MIN_PER_CLASS`` while that fits the sample size, and at most
+    ``sample_size`` rows in all, so memory is bounded by the sample size
+    also for targets with many classes.
+    """
+
+    def __init__(self, sample_size: int, n_rows: int, stratify=None, seed=None):
+        self.sample_size = sample_size
+        self.fraction = min(1.0, sample_size / max(n_rows, 1))
+        self.threshold = min(1.0, self.fraction * (1 + THRESHOLD_SLACK))
+        self.stratify = stratify
+        self.class_counts = pd.Series(dtype="int64")
+        self._rng = np.random.default_rng(seed)
+        self._below = []
+        self._above = None
+
+    def update(self, batch: pd.DataFrame):
+        batch = batch.assign(_key=self._rng.random(len(batch)), _class=self._classes(batch))
+        counts = batch["_class"].value_counts()
+        self.class_counts = self.class_counts.add(counts, fill_value=0).astype("int64")
+
+        below = batch["_key"] < self.threshold
+        self._below.append(batch[below])
+        above = batch[~below]
+        if self._above is not None:
+            above = pd.concat([self._above, above])
+        per_class = max(1, min(MIN_PER_CLASS, self.sample_size // len(self.class_counts)))
+        self._above = (
+            above.sort_values("_key")
+            .groupby("_class", sort=False)
+            .head(per_class)
+            .head(self.sample_size)
+        )
+
+    def sample(self) -> pd.DataFrame:
+        if self._above is None:
+            raise ValueError("No rows were added to the reservoir")
+        rows = pd.concat(self._below + [self._above])
+        rows = rows.sort_values("_key")
+        buffered = rows["_class"].value_counts()
+        quota = allocate_quota(self.class_counts, self.sample_size, capacity=buffered)
+        rank = rows.groupby("_class", sort=False).cumcount()
+        rows = rows[rank.to_numpy() < rows["_class"].map(quota).to_numpy()]
+        return rows.sort_index().drop(columns=["_key", "_class"])
+
+    def _classes(self, batch):
+        if self.stratify is None:
+            return np.zeros(len(batch), dtype=int)
+        # Missing target values form a stratum of their own
+        return batch[self.stratify].astype(object).fillna("__missing__").astype(str)
+
+
+def allocate_quota(counts: pd.Series, size: int, capacity=None) -> pd.Series:
+    """Rows per class, proportional to the class sizes and at most ``size`` in all
+
+    Every class gets one row first if there is room for all classes, the
+    rest is divided with the largest remainder method. Classes with fewer
+    rows available than their share get all of them, and their unused share
+    is divided among the other classes.
+
+    :param counts: number of rows per class
+    :param capacity: number of rows available per class, ``counts`` if None
+    """
+    if capacity is None:
+        return _largest_remainder(counts, size)
+    capacity = capacity.reindex(counts.index, fill_value=0).clip(upper=counts)
+    quota = pd.Series(0, index=counts.index, dtype="int64")
+    size = min(size, int(capacity.sum()))
+    remaining = counts.index
+    while len(remaining):
+        share = _largest_remainder(counts[remaining], size)
+        over = (share > capacity[remaining]).to_numpy()
+        if not over.any():
+            quota[remaining] = share
+            break
+        capped = remaining[over]
+        quota[capped] = capacity[capped]
+        size -= int(capacity[capped].sum())
+        remaining = remaining[~over]
+    return quota
+
+
+def _largest_remainder(counts: pd.Series, size: int) -> pd.Series:
+    size = min(size, int(counts.sum()))
+    minimum = 1 if len(counts) <= size else 0
+    weights = (counts - minimum).to_numpy(dtype=float)
+    total = size - minimum * len(counts)
+    exact = weights * total / weights.sum() if weights.sum() else weights
+    quota = np.floor(exact).astype(int)
+    extra = total - quota.sum()
+    quota[np.argsort(quota - exact, kind="stable")[:extra]] += 1
+    return pd.Series(quota + minimum, index=counts.index)
+
+
+def iter_batches(data, columns):
+    """Read the dataset in row batches of roughly ``STREAM_BATCH_BYTES``
+
+    Reads the Parquet or Feather cache of the dataset when present, and
+    otherwise falls back to loading the whole dataset and slicing it.
+
+    :param data: OpenMLDataset with downloaded data files
+    :param columns: names of the columns to read
+    :return: iterator over DataFrames, indexed by the global row number
+    """
+    batch_rows = max(1, STREAM_BATCH_BYTES // (8 * max(len(columns), 1)))
+    offset = 0
+    if data.parquet_file is not None and os.path.exists(data.parquet_file):
+        parquet = pq.ParquetFile(data.parquet_file)
+        columns = [column for column in columns if column in parquet.schema_arrow.names]
+        for record_batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+            yield _to_frame(record_batch, offset)
+            offset += record_batch.num_rows
+    elif data.data_feather_file is not None and os.path.exists(data.data_feather_file):
+        reader = pa.ipc.open_file(pa.memory_map(data.data_feather_file))
+        columns = [column for column in columns if column in reader.schema.names]
+        for i in range(reader.num_record_batches):
+            record_batch = reader.get_batch(i).select(columns)
+            for start in range(0, record_batch.num_rows, batch_rows):
+                chunk = record_batch.slice(start, batch_rows)
+                yield _to_frame(chunk, offset)
+                offset += chunk.num_rows
+    else:
+        logger.warning(f"No columnar cache for dataset {data.dataset_id}, loading it fully")
+        x, _, _, attribute_names = data.get_data()
+        x = pd.DataFrame(x, columns=attribute_names)
+        x = x[[column for column in columns if column in x.columns]]
+        for start in range(0, len(x), batch_rows):
+            yield x.iloc[start: start + batch_rows]
+
+
+def _to_frame(record_batch, offset):
+    df = record_batch.to_pandas()
+    df.index = pd.RangeIndex(offset, offset + len(df))
+    return df
+
+
+def stream_dataset(
+    data,
+    numerical_features,
+    nominal_features,
+    target,
+    sample_size,
+    n_rows,
+    seed=None,
+    rows=None,
+):
+    """Compute column statistics and a stratified sample batch by batch
+
+    :param data: OpenMLDataset with downloaded data files
+    :param numerical_features: names of the numeric attributes
+    :param nominal_features: names of the nominal attributes
+    :param target: name of the target attribute to stratify by, or None.
+        Numeric targets are not stratified, every value would be a class
+    :param sample_size: number of rows in the sample
+    :param n_rows: (expected) number of rows in the dataset
+    :param seed: seed for the sample and the sketches
+    :param rows: row numbers of a previously drawn sample to keep instead
+        of drawing a new one
+    :return: sample DataFrame and a dict of ColumnStatistics per column
+    """
+    ignore = set(data.ignore_attribute or []) | {data.row_id_attribute}
+    columns = [
+        feature.name for feature in data.features.values() if feature.name not in ignore
+    ]
+    statistics = {}
+    stratify = None if target in numerical_features else target
+    reservoir = StratifiedReservoir(sample_size, n_rows, stratify=stratify, seed=seed)
+    kept = []
+    for batch in iter_batches(data, columns):
+        for column in batch.columns:
+            if column not in statistics:
+                if column in numerical_features:
+                    kind = "numeric"
+                elif column in nominal_features:
+                    kind = "nominal"
+                else:
+                    kind = "other"
+                statistics[column] = ColumnStatistics(kind, seed=seed)
+            statistics[column].update(batch[column])
+        if rows is None:
+            reservoir.update(batch)
+        else:
+            kept.append(batch[batch.index.isin(rows)])
+
+    sample = reservoir.sample() if rows is None else pd.concat(kept)
+    for column in nominal_features:
+        if column in sample.columns:
+            sample[column] = sample[column].astype("category")
+    return sample, statistics
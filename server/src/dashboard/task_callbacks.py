@@ -3,15 +3,13 @@ import re
 import pandas as pd
 import plotly.graph_objs as go
 import plotly.express as px
-from dash import dash_table as dt
+from dash import Patch, dash_table as dt
 from dash import dcc, html
-from dash.dependencies import Input, Output
-from openml import evaluations
-from openml.extensions.sklearn import SklearnExtension
-from collections import defaultdict
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 
-from .caching import CACHE_DIR_DASHBOARD
 from .dash_config import DASH_CACHING
+from .task_store import PAGE_RUNS, leaderboard, load_page, load_pages
 from ...setup import SERVER_BASE_URL
 
 font = [
@@ -30,24 +28,6 @@ font = [
 
 TIMEOUT = 5 * 60 if DASH_CACHING else 0
 
-class TorchNameNormalizer:
-    def __init__(self):
-        self.counter = defaultdict(int)
-
-    def strip_hash(self, name):
-        # Replace torch.nn. with torch.
-        name = re.sub(r'^torch\.nn\.', 'torch.', name)
-        # Strip the last .<segment>
-        name = re.sub(r'\.[^.]+$', '', name)
-        return name
-
-    def normalize(self, full_name):
-        base = self.strip_hash(full_name)
-        self.counter[base] += 1
-        count = self.counter[base]
-        return base if count == 1 else f"{base} ({count})"
-
-normalizer = TorchNameNormalizer()
 
 def register_task_callbacks(app, cache):
     @app.callback(
@@ -59,8 +39,8 @@ def register_task_callbacks(app, cache):
         [
             Input("url", "pathname"),
             Input("metric", "value"),
-            Input("button", "n_clicks"),
         ],
+        [State("button", "n_clicks")],
     )
     @cache.memoize(timeout=TIMEOUT)
     def update_task_plots(pathname, metric, n_clicks):
@@ -75,150 +55,26 @@ def register_task_callbacks(app, cache):
         :return:
             Interactive graph (Evaluations tab) and leaderboard(People tab)
         """
-        n_runs = 1000
-
         # extract task id
         if pathname is not None and "/dashboard/task" in pathname:
             task_id = int(re.search(r"task/(\d+)", pathname).group(1))
         else:
             return html.Div(), html.Div(), html.Div()
 
-        if n_clicks is None:
-            n_clicks = 0
-
-        # pickle file which caches previous evaluations
-        # df_old may contain 0-1000 evaluations (we cache this)
-        # current request may be to include 1000-2000 evaluations (We fetch this)
-        filename_cache = CACHE_DIR_DASHBOARD / f"task{task_id}.pkl"
-        df_old = pd.read_pickle(filename_cache) if filename_cache.exists() else pd.DataFrame()
-
-        df_new = evaluations.list_evaluations(
-            function=metric,
-            tasks=[int(task_id)],
-            sort_order="desc",
-            offset=n_clicks * n_runs,
-            size=n_runs,
-            output_format="dataframe",
-        )
-
-        if df_new.empty and df_old.empty:
+        # The first page, and the pages fetched so far with the button
+        df = load_pages(task_id, metric, (n_clicks or 0) + 1, SERVER_BASE_URL)
+        if df.empty:
             return html.Div(), html.Div(), html.Div()
 
-        df = pd.concat([df_old, df_new], ignore_index=True)
-
-        df.to_pickle(filename_cache)
-        run_link = []
-        tick_text = []
-        truncated = []
-        # Plotly hack to add href to each data point
-        for run_id in df["run_id"].values:
-            link = f'<a href="{SERVER_BASE_URL}r/{run_id}">'
-            run_link.append(link)
-        # Plotly hack to link flow names
-        for flow_id in df["flow_id"].values:
-            link = f'<a href="{SERVER_BASE_URL}f/{flow_id}">'
-            tick_text.append(link)
-        # Truncate flow names (50 chars)
-        for flow in df["flow_name"].values:
-            if flow.startswith("torch.nn"):
-                truncated.append(normalizer.normalize(flow))
-            else:
-                truncated.append(SklearnExtension.trim_flow_name(flow))
-                # truncated.append(short[:50] + '..' if len(short) > 50 else short)
-
-        df["flow_name"] = truncated
-
-        # Figure 1 - Evaluations
-        data = [
-            go.Scatter(
-                y=df["flow_name"],
-                x=df["value"],
-                mode="markers",
-                text=run_link,
-                textposition="middle right", 
-                customdata=df["run_id"],     
-                hovertemplate="<b>%{y}</b><br>Value: %{x:.3f}<br>Run ID: %{customdata}<extra></extra>",
-                hoverlabel=dict(bgcolor="white", bordercolor="black", namelength=-1),
-                marker=dict(
-                    color=df["value"],       
-                    colorscale="Turbo",
-                    opacity=0.8,
-                    size=8,
-                    symbol="diamond",
-                ),
-            )
-        ]
-
-        layout = go.Layout(
-            autosize=False,
-            margin={"l": 400},
-            height=500 + 15 * (df["flow_name"].nunique()),
-            title="Every point is a run, click for details <br>"
-            "Every y label is a flow, click for details <br>"
-            "Top " + str(n_runs) + " runs shown<br>",
-            font=dict(size=11),
-            width=1000,
-            hovermode='closest',
-            clickmode='event+select',
-            xaxis=go.layout.XAxis(side="top"),
-            yaxis=go.layout.YAxis(
-                autorange="reversed",
-                ticktext=tick_text + df["flow_name"],
-                tickvals=df["flow_name"],
-            ),
-        )
-        fig = go.Figure(data, layout)
-
-        # Figure 2 People
-        tick_text = []
-        run_link = []
-        for run_id in df["run_id"].values:
-            link = '<a href="https://www.openml.org/r/' + str(run_id) + '/"> '
-            run_link.append(link)
-
-        for flow_id in df["flow_id"].values:
-            link = '<a href="https://www.openml.org/f/' + str(flow_id) + '/">'
-            tick_text.append(link)
-
-        df["upload_time"] = pd.to_datetime(df["upload_time"])
-
-        fig1 = px.scatter(
-            df,
-            x="upload_time",
-            y="value",
-            color="uploader_name",
-            text=run_link,
-            custom_data=[df["uploader_name"]],
-            labels={"value":metric},
-        )
-        fig1.update_traces(
-            hovertemplate="<b>%{x}</b><br>" + metric + ": %{y:.3g}<br>%{customdata[0]}<extra></extra>",
-        )
-        fig1.update_layout(showlegend=False)
+        fig = evaluation_figure(df)
+        fig1 = people_figure(df, metric, uploader_colors(df["uploader_name"]))
 
         # Leaderboard table
-        max_score_by_uploader = df[["uploader_name", "value"]].groupby(["uploader_name"]).max()
-        max_score_by_uploader = max_score_by_uploader.to_dict()["value"]
-        submissions_by_uploader = df["uploader_name"].value_counts().to_dict()
-        rank_by_uploader = {
-            uploader: rank
-            for rank, (uploader, score) in enumerate(sorted(max_score_by_uploader.items(), key=lambda t: -t[1]), start=1)
-        }
-
-        leaderboard = df.copy()[["uploader_name"]].drop_duplicates()
-        leaderboard["Entries"] = leaderboard["uploader_name"].apply(submissions_by_uploader.get)
-        leaderboard["Top Score"] = leaderboard["uploader_name"].apply(max_score_by_uploader.get)
-        leaderboard["Rank"] = leaderboard["uploader_name"].apply(rank_by_uploader.get)
-        leaderboard = leaderboard.rename(columns={"uploader_name": "Uploader"})
-        # Render order of columns matches dataframe column order.
-        leaderboard = leaderboard[["Rank", "Uploader", "Top Score", "Entries"]]
-
-
-        # Create table
+        board = leaderboard(df)
         table = html.Div(
             dt.DataTable(
-                data=leaderboard.to_dict("records"),
-                columns=[{"name": i, "id": i} for i in leaderboard.columns],
+                data=board.to_dict("records"),
+                columns=[{"name": i, "id": i} for i in board.columns],
                 sort_action="native",
                 row_deletable=False,
                 style_cell={
@@ -237,10 +93,181 @@ def register_task_callbacks(app, cache):
             ),
         )
         dummy_fig = html.Div(dcc.Graph(id="task-eval-dummy", figure=fig), style={"display": "none"})
-        eval_div = html.Div(dcc.Graph(id="task-eval-graph", figure=fig))
+        eval_div = html.Div(
+            [
+                dcc.Graph(id="task-eval-graph", figure=fig),
+                # Flows shown so far, to extend the graph without reloading the pages
+                dcc.Store(id="task-flows", data=list(pd.unique(df["flow_label"]))),
+            ]
+        )
 
         return (
             dummy_fig,
             eval_div,
-            html.Div([dcc.Graph(figure=fig1), html.Div("Leaderboard"), table]),
+            html.Div(
+                [dcc.Graph(id="task-people-graph", figure=fig1), html.Div("Leaderboard"), table]
+            ),
         )
+
+    @app.callback(
+        [
+            Output("task-eval-graph", "figure"),
+            Output("task-people-graph", "figure"),
+            Output("tasktable", "data"),
+            Output("task-flows", "data"),
+        ],
+        [Input("button", "n_clicks")],
+        [
+            State("url", "pathname"),
+            State("metric", "value"),
+            State("tasktable", "data"),
+            State("task-flows", "data"),
+        ],
+        prevent_initial_call=True,
+    )
+    def fetch_next_runs(n_clicks, pathname, metric, board, flows):
+        """Extend the graphs of the task page with the next page of runs
+
+        Only the new page is loaded and only its runs are sent to the
+        browser: the graphs are patched in place, and the leaderboard and
+        flows of the previous pages are taken from the page itself.
+
+        :param n_clicks: number of clicks, the number of the page to add
+        :param board: records of the leaderboard of the previous pages
+        :param flows: flows of the previous pages, in order of their first run
+        """
+        if not n_clicks or pathname is None or "/dashboard/task" not in pathname:
+            raise PreventUpdate
+        task_id = int(re.search(r"task/(\d+)", pathname).group(1))
+        new = load_page(task_id, metric, n_clicks, SERVER_BASE_URL)
+        if new.empty:
+            raise PreventUpdate
+        uploaders = [row["Uploader"] for row in board]
+        flows = list(dict.fromkeys(flows + new["flow_label"].tolist()))
+        board = leaderboard(new, board)
+        colors = uploader_colors(board["Uploader"])
+        return (
+            evaluation_patch(new, len(flows)),
+            people_patch(uploaders, new, metric, colors),
+            board.to_dict("records"),
+            flows,
+        )
+
+
+def evaluation_figure(df):
+    """Scatter of the runs of a task per flow, every point links to its run"""
+    data = [
+        go.Scatter(
+            y=df["flow_label"],
+            x=df["value"],
+            mode="markers",
+            # Plotly hack to add href to each data point
+            text=df["run_link"],
+            textposition="middle right",
+            customdata=df["run_id"],
+            hovertemplate="<b>%{y}</b><br>Value: %{x:.3f}<br>Run ID: %{customdata}<extra></extra>",
+            hoverlabel=dict(bgcolor="white", bordercolor="black", namelength=-1),
+            marker=dict(
+                color=df["value"],
+                colorscale="Turbo",
+                opacity=0.8,
+                size=8,
+                symbol="diamond",
+            ),
+        )
+    ]
+
+    layout = go.Layout(
+        autosize=False,
+        margin={"l": 400},
+        height=evaluation_height(df["flow_label"].nunique()),
+        title="Every point is a run, click for details <br>"
+        "Every y label is a flow, click for details <br>"
+        "Top " + str(PAGE_RUNS) + " runs shown<br>",
+        font=dict(size=11),
+        width=1000,
+        hovermode='closest',
+        clickmode='event+select',
+        xaxis=go.layout.XAxis(side="top"),
+        yaxis=go.layout.YAxis(
+            autorange="reversed",
+            # Plotly hack to link flow names
+            ticktext=df["flow_tick"],
+            tickvals=df["flow_label"],
+        ),
+    )
+    return go.Figure(data, layout)
+
+
+def evaluation_height(n_flows):
+    return 500 + 15 * n_flows
+
+
+def evaluation_patch(new, n_flows):
+    """Patch adding the runs of a new page to ``evaluation_figure``
+
+    :param new: segment of the new page
+    :param n_flows: number of flows of all pages, including the new one
+    """
+    patch = Patch()
+    trace = patch["data"][0]
+    trace["x"].extend(new["value"].tolist())
+    trace["y"].extend(new["flow_label"].tolist())
+    trace["text"].extend(new["run_link"].tolist())
+    trace["customdata"].extend(new["run_id"].tolist())
+    trace["marker"]["color"].extend(new["value"].tolist())
+    patch["layout"]["height"] = evaluation_height(n_flows)
+    patch["layout"]["yaxis"]["ticktext"].extend(new["flow_tick"].tolist())
+    patch["layout"]["yaxis"]["tickvals"].extend(new["flow_label"].tolist())
+    return patch
+
+
+def uploader_colors(uploaders):
+    """Color of every uploader, in order of their first run"""
+    palette = px.colors.qualitative.Plotly
+    return {
+        uploader: palette[i % len(palette)] for i, uploader in enumerate(pd.unique(uploaders))
+    }
+
+
+def people_figure(df, metric, colors):
+    """Runs of a task over time, one trace per uploader"""
+    fig = px.scatter(
+        df,
+        x="upload_time",
+        y="value",
+        color="uploader_name",
+        color_discrete_map=colors,
+        text="people_link",
+        custom_data=["uploader_name"],
+        labels={"value": metric},
+    )
+    fig.update_traces(
+        hovertemplate="<b>%{x}</b><br>" + metric + ": %{y:.3g}<br>%{customdata[0]}<extra></extra>",
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def people_patch(old_uploaders, new, metric, colors):
+    """Patch adding the runs of a new page to ``people_figure``
+
+    Runs of known uploaders extend their trace, new uploaders get a trace
+    appended, in the order ``people_figure`` of all pages would have.
+
+    :param old_uploaders: uploader of every run of the previous pages
+    :param new: segment of the new page
+    """
+    patch = Patch()
+    traces = {uploader: i for i, uploader in enumerate(pd.unique(old_uploaders))}
+    known = new["uploader_name"].isin(list(traces))
+    for uploader, runs in new[known].groupby("uploader_name", sort=False):
+        trace = patch["data"][traces[uploader]]
+        trace["x"].extend(runs["upload_time"].dt.strftime("%Y-%m-%dT%H:%M:%S").tolist())
+        trace["y"].extend(runs["value"].tolist())
+        trace["text"].extend(runs["people_link"].tolist())
+        trace["customdata"].extend([[uploader]] * len(runs))
+    if not known.all():
+        for trace in people_figure(new[~known], metric, colors).data:
+            patch["data"].append(trace.to_plotly_json())
+    return patch
@@ -0,0 +1,149 @@
+"""Append-only store of the evaluations shown on task pages
+
+The evaluations of a task for a metric are fetched best first, a page of
+``PAGE_RUNS`` runs at a time. Every page is stored as a separate segment
+together with the columns the task page derives from it: links, trimmed
+flow names and parsed upload times. Fetching the next page therefore only
+fetches, derives and writes that page, and the graphs and leaderboard of
+the task page are extended with its runs only. Segments are shared by all
+users of a task and fetched again once they are older than
+``TASK_CACHE_SECONDS``, as new runs change the pages.
+"""
+import re
+from collections import defaultdict
+
+import pandas as pd
+from openml import evaluations
+from openml.extensions.sklearn import SklearnExtension
+
+from . import caching
+from .caching import read_cached, task_segment_path
+from .dash_config import TASK_CACHE_SECONDS
+from .formats import FORMATS
+from .singleflight import single_flight
+
+# Runs fetched per click of the "Fetch next 1000 runs" button
+PAGE_RUNS = 1000
+STORAGE_FORMAT = FORMATS["feather"]
+# Columns of a segment and their types, derived ones after "value"
+SEGMENT_COLUMNS = {
+    "run_id": "int64",
+    "flow_id": "int64",
+    "flow_name": "object",
+    "uploader_name": "object",
+    "upload_time": "datetime64[ns]",
+    "value": "float64",
+    "flow_label": "object",
+    "run_link": "object",
+    "flow_tick": "object",
+    "people_link": "object",
+}
+
+
+class TorchNameNormalizer:
+    def __init__(self):
+        self.counter = defaultdict(int)
+
+    def strip_hash(self, name):
+        # Replace torch.nn. with torch.
+        name = re.sub(r'^torch\.nn\.', 'torch.', name)
+        # Strip the last .<segment>
+        name = re.sub(r'\.[^.]+$', '', name)
+        return name
+
+    def normalize(self, full_name):
+        base = self.strip_hash(full_name)
+        self.counter[base] += 1
+        count = self.counter[base]
+        return base if count == 1 else f"{base} ({count})"
+
+
+normalizer = TorchNameNormalizer()
+
+
+def build_segment(page: pd.DataFrame, server_url: str) -> pd.DataFrame:
+    """Segment of a page of evaluations, with the derived columns
+
+    :param page: evaluations as listed by ``openml.evaluations.list_evaluations``
+    :param server_url: base URL of the run and flow links
+    """
+    if page.empty:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in SEGMENT_COLUMNS.items()})
+    segment = page[["run_id", "flow_id", "flow_name", "uploader_name", "value"]].reset_index(
+        drop=True
+    )
+    segment["upload_time"] = pd.to_datetime(page["upload_time"].to_numpy())
+    segment["flow_label"] = [
+        normalizer.normalize(flow)
+        if flow.startswith("torch.nn")
+        else SklearnExtension.trim_flow_name(flow)
+        for flow in segment["flow_name"]
+    ]
+    run_ids = segment["run_id"].astype(str)
+    segment["run_link"] = f'<a href="{server_url}r/' + run_ids + '">'
+    segment["flow_tick"] = (
+        f'<a href="{server_url}f/' + segment["flow_id"].astype(str) + '">' + segment["flow_label"]
+    )
+    segment["people_link"] = '<a href="https://www.openml.org/r/' + run_ids + '/"> '
+    return segment[list(SEGMENT_COLUMNS)].astype(SEGMENT_COLUMNS)
+
+
+def load_page(task_id: int, metric: str, page: int, server_url: str) -> pd.DataFrame:
+    """Segment of a page of the evaluations of a task, fetched on first use
+
+    :param page: number of the page, the best ``PAGE_RUNS`` runs are page 0
+    :return: segment, empty if the task has no runs on this page
+    """
+    path = task_segment_path(task_id, metric, page)
+
+    def load():
+        return read_cached(path, "task", max_age=TASK_CACHE_SECONDS)
+
+    def compute():
+        listed = evaluations.list_evaluations(
+            function=metric,
+            tasks=[int(task_id)],
+            sort_order="desc",
+            offset=page * PAGE_RUNS,
+            size=PAGE_RUNS,
+            output_format="dataframe",
+        )
+        segment = build_segment(listed, server_url)
+        cache = caching.dashboard_cache
+        with cache.writing(path.name, "task", file_format=STORAGE_FORMAT.name) as tmp:
+            STORAGE_FORMAT.write(segment, tmp)
+        return segment
+
+    return single_flight.do(f"task{task_id}_{metric}_{page}", compute, load=load)
+
+
+def load_pages(task_id: int, metric: str, n_pages: int, server_url: str) -> pd.DataFrame:
+    """Evaluations of the first ``n_pages`` pages of a task, in order"""
+    return pd.concat(
+        [load_page(task_id, metric, page, server_url) for page in range(n_pages)],
+        ignore_index=True,
+    )
+
+
+def leaderboard(df: pd.DataFrame, previous=None) -> pd.DataFrame:
+    """Rank, top score and number of runs of every uploader
+
+    :param df: segments of the runs to add
+    :param previous: records of the leaderboard of the pages before ``df``,
+        which is extended without reading those pages again
+    :return: DataFrame with a row per uploader, in order of their first run
+    """
+    scores = df.groupby("uploader_name", sort=False)["value"]
+    table = pd.DataFrame({"Top Score": scores.max(), "Entries": scores.size()})
+    order = list(pd.unique(df["uploader_name"]))
+    if previous:
+        board = pd.DataFrame(previous).set_index("Uploader")
+        order = list(board.index) + [u for u in order if u not in board.index]
+        both = pd.concat([board[["Top Score", "Entries"]], table])
+        table = both.groupby(level=0).agg({"Top Score": "max", "Entries": "sum"})
+    # Ties are ranked in alphabetical order of the uploaders
+    table = table.sort_index()
+    table["Rank"] = table["Top Score"].rank(method="first", ascending=False).astype(int)
+    table = table.loc[order].rename_axis("Uploader").reset_index()
+    # Render order of columns matches dataframe column order.
+    return table[["Rank", "Uploader", "Top Score", "Entries"]]
@@ -0,0 +1,14 @@
+import pytest
+
+from .. import caching
+from ..cache_manager import CacheManager
+
+
+@pytest.fixture
+def dashboard_cache(tmp_path, monkeypatch):
+    """Empty dashboard cache in a temporary directory"""
+    root = tmp_path / "cache"
+    root.mkdir()
+    manager = CacheManager(root, 1024 ** 3)
+    monkeypatch.setattr(caching, "dashboard_cache", manager)
+    return manager
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from ..binning import _string_bin_numeric, bin_values
+
+
+def test_bin_values_uniform():
+    codes, labels = bin_values([0, 1, 2.5, 9, 10, np.nan], 4)
+    np.testing.assert_array_equal(codes, [0, 0, 1, 3, 3, -1])
+    assert labels == ["0 - 2.5", "2.5 - 5", "5 - 7.5", "7.5 - 10"]
+
+
+def test_bin_values_quantile():
+    values = np.random.default_rng(0).lognormal(size=1000)
+    codes, labels = bin_values(values, 10, "quantile")
+    assert len(labels) == 10
+    np.testing.assert_array_equal(np.bincount(codes), [100] * 10)
+
+
+def test_bin_values_constant_and_empty():
+    codes, labels = bin_values([3.0, 3.0], 10)
+    np.testing.assert_array_equal(codes, [0, 0])
+    assert labels == ["3 - 3"]
+    codes, labels = bin_values([np.nan], 10)
+    np.testing.assert_array_equal(codes, [-1])
+
+
+def test_bin_values_labels_unique():
+    _, labels = bin_values([1e6, 1e6 + 1], 100)
+    assert len(set(labels)) == 100
+
+
+def test_bin_values_order_like_string_binning():
+    x = np.random.default_rng(1).normal(size=500)
+    codes, _ = bin_values(x, 1000)
+    assert np.all(np.diff(codes[np.argsort(x)]) >= 0)
+    previous = _string_bin_numeric(pd.DataFrame({"x": x}), "x", "target")
+    assert previous["target"].nunique() == len(np.unique(codes))
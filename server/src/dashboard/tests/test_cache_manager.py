@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from .. import cache_manager
+from ..cache_manager import CacheManager
+
+
+def write(cache, name, kind="run", size=100):
+    with cache.writing(name, kind) as tmp:
+        tmp.write_bytes(b"x" * size)
+
+
+def test_cache_manager_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache = CacheManager(tmp_path, max_bytes=250)
+    write(cache, "a.pkl")
+    write(cache, "b.pkl")
+    monkeypatch.setattr(cache_manager, "TOUCH_INTERVAL", -1)
+    assert cache.lookup("a.pkl", "run") == tmp_path / "a.pkl"
+    write(cache, "c.pkl")
+
+    assert cache.lookup("b.pkl", "run") is None
+    assert not (tmp_path / "b.pkl").exists()
+    assert sorted(cache.entries()["name"]) == ["a.pkl", "c.pkl"]
+
+
+def test_cache_manager_rejects_outdated_files(tmp_path, monkeypatch):
+    cache = CacheManager(tmp_path, max_bytes=1000)
+    with cache.writing("df1.parquet", "frame", content_version=2) as tmp:
+        tmp.write_bytes(b"x")
+    assert cache.lookup("df1.parquet", "frame", content_version=3) is None
+    # Outdated files stay until they are overwritten
+    assert (tmp_path / "df1.parquet").exists()
+    with cache.writing("df1.parquet", "frame", content_version=3) as tmp:
+        tmp.write_bytes(b"y")
+    assert cache.lookup("df1.parquet", "frame", content_version=3) == tmp_path / "df1.parquet"
+
+    write(cache, "run1.pkl")
+    monkeypatch.setitem(
+        cache_manager.SCHEMA_VERSIONS, "run", cache_manager.SCHEMA_VERSIONS["run"] + 1
+    )
+    assert cache.lookup("run1.pkl", "run") is None
+    # or until they are pruned
+    assert cache.prune() == 1
+    assert not (tmp_path / "run1.pkl").exists()
+
+
+def test_cache_manager_forgets_missing_files(tmp_path):
+    cache = CacheManager(tmp_path, max_bytes=1000)
+    write(cache, "run1.pkl")
+    (tmp_path / "run1.pkl").unlink()
+    assert cache.lookup("run1.pkl", "run") is None
+    assert cache.entries().empty
+
+
+def test_cache_manager_failed_write_keeps_old_file(tmp_path):
+    cache = CacheManager(tmp_path, max_bytes=1000)
+    write(cache, "run1.pkl", size=10)
+    with pytest.raises(ValueError):
+        with cache.writing("run1.pkl", "run") as tmp:
+            tmp.write_bytes(b"partial")
+            raise ValueError
+    assert (tmp_path / "run1.pkl").read_bytes() == b"x" * 10
+    assert [path.name for path in tmp_path.glob("*.tmp")] == []
+
+
+def test_cache_manager_prune_removes_unknown_files(tmp_path):
+    cache = CacheManager(tmp_path, max_bytes=1000)
+    write(cache, "run1.pkl")
+    (tmp_path / "df2.pkl").write_bytes(b"legacy")
+    write(cache, "run3.pkl")
+    (tmp_path / "run3.pkl").unlink()
+
+    assert cache.prune() == 2
+    assert list(cache.entries()["name"]) == ["run1.pkl"]
+    assert (tmp_path / "run1.pkl").exists()
+
+
+def test_cache_manager_prune_keeps_files_written_meanwhile(tmp_path, monkeypatch):
+    cache = CacheManager(tmp_path, max_bytes=1000)
+    write(cache, "run1.pkl")
+    writer = threading.Thread(target=write, args=(CacheManager(tmp_path, 1000), "run2.pkl"))
+    iterdir = type(tmp_path).iterdir
+
+    def scan(path):
+        # Another worker writes a file while the directory is scanned
+        writer.start()
+        writer.join(timeout=1)
+        return iterdir(path)
+
+    monkeypatch.setattr(type(tmp_path), "iterdir", scan)
+    assert cache.prune() == 0
+    writer.join()
+    assert sorted(cache.entries()["name"]) == ["run1.pkl", "run2.pkl"]
+    assert (tmp_path / "run2.pkl").exists()
+
+
+def test_cache_manager_max_age(tmp_path, monkeypatch):
+    cache = CacheManager(tmp_path, max_bytes=1000)
+    write(cache, "task1_acc_0.feather", kind="task")
+    assert cache.lookup("task1_acc_0.feather", "task", max_age=60) is not None
+    now = cache_manager.time.time()
+    monkeypatch.setattr(cache_manager.time, "time", lambda: now + 61)
+    assert cache.lookup("task1_acc_0.feather", "task", max_age=60) is None
+    assert cache.lookup("task1_acc_0.feather", "task") is not None
+    # Outdated files stay until they are overwritten
+    write(cache, "task1_acc_0.feather", kind="task")
+    assert cache.lookup("task1_acc_0.feather", "task", max_age=60) is not None
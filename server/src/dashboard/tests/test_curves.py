@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score, roc_auc_score, roc_curve
+
+from ..curves import binary_curves, compute_curves, downsample
+
+
+def test_binary_curves_match_sklearn():
+    rng = np.random.default_rng(0)
+    positive = rng.random(100000) < 0.3
+    scores = np.round(positive * 0.3 + rng.random(100000), 3)
+    curve = binary_curves(positive, scores, n_points=200)
+
+    assert np.isclose(curve["roc_auc"], roc_auc_score(positive, scores))
+    assert np.isclose(curve["average_precision"], average_precision_score(positive, scores))
+    assert len(curve["roc"]["fpr"]) == 200
+    fpr, tpr, _ = roc_curve(positive, scores, drop_intermediate=False)
+    points = set(zip(np.round(fpr, 12), np.round(tpr, 12)))
+    assert set(zip(np.round(curve["roc"]["fpr"], 12), np.round(curve["roc"]["tpr"], 12))) <= points
+    assert binary_curves(np.ones(10, dtype=bool), np.arange(10.0)) is None
+
+
+def test_downsample_keeps_corners():
+    x = np.linspace(0, 1, 10001)
+    y = np.where(x < 0.5, 0.0, 1.0)
+    indices = downsample(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 10000
+    assert np.all(np.diff(indices) > 0)
+    assert {4999, 5000} <= set(indices)
+
+
+def test_compute_curves_per_class():
+    rng = np.random.default_rng(0)
+    correct = rng.choice(["a", "b", "c"], 1000)
+    confidence = rng.dirichlet([1, 1, 1], 1000)
+    predictions = pd.DataFrame(
+        {
+            "confidence.a": confidence[:, 0],
+            "confidence.b": confidence[:, 1],
+            "confidence.c": confidence[:, 2],
+            "correct": pd.Categorical(correct),
+        }
+    )
+    curves = compute_curves(predictions)
+    assert curves["classes"] == list(pd.unique(correct))
+    assert set(curves["curves"]) == {"a", "b", "c"}
+    assert np.isclose(
+        curves["curves"]["b"]["roc_auc"], roc_auc_score(correct == "b", confidence[:, 1])
+    )
@@ -1,7 +1,9 @@
+import math
 import time
 
+from ..data_callbacks import feature_table_page
 from ..helpers import get_metadata
-from server.src.dashboard.dash_config import BASE_URL
+from server.src.dashboard.dash_config import BASE_URL, FEATURE_PAGE_SIZE
 
 
 def uncommon_string(s1, s2):
@@ -18,15 +20,35 @@ def test_data_page_loading(dash_br):
 
 
 def test_metadata_table(dash_br):
-    # Test if feature table is loaded correctly.
+    # The feature table renders one page of features at a time
     data_id = 5
     metadata, data, _ = get_metadata(data_id)
+    page_count = math.ceil(len(metadata) / FEATURE_PAGE_SIZE)
+    url = f"{BASE_URL}data/{data_id}"
 
-    dash_br.server_url = f"{BASE_URL}data/{data_id}"
+    dash_br.server_url = url
     time.sleep(5)
     feature_table = dash_br.find_element("#datatable")
-    actual_table = feature_table.text.split("Entropy")[-1]
-    assert len(actual_table.split("\n")) >= metadata.shape[0]
+    for attribute in metadata["Attribute"][:FEATURE_PAGE_SIZE]:
+        assert attribute in feature_table.text
+
+    records, count = feature_table_page(url, 0, FEATURE_PAGE_SIZE, [], "")
+    assert count == page_count
+    assert [r["Attribute"] for r in records] == list(metadata["Attribute"][:FEATURE_PAGE_SIZE])
+
+    # Sort and filter round trip
+    records, count = feature_table_page(
+        url,
+        0,
+        FEATURE_PAGE_SIZE,
+        [{"column_id": "Attribute", "direction": "desc"}],
+        '{DataType} = "numeric"',
+    )
+    numeric = metadata[metadata["DataType"] == "numeric"]["Attribute"]
+    assert count == max(1, math.ceil(len(numeric) / FEATURE_PAGE_SIZE))
+    attributes = [r["Attribute"] for r in records]
+    assert {r["DataType"] for r in records} <= {"numeric"}
+    assert attributes == sorted(numeric, reverse=True)[:FEATURE_PAGE_SIZE]
 
 
 def test_distribution_loaded(dash_br):
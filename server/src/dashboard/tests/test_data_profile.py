@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from ..data_profile import N_BINS, build_profile
+from ..helpers import clean_dataset
+
+
+def test_profile_class_counts():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "x": np.append(rng.normal(size=999), np.nan),
+            "c": rng.choice(["a", "b", "c", None], 1000),
+            "target": rng.choice(["yes", "no", None], 1000),
+        }
+    )
+    profile = build_profile(df, ["x"], target="target")
+    assert profile["classes"] == ["no", "yes"]
+
+    x = profile["columns"]["x"]
+    for k, label in enumerate(profile["classes"]):
+        values = df["x"][(df["target"] == label) & df["x"].notnull()]
+        np.testing.assert_array_equal(
+            x["class_counts"][k], np.histogram(values, bins=x["edges"])[0]
+        )
+    assert x["class_counts"].shape == (2, N_BINS)
+
+    c = profile["columns"]["c"]
+    expected = pd.crosstab(df["target"], df["c"]).loc[profile["classes"], c["labels"]]
+    np.testing.assert_array_equal(c["class_counts"], expected.to_numpy())
+
+
+def test_imputation_values_and_clean_dataset():
+    df = pd.DataFrame(
+        {
+            "x": [1.0, np.nan, 3.0, 10.0, 2.0],
+            "c": pd.Categorical(["a", "b", None, "b", "a"]),
+            "s": ["u", "v", "v", np.nan, "v"],
+            "mostly_missing": [np.nan, np.nan, np.nan, np.nan, 1.0],
+            "complete": [1, 2, 3, 4, 5],
+        }
+    )
+    imputation = build_profile(df, ["x", "mostly_missing", "complete"])["imputation"]
+    assert imputation == {"drop": ["mostly_missing"], "fill": {"x": 2.5, "c": "a", "s": "v"}}
+
+    cleaned = clean_dataset(df, imputation)
+    assert list(cleaned.columns) == ["x", "c", "s", "complete"]
+    assert cleaned["x"].tolist() == [1.0, 2.5, 3.0, 10.0, 2.0]
+    assert cleaned["s"].tolist() == ["u", "v", "v", "v", "v"]
+    assert not cleaned.isnull().any().any()
+    assert np.shares_memory(cleaned["complete"].to_numpy(), df["complete"].to_numpy())
+    assert df["x"].isnull().sum() == 1
+    pd.testing.assert_frame_equal(clean_dataset(df), cleaned)
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from ..feature_importance import (
+    has_feature_importance,
+    load_feature_importance,
+    save_feature_importance,
+)
+
+
+def importance(mode, top):
+    fi = pd.DataFrame({"index": [top, "other"], "importance": [0.8, 0.2]})
+    fi.attrs["mode"] = mode
+    return fi
+
+
+def test_feature_importance_per_dataset_version(dashboard_cache):
+
+    save_feature_importance(importance("approximate", "a"), 1, 1)
+    assert load_feature_importance(1, 1).attrs["mode"] == "approximate"
+    save_feature_importance(importance("forest", "b"), 1, 1)
+    assert has_feature_importance(1, 1, "forest")
+    assert load_feature_importance(1, 1)["index"][0] == "b"
+
+    # Results of another version of the dataset are not served
+    assert load_feature_importance(1, 2) is None
+    assert not has_feature_importance(1, 2, "forest")
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+from openml.datasets import OpenMLDataFeature
+
+from ..feature_metadata import (
+    build_feature_metadata,
+    display_features,
+    load_feature_metadata,
+    save_feature_metadata,
+)
+
+
+def test_feature_metadata_roundtrip(dashboard_cache):
+    data = SimpleNamespace(
+        features={
+            0: OpenMLDataFeature(0, "x", "numeric", None, 3),
+            1: OpenMLDataFeature(1, "c", "nominal", ["a", "b", "c"], 0),
+            2: OpenMLDataFeature(2, "y", "nominal", ["no", "yes"], 0),
+            3: OpenMLDataFeature(3, "s", "string", None, 1),
+        },
+        default_target_attribute="y",
+    )
+    save_feature_metadata(build_feature_metadata(data), 1, 2)
+
+    features = display_features(load_feature_metadata(1, 2))
+    assert features.to_dict("list") == {
+        "Attribute": ["y", "x", "c", "s"],
+        "DataType": ["nominal", "numeric", "nominal", "string"],
+        "Missing values": [0, 3, 0, 1],
+        "# categories": ["2", " ", "3", " "],
+        "Target": ["true", "false", "false", "false"],
+        "id": [0, 1, 2, 3],
+    }
+    # A new version of the dataset has new feature metadata
+    assert load_feature_metadata(1, 3) is None
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from ..feature_table import query_features
+
+
+def features(n):
+    return pd.DataFrame(
+        {
+            "Attribute": [f"att{i}" for i in range(n)],
+            "DataType": ["numeric" if i % 2 else "nominal" for i in range(n)],
+            "Missing values": [i % 7 for i in range(n)],
+            "Entropy": [" " if i % 2 else round(i / n, 2) for i in range(n)],
+            "id": range(n),
+        }
+    )
+
+
+def test_query_features_pages():
+    records, page_count = query_features(features(12345), page_current=2, page_size=50)
+    assert page_count == 247
+    assert [r["id"] for r in records] == list(range(100, 150))
+    records, _ = query_features(features(12345), page_current=246, page_size=50)
+    assert len(records) == 45
+
+
+def test_query_features_filter_and_sort():
+    table = features(100)
+    records, page_count = query_features(
+        table,
+        '{DataType} eq "numeric" && {Missing values} > 4 && {Attribute} contains "att1"',
+        [{"column_id": "Missing values", "direction": "desc"}],
+    )
+    assert page_count == 1
+    assert [r["Attribute"] for r in records] == ["att13", "att19"]
+
+    records, _ = query_features(
+        table, "", [{"column_id": "Entropy", "direction": "desc"}], page_size=100
+    )
+    assert records[0]["Attribute"] == "att98"
+    assert records[-1]["Entropy"] == " "
+
+    # Attribute names sort as text, also if some of them look like numbers
+    table["Attribute"] = ["b", "10", "a", "9"] + list(table["Attribute"][4:])
+    records, _ = query_features(
+        table.head(4), "", [{"column_id": "Attribute", "direction": "asc"}]
+    )
+    assert [r["Attribute"] for r in records] == ["10", "9", "a", "b"]
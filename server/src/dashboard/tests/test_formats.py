@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse
+
+from ..formats import FORMATS, FormatPolicy, read_columns, read_frame, shape_bucket
+
+
+@pytest.mark.parametrize("name", list(FORMATS))
+def test_formats_read_column_subsets(tmp_path, name):
+    df = pd.DataFrame(
+        {"a": [1.5, None, 3.0], "b": pd.Categorical(["x", "y", "x"]), "c": [1, 2, 3]}
+    )
+    path = tmp_path / "df1.frame"
+    FORMATS[name].write(df, path)
+
+    assert read_columns(path) == ["a", "b", "c"]
+    pd.testing.assert_frame_equal(read_frame(path), df)
+    pd.testing.assert_frame_equal(read_frame(path, ["c", "a", "c"]), df[["c", "a"]])
+
+
+@pytest.mark.parametrize("name", list(FORMATS))
+def test_formats_write_sparse_frames(tmp_path, name):
+    matrix = scipy.sparse.random(100, 5, density=0.1, format="csr", random_state=0)
+    df = pd.DataFrame.sparse.from_spmatrix(matrix, columns=list("abcde"))
+    path = tmp_path / "df1.frame"
+    FORMATS[name].write(df, path)
+
+    np.testing.assert_array_equal(read_frame(path).to_numpy(), matrix.toarray())
+    assert isinstance(df.dtypes["a"], pd.SparseDtype)
+
+
+def test_format_policy(tmp_path):
+    assert shape_bucket(500, 10) == "r0c0"
+    assert shape_bucket(100_000, 5000) == "r2c2"
+
+    path = tmp_path / "format_policy.json"
+    with open(path, "w") as fh:
+        json.dump({"r0c0": "parquet-zstd"}, fh)
+    policy = FormatPolicy(path)
+    assert policy.choose(500, 10).name == "parquet-zstd"
+    assert policy.choose(500_000, 10).name == FormatPolicy.DEFAULTS["r2c0"]
+    assert FormatPolicy(path, "feather").choose(500, 10).name == "feather"
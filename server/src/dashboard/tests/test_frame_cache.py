@@ -0,0 +1,32 @@
+import pandas as pd
+
+from .. import caching
+from ..frame_cache import FrameCache
+
+
+def test_frame_cache_loads_columns_once(dashboard_cache):
+    caching.save_frame(pd.DataFrame({"a": [1, 2], "b": [3, 4], "c": [5, 6]}), 1)
+    cache = FrameCache(max_bytes=1024 * 1024)
+
+    df = cache.get(1, ["a", "b"])
+    assert list(df.columns) == ["a", "b"]
+    df.sort_values(by="a", ascending=False, inplace=True)
+    df["new"] = 0
+
+    assert list(cache.get(1, ["b", "a"])["a"]) == [1, 2]
+    assert cache.stats()[1]["hits"] == 1
+    assert list(cache.get(1).columns) == ["a", "b", "c"]
+    assert cache.stats()[1]["misses"] == 2
+    assert cache.get(2, ["a"]) is None
+
+
+def test_frame_cache_evicts_least_recently_used(dashboard_cache):
+    for data_id in (1, 2, 3):
+        caching.save_frame(pd.DataFrame({"a": range(1000)}), data_id)
+    cache = FrameCache(max_bytes=20000)
+
+    cache.get(1)
+    cache.get(2)
+    cache.get(1)
+    cache.get(3)
+    assert list(cache.stats()) == [1, 3]
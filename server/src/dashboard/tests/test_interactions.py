@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from .. import interactions
+from ..interactions import parcats_figure, scatter_matrix_figure, stratified_rows
+
+
+def test_stratified_rows_keeps_classes():
+    codes = np.where(np.arange(10000) < 5, 7, 3)
+    rows = stratified_rows(codes, 100)
+    assert np.all(np.diff(rows) > 0)
+    assert abs(len(rows) - 100) <= 1
+    assert (codes[rows] == 7).sum() == 1
+    np.testing.assert_array_equal(rows, stratified_rows(codes, 100))
+    np.testing.assert_array_equal(stratified_rows(codes[:50], 100), np.arange(50))
+
+
+def test_scatter_matrix_figure_is_bounded(monkeypatch):
+    monkeypatch.setattr(interactions, "INTERACTION_ROWS", 300)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": rng.normal(size=5000), "b": rng.normal(size=5000)})
+    y = rng.integers(0, 2, 5000)
+    df["target"] = y.astype(str)
+    fig = scatter_matrix_figure(df, ["a", "b"], y)
+    assert sum(len(trace.dimensions[0].values) for trace in fig.data) <= 301
+
+
+def test_parcats_figure_counts_combinations():
+    df = pd.DataFrame(
+        {"c": ["x", "x", "y", "x"], "d": ["u", "u", "v", "v"], "target": ["0", "0", "1", "1"]}
+    )
+    trace = parcats_figure(df, ["c", "d"], [0, 0, 1, 1]).data[0]
+    assert list(trace.counts) == [2, 1, 1]
+    assert [list(dimension.values) for dimension in trace.dimensions] == [
+        ["x", "y", "x"],
+        ["u", "v", "v"],
+        ["0", "1", "1"],
+    ]
+    assert list(trace.line.color) == [0, 1, 1]
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from ..caching import importance_path
+from ..feature_importance import save_feature_importance
+from ..jobs import RESULTS, results_cached
+
+
+def test_results_cached_checks_every_result(dashboard_cache):
+    status = {"state": "done", "version": 2, "importance": True}
+    for path, kind in RESULTS:
+        with dashboard_cache.writing(path(1).name, kind, 2) as tmp:
+            tmp.write_bytes(b"x")
+    # The importance is missing
+    assert not results_cached(1, status)
+    assert results_cached(1, dict(status, importance=False))
+
+    fi = pd.DataFrame({"index": ["a"], "importance": [1.0]})
+    fi.attrs["mode"] = "approximate"
+    save_feature_importance(fi, 1, 2)
+    assert results_cached(1, status)
+    # Results of another version of the dataset
+    assert not results_cached(1, dict(status, version=3))
+
+    for path, kind in RESULTS:
+        dashboard_cache.remove(path(1).name)
+        assert not results_cached(1, status)
+        with dashboard_cache.writing(path(1).name, kind, 2) as tmp:
+            tmp.write_bytes(b"x")
+    dashboard_cache.remove(importance_path(1, "approximate").name)
+    assert not results_cached(1, status)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from ..feature_importance import compute_feature_importance
+from ..model_matrix import CLASS_COLUMN, build_model_matrix, load_model_matrix, save_model_matrix
+
+
+def dataset(target_type):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=500)
+    x[0] = np.nan
+    df = pd.DataFrame(
+        {
+            "x": x,
+            "c": rng.choice(["10", "9", None], 500),
+            "noise": rng.normal(size=500),
+            "target": np.where(x > 0, "2", "10") if target_type == "nominal" else x * 2,
+        }
+    )
+    meta_features = pd.DataFrame(
+        {
+            "Attribute": ["x", "c", "noise", "target"],
+            "DataType": ["numeric", "nominal", "numeric", target_type],
+            "Target": [" ", " ", " ", "true"],
+        }
+    )
+    return df, meta_features
+
+
+def test_model_matrix_roundtrip(dashboard_cache):
+    df, meta_features = dataset("nominal")
+    matrix = build_model_matrix(df, meta_features)
+    assert matrix["x"].dtype == np.float32
+    assert not matrix.isnull().any().any()
+    assert list(matrix["c"].cat.categories) == ["9", "10"]
+    assert list(matrix[CLASS_COLUMN].cat.categories) == ["2", "10"]
+
+    save_model_matrix(matrix, 1, 1)
+    loaded = load_model_matrix(1, ["c", "missing", CLASS_COLUMN])
+    assert list(loaded.columns) == ["c", CLASS_COLUMN]
+    pd.testing.assert_series_equal(loaded["c"], matrix["c"])
+    # Columns are views of the mapped file, not copies
+    loaded = load_model_matrix(1)
+    assert not loaded["x"].to_numpy().flags.writeable
+    assert not loaded["c"].cat.codes.to_numpy().flags.writeable
+    pd.testing.assert_frame_equal(loaded, matrix)
+    assert load_model_matrix(2) is None
+
+
+def test_feature_importance_from_model_matrix():
+    for target_type in ("nominal", "numeric"):
+        df, meta_features = dataset(target_type)
+        matrix = build_model_matrix(df, meta_features)
+        if target_type == "numeric":
+            assert matrix[CLASS_COLUMN].cat.categories[0].startswith("-")
+        for mode in ("approximate", "forest"):
+            fi = compute_feature_importance(matrix, meta_features, mode=mode)
+            assert set(fi["index"]) == {"x", "c", "noise"}
+            assert fi["index"][0] == "x"
@@ -0,0 +1,57 @@
+import functools
+import http.server
+import threading
+
+from .. import predictions
+from ..predictions import load_predictions
+
+ARFF = """% Predictions of a run
+@RELATION openml_task_1_predictions
+
+@ATTRIBUTE repeat NUMERIC
+@ATTRIBUTE 'row_id' INTEGER
+@ATTRIBUTE confidence.a NUMERIC
+@ATTRIBUTE 'confidence.b c' NUMERIC
+@ATTRIBUTE prediction {a, 'b c'}
+@ATTRIBUTE correct {a,'b c'}
+
+@DATA
+0,0,0.9,0.1,a,a
+0,1,0.2,0.8,'b c',a
+0,2,?,0.8,'b c','b c'
+0,3,0.3,0.7,'b c','b c'
+0,4,0.6,0.4,a,'b c'
+"""
+
+
+def test_load_predictions_downloads_once(tmp_path, monkeypatch, dashboard_cache):
+    monkeypatch.setattr(predictions, "CHUNK_ROWS", 2)
+    (tmp_path / "predictions.arff").write_text(ARFF)
+    requests = []
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    handler = functools.partial(Handler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/predictions.arff"
+    try:
+        df = load_predictions(1, url)
+        again = load_predictions(1, url)
+    finally:
+        server.shutdown()
+
+    assert requests == ["/predictions.arff"]
+    assert list(df.columns) == [
+        "repeat", "row_id", "confidence.a", "confidence.b c", "prediction", "correct"
+    ]
+    assert list(df["correct"].cat.categories) == ["a", "b c"]
+    assert df["correct"].tolist() == ["a", "a", "b c", "b c", "b c"]
+    assert df["confidence.a"].isnull().tolist() == [False, False, True, False, False]
+    assert again.equals(df)
@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from .. import helpers, run_cache
+from ..dash_config import RUN_CACHE_SECONDS
+from ..run_cache import (
+    build_run_entry,
+    evaluations_table,
+    is_stale,
+    load_run,
+    long_evaluations,
+    metric_values,
+)
+
+
+def openml_run(run_id=10, evaluated=True):
+    fold_evaluations = {
+        "predictive_accuracy": {0: {0: 0.5, 1: 0.7}, 1: {0: 0.6, 1: 0.8}},
+        "usercpu_time_millis": {0: {1: 3.0}},
+    }
+    return SimpleNamespace(
+        run_id=run_id,
+        task_id=1,
+        task_type="Supervised Classification",
+        flow_id=2,
+        flow_name="flow",
+        dataset_id=3,
+        setup_id=4,
+        uploader=5,
+        uploader_name="uploader",
+        output_files={"description": 20, "predictions": 21},
+        evaluations={"predictive_accuracy": 0.65} if evaluated else None,
+        fold_evaluations=fold_evaluations if evaluated else None,
+        sample_evaluations={"predictive_accuracy": {0: {0: {0: 0.4, 1: 0.5}}}}
+        if evaluated
+        else None,
+    )
+
+
+def test_long_evaluations():
+    run = openml_run()
+    evaluations = long_evaluations(run.fold_evaluations, run.sample_evaluations)
+    assert list(evaluations["metric"].cat.categories) == [
+        "predictive_accuracy",
+        "usercpu_time_millis",
+    ]
+    assert len(evaluations) == 7
+    assert evaluations["value"].dtype == np.float64
+    curve = evaluations[evaluations["sample"] >= 0]
+    assert list(curve["sample"]) == [0, 1] and list(curve["value"]) == [0.4, 0.5]
+    assert long_evaluations(None).empty
+
+    entry = build_run_entry(run)
+    assert sorted(metric_values(entry, "predictive_accuracy")) == [0.5, 0.6, 0.7, 0.8]
+    assert list(metric_values(entry, "missing")) == []
+
+
+def test_staleness(monkeypatch, dashboard_cache):
+    listed = {10: 1}
+    checks = []
+
+    def count_evaluations(run_id):
+        checks.append(run_id)
+        return listed.get(run_id)
+
+    monkeypatch.setattr(run_cache, "count_evaluations", count_evaluations)
+    entry = build_run_entry(openml_run(), fetched=0)
+    assert not is_stale(entry, now=RUN_CACHE_SECONDS - 1)
+    assert checks == []
+    # Past the window the run is checked, and served for another window
+    assert not is_stale(entry, now=RUN_CACHE_SECONDS + 1)
+    assert checks == [10] and load_run(10)["checked"] == RUN_CACHE_SECONDS + 1
+    assert not is_stale(entry, now=2 * RUN_CACHE_SECONDS)
+    assert checks == [10]
+    # The server added evaluations to the run
+    listed[10] = 2
+    assert is_stale(entry, now=3 * RUN_CACHE_SECONDS)
+
+    entry = build_run_entry(openml_run(11, evaluated=False), fetched=0)
+    listed[11] = 0
+    assert not is_stale(entry, now=RUN_CACHE_SECONDS + 1)
+    listed[11] = 1
+    assert is_stale(entry, now=3 * RUN_CACHE_SECONDS)
+    # The server cannot be reached
+    entry = build_run_entry(openml_run(12), fetched=0)
+    assert not is_stale(entry, now=RUN_CACHE_SECONDS + 1)
+
+
+def test_evaluations_table():
+    table = evaluations_table(build_run_entry(openml_run()))
+    assert list(table["evaluations"]) == [
+        "predictive_accuracy",
+        "usercpu_time_millis",
+        "description",
+        "predictions",
+        "task_type",
+    ]
+    assert table["values"][0] == "0.65 ± 0.112"
+    assert table["values"][1] == "3.0 ± 0.0"
+
+
+def test_get_run_df_served_locally(monkeypatch, dashboard_cache):
+    calls = []
+
+    def get_run(run_id, ignore_cache=False):
+        calls.append(ignore_cache)
+        return openml_run(run_id, evaluated=ignore_cache)
+
+    monkeypatch.setattr(helpers.runs, "get_run", get_run)
+    entry, table = helpers.get_run_df(10)
+    # The unevaluated run cached by openml is fetched again from the server
+    assert calls == [False, True]
+    assert load_run(10)["fold_evaluations"].equals(entry["fold_evaluations"])
+    helpers.get_run_df(10)
+    assert calls == [False, True]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from .. import scatter
+from ..scatter import scatter_traces
+
+
+def frame(n_rows):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=n_rows)
+    x[0] = np.nan
+    return pd.DataFrame(
+        {"x": x, "y": rng.normal(size=n_rows), "c": rng.choice(["a", "b", None], n_rows)}
+    )
+
+
+def test_scatter_traces_group_rows():
+    df = frame(100)
+    traces = scatter_traces(df, "x", "y", "c")
+    assert [trace.type for trace in traces] == ["scatter", "scatter"]
+    for trace in traces:
+        rows = df[(df["c"] == trace.name) & df["x"].notnull()]
+        np.testing.assert_array_equal(trace.x, rows["x"])
+        np.testing.assert_array_equal(trace.y, rows["y"])
+
+
+def test_scatter_traces_bin_large_frames(monkeypatch):
+    monkeypatch.setattr(scatter, "SCATTER_DENSITY_POINTS", 1000)
+    df = frame(5000)
+    traces = scatter_traces(df, "x", "y", "c")
+    assert [trace.type for trace in traces] == ["scattergl", "scattergl"]
+    counts = sum(trace.customdata.sum() for trace in traces)
+    assert counts == (df["c"].notnull() & df["x"].notnull()).sum()
+    assert sum(len(trace.x) for trace in traces) <= 2 * scatter.SCATTER_DENSITY_BINS ** 2
@@ -0,0 +1,58 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from ..singleflight import SingleFlight
+
+
+def test_single_flight_computes_once_per_process(tmp_path):
+    flight = SingleFlight(tmp_path)
+    calls, results = [], []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "frame"
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("data61", compute)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["frame"] * 5
+    assert len(calls) == 1
+    assert flight.do("data61", lambda: "new", load=lambda: "stored") == "stored"
+
+
+def test_single_flight_shares_errors(tmp_path):
+    flight = SingleFlight(tmp_path)
+
+    def compute():
+        raise ValueError("download failed")
+
+    with pytest.raises(ValueError):
+        flight.do("run1", compute)
+    assert flight.do("run1", lambda: "retried") == "retried"
+
+
+def _hold_lock(lock_dir, key, started):
+    with SingleFlight(lock_dir).lock(key):
+        started.set()
+        time.sleep(0.5)
+
+
+def test_single_flight_lock_excludes_processes(tmp_path):
+    started = multiprocessing.Event()
+    process = multiprocessing.Process(target=_hold_lock, args=(tmp_path, "task1", started))
+    process.start()
+    started.wait(10)
+    start = time.time()
+    with SingleFlight(tmp_path).lock("task1"):
+        waited = time.time() - start
+    process.join()
+    assert waited > 0.2
@@ -0,0 +1,55 @@
+import threading
+import time
+
+from flask import Flask
+
+from ..sqlite_cache import LockingCache, SQLiteCache
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=3000)
+    cache.set("a", b"a" * 1000)
+    cache.set("b", b"b" * 1000)
+    cache.set("expired", 1, timeout=-1)
+    assert cache.get("a") == b"a" * 1000
+    assert cache.get("expired") is None and not cache.add("a", 1)
+
+    # Compressed, so small enough to keep "b"
+    cache.set("large", ["openml"] * 100000)
+    assert cache.get("large") == ["openml"] * 100000
+
+    with cache._connect() as conn:
+        conn.execute("UPDATE entries SET last_access = 0 WHERE key = 'b'")
+    cache.set("c", b"c" * 1000)
+    assert not cache.has("b")
+    assert cache.has("a") and cache.has("c")
+
+
+def test_locking_cache_computes_once(tmp_path):
+    app = Flask(__name__)
+    cache = LockingCache(
+        app,
+        config={
+            "CACHE_TYPE": "server.src.dashboard.sqlite_cache.SQLiteCache",
+            "CACHE_DIR": tmp_path,
+        },
+    )
+    calls = []
+
+    @cache.memoize(timeout=60)
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.3)
+        return x * 2
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(slow(21))) for _ in range(4)
+    ]
+    with app.app_context():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results == [42] * 4
+    assert calls == [21]
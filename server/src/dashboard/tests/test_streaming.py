@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from ..sampling import sample_seed
+from ..streaming import (
+    DistinctSketch,
+    QuantileSketch,
+    StratifiedReservoir,
+    allocate_quota,
+    stream_dataset,
+)
+
+
+def test_quantile_sketch_merges_batches():
+    values = np.random.default_rng(0).normal(size=100000)
+    sketch, other = QuantileSketch(seed=0), QuantileSketch(seed=1)
+    for batch in np.array_split(values[:50000], 10):
+        sketch.update(batch)
+    other.update(values[50000:])
+    sketch.merge(other)
+
+    assert sketch.count == len(values)
+    expected = np.quantile(values, [0, 0.25, 0.5, 0.75, 1])
+    np.testing.assert_allclose(
+        sketch.quantiles([0, 0.25, 0.5, 0.75, 1]), expected, atol=0.05
+    )
+
+
+def test_distinct_sketch_estimate():
+    sketch = DistinctSketch()
+    for batch in np.array_split(np.arange(20000) % 5000, 4):
+        sketch.update(pd.Series(batch))
+    assert abs(sketch.estimate() - 5000) < 250
+
+
+def test_stratified_reservoir_keeps_rare_classes():
+    rng = np.random.default_rng(0)
+    target = np.where(rng.random(100000) < 0.001, "rare", "common")
+    df = pd.DataFrame({"x": np.arange(100000), "target": target})
+    reservoir = StratifiedReservoir(1000, len(df), stratify="target", seed=0)
+    for start in range(0, len(df), 10000):
+        reservoir.update(df.iloc[start: start + 10000])
+
+    sample = reservoir.sample()
+    assert len(sample) == 1000
+    assert (sample["target"] == "rare").sum() >= 1
+    assert sample["x"].is_unique
+
+
+def parquet_dataset(df, path):
+    df.to_parquet(path)
+    return SimpleNamespace(
+        dataset_id=1,
+        ignore_attribute=None,
+        row_id_attribute=None,
+        features={i: SimpleNamespace(name=name) for i, name in enumerate(df.columns)},
+        parquet_file=str(path),
+        data_feather_file=None,
+    )
+
+
+def test_stream_dataset_sample_is_deterministic(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {"x": rng.normal(size=20000), "target": rng.choice(["a", "b", "c"], 20000)}
+    )
+    data = parquet_dataset(df, tmp_path / "data.pq")
+
+    def sample(seed, rows=None):
+        return stream_dataset(data, {"x"}, {"target"}, "target", 500, len(df), seed, rows)[0]
+
+    first = sample(sample_seed(1, 1))
+    assert first.index.equals(sample(sample_seed(1, 1)).index)
+    assert not first.index.equals(sample(sample_seed(1, 2)).index)
+    again = sample(None, rows=first.index.to_numpy())
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_stream_dataset_bounds_continuous_target(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"x": rng.normal(size=200000), "target": rng.normal(size=200000)})
+    data = parquet_dataset(df, tmp_path / "data.pq")
+    sample, _ = stream_dataset(data, {"x", "target"}, set(), "target", 5000, len(df), 0)
+    assert abs(len(sample) - 5000) <= 1
+
+
+def test_stratified_reservoir_buffer_is_bounded():
+    df = pd.DataFrame({"x": np.arange(200000), "target": np.arange(200000) % 50000})
+    reservoir = StratifiedReservoir(5000, len(df), stratify="target", seed=0)
+    for start in range(0, len(df), 20000):
+        reservoir.update(df.iloc[start: start + 20000])
+        buffered = sum(len(rows) for rows in reservoir._below) + len(reservoir._above)
+        assert buffered <= 2.5 * 5000
+
+
+def test_sample_keeps_budget_with_many_classes():
+    df = pd.DataFrame({"x": np.arange(100000), "target": np.arange(100000) % 30000})
+    reservoir = StratifiedReservoir(1000, len(df), stratify="target", seed=0)
+    for start in range(0, len(df), 10000):
+        reservoir.update(df.iloc[start: start + 10000])
+    assert len(reservoir.sample()) == 1000
+
+
+def test_sample_fills_budget_with_more_classes_than_rows():
+    df = pd.DataFrame({"x": np.arange(100000), "target": np.arange(100000) % 20000})
+    reservoir = StratifiedReservoir(5000, len(df), stratify="target", seed=0)
+    for start in range(0, len(df), 10000):
+        reservoir.update(df.iloc[start: start + 10000])
+    sample = reservoir.sample()
+    assert len(sample) == 5000
+    assert sample["target"].value_counts().max() == 1
+
+
+def test_allocate_quota():
+    counts = pd.Series({"a": 700, "b": 290, "c": 5, "d": 5})
+    quota = allocate_quota(counts, 100)
+    assert quota.tolist() == [68, 29, 2, 1]
+    quota = allocate_quota(pd.Series(np.ones(5000, dtype=int)), 1000)
+    assert quota.sum() == 1000 and quota.max() == 1
+    assert allocate_quota(pd.Series([3, 2]), 100).tolist() == [3, 2]
+    # The share of classes without rows goes to the other classes
+    quota = allocate_quota(counts, 100, capacity=pd.Series({"a": 700, "b": 10, "d": 5}))
+    assert quota.tolist() == [88, 10, 0, 2]
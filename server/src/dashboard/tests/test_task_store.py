@@ -0,0 +1,66 @@
+import pandas as pd
+
+from .. import task_store
+from ..task_store import PAGE_RUNS, build_segment, leaderboard, load_page, load_pages
+
+
+def listed(offset, size):
+    run_ids = range(offset, min(offset + size, 2 * PAGE_RUNS + 10))
+    return pd.DataFrame(
+        {
+            "run_id": list(run_ids),
+            "task_id": 1,
+            "flow_id": [run_id % 3 for run_id in run_ids],
+            "flow_name": [
+                "torch.nn.Sequential.1" if run_id % 3 == 0 else "sklearn.tree.DecisionTree"
+                for run_id in run_ids
+            ],
+            "uploader_name": ["a" if run_id % 2 else "b" for run_id in run_ids],
+            "upload_time": "2020-01-01 10:00:00",
+            "value": [1 / (1 + run_id) for run_id in run_ids],
+        }
+    )
+
+
+def test_build_segment():
+    segment = build_segment(listed(0, 3), "https://www.openml.org/")
+    assert list(segment["flow_label"][1:]) == ["sklearn.DecisionTree"] * 2
+    assert segment["flow_label"][0].startswith("torch.Sequential")
+    assert segment["run_link"][1] == '<a href="https://www.openml.org/r/1">'
+    assert segment["flow_tick"][2] == '<a href="https://www.openml.org/f/2">sklearn.DecisionTree'
+    assert segment["upload_time"].dtype == "datetime64[ns]"
+
+    empty = build_segment(pd.DataFrame(), "https://www.openml.org/")
+    assert empty.empty and list(empty.columns) == list(segment.columns)
+
+
+def test_pages_are_fetched_once(monkeypatch, dashboard_cache):
+    offsets = []
+
+    def list_evaluations(function, tasks, sort_order, offset, size, output_format):
+        offsets.append(offset)
+        return listed(offset, size) if offset < 2 * PAGE_RUNS + 10 else pd.DataFrame()
+
+    monkeypatch.setattr(task_store.evaluations, "list_evaluations", list_evaluations)
+    assert len(load_pages(1, "acc", 2, "")) == 2 * PAGE_RUNS
+    page = load_page(1, "acc", 2, "")
+    assert list(page["run_id"]) == list(range(2 * PAGE_RUNS, 2 * PAGE_RUNS + 10))
+    assert load_page(1, "acc", 3, "").empty
+    assert len(load_pages(1, "acc", 4, "")) == 2 * PAGE_RUNS + 10
+    assert offsets == [0, PAGE_RUNS, 2 * PAGE_RUNS, 3 * PAGE_RUNS]
+
+    # Pages older than TASK_CACHE_SECONDS are fetched again
+    monkeypatch.setattr(task_store, "TASK_CACHE_SECONDS", -1)
+    load_page(1, "acc", 0, "")
+    assert offsets[-1] == 0
+
+
+def test_leaderboard_is_extended_per_page():
+    pages = [build_segment(listed(offset, 7), "") for offset in (0, 7, 14)]
+    pages[1]["uploader_name"] = ["c", "a", "d", "c", "b", "a", "c"]
+    board = None
+    for page in pages:
+        board = leaderboard(page, board).to_dict("records")
+    assert board == leaderboard(pd.concat(pages, ignore_index=True)).to_dict("records")
+    assert [row["Uploader"] for row in board] == ["b", "a", "c", "d"]
+    assert sum(row["Entries"] for row in board) == 21
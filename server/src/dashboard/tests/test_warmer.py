@@ -0,0 +1,59 @@
+import pandas as pd
+
+from .. import warmer
+from ..warmer import Checkpoint, prioritize, warm
+
+LISTING = pd.DataFrame(
+    {
+        "did": [1, 2, 3],
+        "version": [1, 1, 2],
+        "NumberOfInstances": [1000, 10, None],
+        "NumberOfFeatures": [10, 5, 3],
+    }
+)
+
+
+def test_prioritize():
+    assert list(prioritize(LISTING, "size")["did"]) == [2, 1, 3]
+    popularity = pd.Series({3: 500, 1: 20})
+    assert list(prioritize(LISTING, "popularity", popularity)["did"]) == [3, 1, 2]
+    assert list(prioritize(LISTING, "popularity")["did"]) == [2, 1, 3]
+
+
+def test_warm_resumes_from_checkpoint(tmp_path, monkeypatch):
+    calls = []
+
+    def warm_dataset(data_id, version, previous_md5=None, pages=False, shape=(0, 0)):
+        calls.append((data_id, previous_md5))
+        status = "failed" if data_id == 3 else "done"
+        return {"data_id": data_id, "version": version, "md5": f"md5-{data_id}",
+                "status": status, "error": None, "seconds": 0.1, "finished": 0}
+
+    monkeypatch.setattr(warmer, "warm_dataset", warm_dataset)
+    monkeypatch.setattr(warmer, "is_cached", lambda data_id, pages=False: True)
+    path = tmp_path / "checkpoint.jsonl"
+    assert warm(LISTING, Checkpoint(path), workers=2, rate=0) == 3
+
+    checkpoint = Checkpoint(path)
+    assert warm(LISTING, checkpoint, workers=2, rate=0) == 0
+    assert warm(LISTING, checkpoint, workers=2, rate=0, retry_failed=True) == 1
+
+    calls.clear()
+    newer = LISTING.assign(version=[2, 1, 2])
+    assert warm(newer, checkpoint, workers=2, rate=0) == 1
+    assert calls == [(1, "md5-1")]
+    assert list(checkpoint.report()["data_id"].sort_values()) == [1, 2, 3]
+
+
+def test_warm_again_after_caches_are_wiped(tmp_path, monkeypatch):
+    monkeypatch.setattr(warmer.openml.config, "get_cache_directory", lambda: str(tmp_path))
+    monkeypatch.setattr(warmer, "results_cached", lambda data_id: data_id != 2)
+    checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+    for data_id in (1, 2):
+        checkpoint.record({"data_id": data_id, "version": 1, "status": "done"})
+        (tmp_path / "datasets" / str(data_id)).mkdir(parents=True)
+
+    assert not warmer.needs_warming(checkpoint, 1, 1)
+    assert warmer.needs_warming(checkpoint, 2, 1, pages=True)
+    (tmp_path / "datasets" / "1").rmdir()
+    assert warmer.needs_warming(checkpoint, 1, 1)
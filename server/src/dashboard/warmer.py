@@ -0,0 +1,286 @@
+"""Bulk warmer of the dataset cache
+
+Downloads the datasets of the OpenML catalogue into the local cache, and
+optionally precomputes their dashboard pages, in a pool of workers. Every
+finished dataset is appended to a checkpoint, so an interrupted run resumes
+where it stopped, and datasets whose version and checksum did not change
+are skipped. The checkpoint doubles as a per-dataset timing and failure
+report, which is also written as CSV at the end of every run.
+
+Usage::
+
+    python cache_all_datasets.py --workers 8 --order popularity --pages
+"""
+import argparse
+import json
+import logging
+import time
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+
+import openml
+import pandas as pd
+
+from .caching import CACHE_DIR_ROOT, frame_format
+from .dash_config import WARMER_EXECUTOR, WARMER_RATE, WARMER_WORKERS
+from .jobs import create_executor, precompute_dataset, read_status, results_cached
+
+logger = logging.getLogger("dashboard")
+
+WARMER_DIR = CACHE_DIR_ROOT / "warmer"
+ORDERS = ("popularity", "size", "id")
+
+
+class RateLimiter:
+    """Spaces calls to ``wait`` at least ``1 / rate`` seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+        self._next = max(now, self._next) + self.interval
+
+
+class Checkpoint:
+    """Append-only record of warmed datasets, the latest record per dataset wins"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.records = {}
+        if self.path.exists():
+            with open(self.path) as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Line cut off by an interrupted run
+                        continue
+                    self.records[record["data_id"]] = record
+
+    def record(self, record: dict):
+        self.records[record["data_id"]] = record
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+
+    def is_fresh(self, data_id: int, version, retry_failed: bool = False):
+        """Whether a dataset was warmed at this version, or failed at it"""
+        record = self.records.get(data_id)
+        if record is None or record["version"] != version:
+            return False
+        return record["status"] == "done" or not retry_failed
+
+    def report(self) -> pd.DataFrame:
+        return pd.DataFrame(list(self.records.values())).sort_values(
+            "seconds", ascending=False
+        )
+
+
+def is_cached(data_id: int, pages: bool = False) -> bool:
+    """Whether the files a warmed dataset left are still in the caches
+
+    :param pages: also check the precomputed dashboard page
+    """
+    dataset_dir = Path(openml.config.get_cache_directory()) / "datasets" / str(data_id)
+    return dataset_dir.is_dir() and (not pages or results_cached(data_id))
+
+
+def needs_warming(checkpoint, data_id: int, version, pages=False, retry_failed=False):
+    """Whether a dataset is not warm, also after the caches were wiped
+
+    The checkpoint outlives the openml and dashboard caches, so datasets
+    it records as done are also looked up in the caches.
+    """
+    if not checkpoint.is_fresh(data_id, version, retry_failed):
+        return True
+    return checkpoint.records[data_id]["status"] == "done" and not is_cached(data_id, pages)
+
+
+def prioritize(listing: pd.DataFrame, order: str, popularity=None):
+    """Order the dataset listing in which the datasets are warmed
+
+    :param listing: result of ``datasets.list_datasets``
+    :param order: "popularity" (most downloaded first), "size" (fewest cells
+        first, so most datasets are warm soonest) or "id"
+    :param popularity: Series of download counts indexed by dataset ID
+    """
+    if order == "popularity" and popularity is not None:
+        key = -listing["did"].map(popularity).fillna(0)
+    elif order == "id":
+        key = listing["did"]
+    else:
+        key = listing["NumberOfInstances"] * listing["NumberOfFeatures"]
+    return listing.assign(_key=key.values).sort_values(
+        ["_key", "did"], na_position="last", kind="stable"
+    ).drop(columns="_key")
+
+
+def fetch_popularity(server_url: str):
+    """Download counts of all datasets from the search index, None if unavailable"""
+    query = {
+        "size": 10000,
+        "_source": ["data_id", "nr_of_downloads"],
+        "sort": [{"nr_of_downloads": "desc"}],
+    }
+    request = urllib.request.Request(
+        f"{server_url.rstrip('/')}/es/data/_search",
+        data=json.dumps(query).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            hits = json.load(response)["hits"]["hits"]
+    except Exception:
+        logger.warning("Could not fetch dataset popularity, ordering by size")
+        return None
+    return pd.Series(
+        {int(hit["_source"]["data_id"]): hit["_source"].get("nr_of_downloads", 0)
+         for hit in hits}
+    )
+
+
+def warm_dataset(data_id: int, version, previous_md5=None, pages=False, shape=(0, 0)):
+    """Download a dataset into the cache, and precompute its page if requested
+
+    :param previous_md5: checksum of the cached copy, a changed checksum
+        forces the dataset files to be downloaded again
+    :param shape: number of rows and columns, which decide the cache format
+    :return: checkpoint record with status, timing and error
+    """
+    start = time.time()
+    record = {"data_id": data_id, "version": version, "md5": None, "error": None}
+    try:
+        data = openml.datasets.get_dataset(data_id, download_data=False)
+        record["md5"] = data.md5_checksum
+        refresh = previous_md5 is not None and previous_md5 != data.md5_checksum
+        openml.datasets.get_dataset(
+            data_id,
+            download_data=True,
+            download_qualities=True,
+            download_features_meta_data=True,
+            cache_format=frame_format.choose(*shape).openml_cache_format,
+            force_refresh_cache=refresh,
+        )
+        if pages:
+            precompute_dataset(data_id)
+            status = read_status(data_id)
+            if status["state"] != "done":
+                raise RuntimeError(status["error"])
+        record["status"] = "done"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.time() - start, 2)
+    record["finished"] = time.time()
+    return record
+
+
+def warm(
+    listing: pd.DataFrame,
+    checkpoint: Checkpoint,
+    workers: int = WARMER_WORKERS,
+    executor: str = WARMER_EXECUTOR,
+    rate: float = WARMER_RATE,
+    pages: bool = False,
+    retry_failed: bool = False,
+):
+    """Warm the datasets of a listing in order, skipping fresh ones
+
+    :param rate: maximum number of datasets started per second
+    :return: number of datasets warmed in this run
+    """
+    todo = [
+        (int(row.did), int(row.version), _shape(row))
+        for row in listing.itertuples()
+        if needs_warming(checkpoint, int(row.did), int(row.version), pages, retry_failed)
+    ]
+    logger.info(f"Warming {len(todo)} of {len(listing)} datasets")
+    limiter = RateLimiter(rate)
+    pending = set()
+    with create_executor(executor, workers) as pool:
+        for data_id, version, shape in todo:
+            if len(pending) >= workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _record(checkpoint, done)
+            limiter.wait()
+            previous = checkpoint.records.get(data_id, {})
+            pending.add(
+                pool.submit(
+                    warm_dataset, data_id, version, previous.get("md5"), pages, shape
+                )
+            )
+        _record(checkpoint, wait(pending).done)
+    return len(todo)
+
+
+def _shape(row):
+    n_rows, n_columns = row.NumberOfInstances, row.NumberOfFeatures
+    return (
+        0 if pd.isna(n_rows) else int(n_rows),
+        0 if pd.isna(n_columns) else int(n_columns),
+    )
+
+
+def _record(checkpoint, futures):
+    for future in futures:
+        record = future.result()
+        checkpoint.record(record)
+        logger.info(
+            f"{record['data_id']} {record['status']} in {record['seconds']}s"
+            + (f": {record['error']}" if record["error"] else "")
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the OpenML dataset cache")
+    parser.add_argument("--workers", type=int, default=WARMER_WORKERS)
+    parser.add_argument("--executor", choices=("thread", "process"), default=WARMER_EXECUTOR)
+    parser.add_argument("--rate", type=float, default=WARMER_RATE,
+                        help="maximum number of datasets started per second")
+    parser.add_argument("--order", choices=ORDERS, default="popularity")
+    parser.add_argument("--limit", type=int, help="warm only the first datasets")
+    parser.add_argument("--ids", type=int, nargs="+", help="warm only these datasets")
+    parser.add_argument("--pages", action="store_true",
+                        help="also precompute the dashboard pages")
+    parser.add_argument("--retry-failed", action="store_true")
+    parser.add_argument("--checkpoint", type=Path, default=WARMER_DIR / "checkpoint.jsonl")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    openml.config.cache_directory = CACHE_DIR_ROOT
+    listing = openml.datasets.list_datasets(
+        data_id=args.ids, status="active", output_format="dataframe"
+    )
+    popularity = None
+    if args.order == "popularity":
+        popularity = fetch_popularity(openml.config.server.split("/api/")[0])
+    listing = prioritize(listing, args.order, popularity)
+    if args.limit is not None:
+        listing = listing.head(args.limit)
+
+    checkpoint = Checkpoint(args.checkpoint)
+    try:
+        warm(
+            listing,
+            checkpoint,
+            workers=args.workers,
+            executor=args.executor,
+            rate=args.rate,
+            pages=args.pages,
+            retry_failed=args.retry_failed,
+        )
+    finally:
+        if checkpoint.records:
+            report = checkpoint.report()
+            report.to_csv(args.checkpoint.with_name("report.csv"), index=False)
+            counts = report["status"].value_counts().to_dict()
+            logger.info(f"{counts}, report in {args.checkpoint.with_name('report.csv')}")
+
+
+if __name__ == "__main__":
+    main()